@@ -0,0 +1,42 @@
+"""
+Autenticação JWT feita uma única vez por requisição.
+
+O EmpresaMiddleware precisa do usuário e do token para descobrir a empresa,
+e o DRF autentica de novo na view: sem cache, a assinatura do token é
+verificada e o usuário é buscado no banco duas vezes. `autenticar_jwt`
+guarda o resultado (ou o erro) na HttpRequest, e o
+JWTAuthenticationPorRequisicao, configurado no DEFAULT_AUTHENTICATION_CLASSES,
+reaproveita o que o middleware já validou.
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+ATRIBUTO_CACHE = '_autenticacao_jwt'
+
+
+def autenticar_jwt(request):
+    """
+    (user, token) do cabeçalho Authorization, ou None sem token JWT.
+
+    O resultado fica guardado na HttpRequest; um token inválido guarda e
+    relança a mesma exceção (InvalidToken/AuthenticationFailed) a cada chamada.
+    """
+    # Aceita a Request do DRF e a HttpRequest do Django
+    request = getattr(request, '_request', request)
+    resultado = getattr(request, ATRIBUTO_CACHE, None)
+    if resultado is None:
+        try:
+            resultado = (JWTAuthentication().authenticate(request), None)
+        except Exception as e:
+            resultado = (None, e)
+        setattr(request, ATRIBUTO_CACHE, resultado)
+    autenticacao, erro = resultado
+    if erro is not None:
+        raise erro
+    return autenticacao
+
+
+class JWTAuthenticationPorRequisicao(JWTAuthentication):
+    """JWTAuthentication que reaproveita a autenticação já feita na requisição (ver `autenticar_jwt`)."""
+
+    def authenticate(self, request):
+        return autenticar_jwt(request)
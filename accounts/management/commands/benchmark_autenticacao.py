@@ -0,0 +1,92 @@
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, path, set_urlconf
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import JWTAuthenticationPorRequisicao
+
+
+class Ping(APIView):
+    """Endpoint autenticado sem trabalho algum: o tempo medido é o da pilha de middlewares + autenticação."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+# URLconf usada só durante o benchmark (ROOT_URLCONF aponta para este módulo)
+urlpatterns = [
+    path('api/benchmark/jwt-duplo/', Ping.as_view(authentication_classes=[JWTAuthentication])),
+    path('api/benchmark/jwt-unico/', Ping.as_view(authentication_classes=[JWTAuthenticationPorRequisicao])),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo por requisição de um endpoint autenticado trivial, com toda a pilha de '
+        'middlewares, autenticando o JWT de novo na view (JWTAuthentication) ou reaproveitando '
+        'a autenticação do EmpresaMiddleware (JWTAuthenticationPorRequisicao).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='E-mail do usuário do token (padrão: o primeiro ativo).')
+        parser.add_argument('--empresa', type=int, help='empresa_id gravado no token.')
+        parser.add_argument('--requisicoes', type=int, default=500, help='Requisições por rodada.')
+        parser.add_argument('--repeticoes', type=int, default=3, help='Rodadas por cenário (vale a melhor).')
+
+    def handle(self, *args, **options):
+        usuarios = get_user_model().objects.filter(is_active=True).order_by('id')
+        if options['usuario']:
+            usuarios = usuarios.filter(email=options['usuario'])
+        usuario = usuarios.first()
+        if usuario is None:
+            raise CommandError('Nenhum usuário ativo encontrado.')
+
+        token = AccessToken.for_user(usuario)
+        if options['empresa']:
+            token['empresa_id'] = options['empresa']
+        cliente = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        # Os logs dos middlewares (INFO e WARNING a cada requisição) dominariam a medição
+        logging.disable(logging.WARNING)
+        try:
+            with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=['testserver']):
+                clear_url_caches()
+                set_urlconf(None)
+                for nome, url in [
+                    ('JWTAuthentication (autentica de novo na view)', '/api/benchmark/jwt-duplo/'),
+                    ('JWTAuthenticationPorRequisicao', '/api/benchmark/jwt-unico/'),
+                ]:
+                    self._medir(cliente, nome, url, options['requisicoes'], options['repeticoes'])
+        finally:
+            logging.disable(logging.NOTSET)
+            clear_url_caches()
+            set_urlconf(None)
+
+    def _medir(self, cliente, nome, url, requisicoes, repeticoes):
+        # O request_started limpa connection.queries: conta pelo execute_wrapper
+        consultas = []
+        with connection.execute_wrapper(lambda execute, sql, *args: consultas.append(sql) or execute(sql, *args)):
+            resposta = cliente.get(url, secure=True)
+        if resposta.status_code != 200:
+            raise CommandError(f'{url} respondeu {resposta.status_code}: {resposta.content[:200]!r}')
+
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            for _ in range(requisicoes):
+                cliente.get(url, secure=True)
+            tempos.append(time.perf_counter() - inicio)
+        self.stdout.write(
+            f"{nome}: {min(tempos) * 1e6 / requisicoes:.0f} µs/requisição, "
+            f"{len(consultas)} consulta(s) SQL por requisição"
+        )
@@ -1,3 +1,93 @@
-from django.test import TestCase
+import logging
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from empresas.models import Empresa
+
+from .authentication import JWTAuthenticationPorRequisicao, autenticar_jwt
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class AutenticacaoPorRequisicaoTests(TestCase):
+    """O JWT é validado uma única vez por requisição, no EmpresaMiddleware, e reaproveitado pela view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(
+            username='teste', email='teste@example.com', password='x', user_type='PJ'
+        )
+
+    def setUp(self):
+        # Os middlewares logam cada requisição
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def token(self):
+        token = AccessToken.for_user(self.usuario)
+        token['empresa_id'] = self.empresa.id
+        return str(token)
+
+    def contar_validacoes(self):
+        patcher = mock.patch.object(
+            JWTAuthentication, 'get_validated_token', autospec=True, side_effect=JWTAuthentication.get_validated_token
+        )
+        validacoes = patcher.start()
+        self.addCleanup(patcher.stop)
+        return validacoes
+
+    def test_middleware_e_view_validam_o_token_uma_vez(self):
+        validacoes = self.contar_validacoes()
+        resposta = self.client.get(
+            '/api/vendas/', {'fields': 'data'}, secure=True, HTTP_AUTHORIZATION=f'Bearer {self.token()}'
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(validacoes.call_count, 1)
+
+    def test_token_invalido_responde_401_validando_uma_vez(self):
+        validacoes = self.contar_validacoes()
+        resposta = self.client.get('/api/vendas/', secure=True, HTTP_AUTHORIZATION='Bearer nao-e-um-jwt')
+        self.assertEqual(resposta.status_code, 401)
+        self.assertEqual(validacoes.call_count, 1)
+
+    def test_sem_token_nao_valida(self):
+        validacoes = self.contar_validacoes()
+        self.assertEqual(self.client.get('/api/vendas/', secure=True).status_code, 401)
+        validacoes.assert_not_called()
+
+    def test_resultado_guardado_na_httprequest(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.token()}')
+        with mock.patch.object(JWTAuthentication, 'authenticate', autospec=True,
+                               side_effect=JWTAuthentication.authenticate) as autenticar:
+            usuario, token = autenticar_jwt(request)
+            # A Request do DRF aponta para a mesma HttpRequest
+            self.assertEqual(JWTAuthenticationPorRequisicao().authenticate(Request(request)), (usuario, token))
+        self.assertEqual(usuario, self.usuario)
+        self.assertEqual(token['empresa_id'], self.empresa.id)
+        autenticar.assert_called_once()
+
+    def test_erro_guardado_e_relancado(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION='Bearer nao-e-um-jwt')
+        with mock.patch.object(JWTAuthentication, 'authenticate', autospec=True,
+                               side_effect=JWTAuthentication.authenticate) as autenticar:
+            with self.assertRaises(InvalidToken) as primeiro:
+                autenticar_jwt(request)
+            with self.assertRaises(InvalidToken) as segundo:
+                JWTAuthenticationPorRequisicao().authenticate(Request(request))
+        self.assertIs(segundo.exception, primeiro.exception)
+        autenticar.assert_called_once()
+
+    def test_sem_cabecalho_devolve_none(self):
+        request = RequestFactory().get('/')
+        self.assertIsNone(autenticar_jwt(request))
+        self.assertIsNone(autenticar_jwt(request))
@@ -4,7 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from .authentication import JWTAuthenticationPorRequisicao
 from django.http import HttpRequest
 from django.test.client import RequestFactory
 import logging
@@ -274,7 +274,7 @@ class UserProfileView(APIView):
     """
     View para obter informações do usuário logado
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiMarketingAgentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_marketing_agent'
+
+    def ready(self):
+        # Importa os signals para garantir o registro quando o app é carregado
+        from . import signals  # noqa: F401
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from dashboard.cache_utils import agendar_invalidacao
+
+from .models import MarketingData
+
+
+@receiver(post_save, sender=MarketingData)
+@receiver(post_delete, sender=MarketingData)
+def invalidar_dashboard_marketing(sender, instance: MarketingData, raw: bool = False, **kwargs):
+    """Dados de marketing alterados invalidam o cache do dashboard da empresa."""
+    if raw:
+        return
+    agendar_invalidacao(instance.empresa_id)
@@ -21,6 +21,9 @@ from .serializers import (
 )
 from .ai_agent import AIMarketingAgent
 from venda.models import Venda
+from dashboard.cache_utils import agendar_invalidacao
+from dashboard.aquecimento import aquecer_empresa
+from app.background import executar_em_segundo_plano
 
 logger = logging.getLogger(__name__)
 
@@ -235,6 +238,11 @@ class FileUploadViewSet(viewsets.ModelViewSet):
                 file_upload.records_updated = saved_data['updated']
                 file_upload.processed_at = timezone.now()
                 file_upload.save()
+
+                # Com os dados novos gravados, recalcula os painéis mais usados em segundo plano
+                if file_upload.empresa_id:
+                    empresa_id = file_upload.empresa_id
+                    transaction.on_commit(lambda: executar_em_segundo_plano(aquecer_empresa, empresa_id))
                 
                 return {
                     'success': True,
@@ -400,20 +408,26 @@ class FileUploadViewSet(viewsets.ModelViewSet):
         # 3) Persiste/atualiza objetos Venda consolidados por semana
         # ------------------------------------------------------------------
         for (year_number, week_number, plataforma_reg), totals in weekly_totals.items():
-            venda_obj, created_flag = Venda.objects.get_or_create(
+            # Ano/semana ISO: o `ano` de Venda é o ano civil da data e não casa
+            # com as semanas que atravessam a virada do ano. Cargas antigas podem
+            # ter deixado duas vendas na mesma semana: soma na mais antiga
+            venda_obj = Venda.objects.filter(
                 empresa=empresa,
-                ano=year_number,
-                semana=str(week_number),
+                iso_ano=year_number,
+                iso_semana=week_number,
                 plataforma=plataforma_reg,
-                defaults={
-                    'data': totals['data'],
-                    'invest_realizado': totals['invest_realizado'],
-                    'leads': totals['leads'],
-                    'conversoes': totals['conversoes'],
-                }
-            )
+            ).order_by('id').first()
 
-            if not created_flag:
+            if venda_obj is None:
+                venda_obj = Venda(
+                    empresa=empresa,
+                    plataforma=plataforma_reg,
+                    data=totals['data'],
+                    invest_realizado=totals['invest_realizado'],
+                    leads=totals['leads'],
+                    conversoes=totals['conversoes'],
+                )
+            else:
                 # Mantém menor data (segunda-feira) registrada na semana
                 if venda_obj.data > totals['data']:
                     venda_obj.data = totals['data']
@@ -421,9 +435,11 @@ class FileUploadViewSet(viewsets.ModelViewSet):
                 venda_obj.invest_realizado += totals['invest_realizado']
                 venda_obj.leads += totals['leads']
                 venda_obj.conversoes += totals['conversoes']
-            # Salva após alterações ou criação (save() já chamado em get_or_create se created)
             venda_obj.save()
 
+        # Uma única invalidação do dashboard para a carga inteira, após o commit
+        agendar_invalidacao(getattr(empresa, 'id', None))
+
         return {
             'created': created_count,
             'updated': updated_count
@@ -0,0 +1,69 @@
+"""
+Execução de tarefas em segundo plano dentro do próprio processo.
+
+Pool pequeno de threads para trabalhos que não precisam atrasar a resposta
+(aquecer cache, por exemplo). Cada tarefa fecha as conexões de banco da sua
+thread ao terminar, e erros são registrados no log em vez de se perderem.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obter_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 2),
+                thread_name_prefix='segundo-plano'
+            )
+        return _executor
+
+
+def _executar(funcao, args, kwargs):
+    close_old_connections()
+    try:
+        return funcao(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"[SEGUNDO PLANO] Erro em {getattr(funcao, '__name__', funcao)}: {str(e)}")
+        raise
+    finally:
+        connections.close_all()
+
+
+def executar_em_segundo_plano(funcao, *args, **kwargs):
+    """Agenda `funcao(*args, **kwargs)` no pool e devolve o Future."""
+    return _obter_executor().submit(_executar, funcao, args, kwargs)
+
+
+def agendar_periodicamente(funcao, intervalo, nome):
+    """
+    Executa `funcao()` a cada `intervalo` segundos em uma thread daemon.
+
+    Devolve o Event que interrompe o agendamento quando setado.
+    """
+    parar = threading.Event()
+
+    def laco():
+        while not parar.wait(intervalo):
+            _executar_seguro(funcao)
+
+    threading.Thread(target=laco, name=nome, daemon=True).start()
+    return parar
+
+
+def _executar_seguro(funcao):
+    try:
+        _executar(funcao, (), {})
+    except Exception:
+        # Já registrado em _executar; o agendamento continua no próximo intervalo
+        pass
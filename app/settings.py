@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'ai_marketing_agent',
     'asaas',
     'influencer',
+    'exportacoes',
 ]
 
 MIDDLEWARE = [
@@ -123,6 +125,49 @@ else:
     }
 
 
+# Cache compartilhado entre os workers: Redis em produção (REDIS_URL) e arquivos
+# em disco no desenvolvimento
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'smartstrategy',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('DJANGO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'smartstrategy_cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Cache do dashboard: as chaves levam a versão dos dados da empresa (invalidadas
+# por signals), então o TTL pode ser longo
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 60 * 60 * 6))
+# Janela extra em que um valor vencido ainda pode ser servido enquanto uma única
+# requisição recalcula (stale-while-revalidate); 0 desativa
+DASHBOARD_CACHE_STALE = int(os.getenv('DASHBOARD_CACHE_STALE', 0))
+# Tempo máximo (s) que uma requisição espera outra terminar o mesmo cálculo
+DASHBOARD_CACHE_LOCK_WAIT = float(os.getenv('DASHBOARD_CACHE_LOCK_WAIT', 5))
+
+# Cache da empresa resolvida pelo EmpresaMiddleware: entrada compartilhada
+# (invalidada pelos signals de Empresa) e LRU por processo de validade curta
+EMPRESA_CACHE_TIMEOUT = int(os.getenv('EMPRESA_CACHE_TIMEOUT', 60 * 60))
+EMPRESA_CACHE_LOCAL_TTL = int(os.getenv('EMPRESA_CACHE_LOCAL_TTL', 30))
+EMPRESA_CACHE_LOCAL_MAX = int(os.getenv('EMPRESA_CACHE_LOCAL_MAX', 1024))
+# Intervalo (s) do aquecimento periódico do cache no processo web (iniciado por
+# app.wsgi/app.asgi, não por comandos); 0 desativa (use o comando
+# aquecer_cache_dashboard no cron/agendador nesse caso)
+DASHBOARD_AQUECIMENTO_INTERVALO = int(os.getenv('DASHBOARD_AQUECIMENTO_INTERVALO', 0))
+
+# Clima das vendas (venda.clima): provedor 'wttr' (rede) ou 'local' (sem rede, para testes)
+CLIMA_PROVIDER = os.getenv('CLIMA_PROVIDER', 'wttr')
+CLIMA_CIDADE = os.getenv('CLIMA_CIDADE', 'Praia Grande')
+CLIMA_TIMEOUT = float(os.getenv('CLIMA_TIMEOUT', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -169,7 +214,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Configurações do DRF
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT validado uma vez por requisição (compartilhado com o EmpresaMiddleware)
+        'accounts.authentication.JWTAuthenticationPorRequisicao',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Aquecimento periódico do cache do dashboard só no servidor web (opcional)
+from dashboard.aquecimento import iniciar_aquecimento_periodico  # noqa: E402
+
+iniciar_aquecimento_periodico()
@@ -0,0 +1,108 @@
+"""
+Aquecimento do cache do dashboard.
+
+Pré-calcula os painéis mais abertos (mês atual, mês anterior e ano atual, para
+cada plataforma) das empresas com assinatura ativa, para que a primeira carga do
+dia, ou a primeira depois de uma importação, já encontre o cache pronto.
+"""
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from empresas.models import Empresa
+
+from .metricas import paineis_em_cache
+from .serializers import DashboardSerializer
+
+logger = logging.getLogger(__name__)
+
+PLATAFORMAS = ['todas', 'google', 'instagram', 'facebook']
+LOCK_AQUECIMENTO = 'dash:aquecimento:lock'
+
+
+def paineis_comuns(hoje=None):
+    """Parâmetros validados dos painéis aquecidos (os mesmos que a view recebe)."""
+    hoje = hoje or date.today()
+    ano_anterior, mes_anterior = (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+    especificacoes = []
+    for plataforma in PLATAFORMAS:
+        especificacoes += [
+            {'year': hoje.year, 'month': hoje.month, 'filterType': 'mes', 'plataforma': plataforma},
+            {'year': ano_anterior, 'month': mes_anterior, 'filterType': 'mes', 'plataforma': plataforma},
+            {'year': hoje.year, 'filterType': 'ano', 'plataforma': plataforma},
+        ]
+    paineis = []
+    for especificacao in especificacoes:
+        serializer = DashboardSerializer(data=especificacao)
+        serializer.is_valid(raise_exception=True)
+        paineis.append(serializer.validated_data)
+    return paineis
+
+
+def empresas_ativas():
+    """Empresas com assinatura ativa e não expirada."""
+    return Empresa.objects.filter(assinaturas__ativa=True, assinaturas__expirada=False).distinct()
+
+
+def aquecer_empresa(empresa, hoje=None):
+    """Calcula e grava no cache os painéis comuns da empresa; devolve quantos foram aquecidos."""
+    if not isinstance(empresa, Empresa):
+        empresa = Empresa.objects.filter(id=empresa).first()
+        if empresa is None:
+            return 0
+    paineis = paineis_comuns(hoje)
+    paineis_em_cache(empresa, paineis)
+    return len(paineis)
+
+
+def aquecer_cache(empresa_ids=None, hoje=None):
+    """
+    Aquece o cache das empresas informadas (padrão: todas com assinatura ativa).
+
+    Retorna {'empresas': n, 'paineis': n, 'erros': n}. Uma empresa com erro não
+    interrompe as demais.
+    """
+    empresas = empresas_ativas()
+    if empresa_ids:
+        empresas = empresas.filter(id__in=empresa_ids)
+
+    resultado = {'empresas': 0, 'paineis': 0, 'erros': 0}
+    for empresa in empresas.iterator():
+        try:
+            resultado['paineis'] += aquecer_empresa(empresa, hoje)
+            resultado['empresas'] += 1
+        except Exception as e:
+            resultado['erros'] += 1
+            logger.error(f"[AQUECIMENTO] Erro ao aquecer cache da empresa {empresa.id}: {str(e)}")
+    return resultado
+
+
+def aquecer_cache_agendado():
+    """Execução periódica: só um processo aquece por vez (lock no cache compartilhado)."""
+    intervalo = getattr(settings, 'DASHBOARD_AQUECIMENTO_INTERVALO', 0)
+    if not cache.add(LOCK_AQUECIMENTO, 1, timeout=max(int(intervalo) // 2, 60)):
+        return
+    resultado = aquecer_cache()
+    logger.info(f"[AQUECIMENTO] {resultado['paineis']} painéis aquecidos em {resultado['empresas']} empresa(s)")
+
+
+_agendamento = None
+
+
+def iniciar_aquecimento_periodico():
+    """
+    Liga o aquecimento periódico no processo web (chamado por app.wsgi/app.asgi).
+
+    Fica fora do AppConfig.ready para não rodar em migrate, shell, comandos e no
+    processo pai do autoreloader do runserver. Sem DASHBOARD_AQUECIMENTO_INTERVALO
+    não faz nada; chamadas repetidas no mesmo processo são ignoradas.
+    """
+    global _agendamento
+    intervalo = getattr(settings, 'DASHBOARD_AQUECIMENTO_INTERVALO', 0)
+    if not intervalo or _agendamento is not None:
+        return
+    from app.background import agendar_periodicamente
+
+    _agendamento = agendar_periodicamente(aquecer_cache_agendado, intervalo, 'aquecimento-dashboard')
@@ -0,0 +1,200 @@
+"""
+Versão dos dados do dashboard por empresa.
+
+Toda chave de cache do dashboard inclui a versão atual dos dados da empresa.
+Quando uma Venda ou um MarketingData muda, a versão é incrementada e as entradas
+antigas simplesmente deixam de ser lidas (expiram sozinhas), então o TTL pode ser
+longo sem servir números desatualizados.
+
+`obter_ou_calcular` garante que só uma requisição recalcula uma chave ausente ou
+vencida (as demais esperam o valor ou recebem o valor vencido), e conta acertos,
+falhas e esperas em contadores no próprio cache.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60 * 60 * 6)
+DASHBOARD_CACHE_STALE = getattr(settings, 'DASHBOARD_CACHE_STALE', 0)
+DASHBOARD_CACHE_LOCK_WAIT = getattr(settings, 'DASHBOARD_CACHE_LOCK_WAIT', 5)
+
+# Validade do lock: cobre o cálculo mais lento esperado; se o processo morrer
+# segurando o lock, outra requisição assume depois disso
+LOCK_TIMEOUT = 30
+INTERVALO_ESPERA = 0.05
+
+CONTADORES = ['acerto', 'falha', 'vencido', 'espera', 'espera_esgotada']
+
+
+def _chave_versao(empresa_id):
+    return f"dash:versao:{empresa_id}"
+
+
+def _versao_inicial():
+    # Baseada no relógio: se o contador for descartado pelo cache, a nova versão
+    # não coincide com nenhuma usada antes
+    return int(time.time() * 1000)
+
+
+def versao_dados(empresa_id):
+    """Versão atual dos dados da empresa (criada na primeira leitura)."""
+    if not empresa_id:
+        return 0
+    chave = _chave_versao(empresa_id)
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, _versao_inicial(), timeout=None)
+        versao = cache.get(chave, 0)
+    return versao
+
+
+def invalidar_dashboard(empresa_id):
+    """Incrementa a versão dos dados da empresa, invalidando todo o cache do dashboard dela."""
+    if not empresa_id:
+        return
+    chave = _chave_versao(empresa_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Contador ainda não existe (ou foi descartado): começa de uma versão nova
+        cache.set(chave, _versao_inicial(), timeout=None)
+
+
+def agendar_invalidacao(empresa_id):
+    """Invalida o cache da empresa depois do commit da transação atual (imediato fora de transação)."""
+    if not empresa_id:
+        return
+
+    def executar():
+        try:
+            invalidar_dashboard(empresa_id)
+        except Exception as e:
+            logger.error(f"[DASHBOARD CACHE] Erro ao invalidar cache da empresa {empresa_id}: {str(e)}")
+
+    transaction.on_commit(executar)
+
+
+def chave_dashboard(prefixo, empresa, *partes):
+    """Monta a chave de cache de um endpoint do dashboard com a versão dos dados da empresa."""
+    empresa_id = getattr(empresa, 'id', None)
+    versao = versao_dados(empresa_id)
+    return ':'.join(['dash', prefixo, str(empresa_id or 'anon'), str(versao)] + [str(p) for p in partes])
+
+
+# ----------------------------------------------------------------------
+# Cálculo com lock único (single-flight)
+# ----------------------------------------------------------------------
+
+def _chave_contador(nome):
+    return f"dash:stats:{nome}"
+
+
+def _contar(nome, quantidade=1):
+    if not quantidade:
+        return
+    chave = _chave_contador(nome)
+    try:
+        cache.incr(chave, quantidade)
+    except ValueError:
+        if not cache.add(chave, quantidade, timeout=None):
+            cache.incr(chave, quantidade)
+    except Exception as e:
+        logger.debug(f"[DASHBOARD CACHE] Contador {nome} indisponível: {str(e)}")
+
+
+def estatisticas_cache():
+    """Contadores de uso do cache do dashboard: {nome: valor} (aproximados no backend de arquivos, que não incrementa de forma atômica)."""
+    valores = cache.get_many([_chave_contador(nome) for nome in CONTADORES])
+    return {nome: valores.get(_chave_contador(nome), 0) for nome in CONTADORES}
+
+
+def zerar_estatisticas_cache():
+    cache.delete_many([_chave_contador(nome) for nome in CONTADORES])
+
+
+def _gravar(chave, valor, timeout, stale):
+    envelope = {'valor': valor, 'expira_em': time.time() + timeout}
+    cache.set(chave, envelope, timeout=timeout + stale)
+
+
+def _calcular_com_lock(chave, calcular, timeout, stale):
+    chave_lock = f"{chave}:lock"
+    if not cache.add(chave_lock, 1, timeout=LOCK_TIMEOUT):
+        return False, None
+    try:
+        valor = calcular()
+        _gravar(chave, valor, timeout, stale)
+        return True, valor
+    finally:
+        cache.delete(chave_lock)
+
+
+def obter_ou_calcular(chave, calcular, timeout=None, stale=None):
+    """
+    Lê `chave` do cache ou calcula o valor com `calcular()` uma única vez.
+
+    - Valor válido: devolvido direto (acerto).
+    - Valor vencido dentro da janela `stale`: quem conseguir o lock recalcula e os
+      demais recebem o valor vencido na hora (stale-while-revalidate).
+    - Valor ausente: quem conseguir o lock calcula; os demais esperam até
+      DASHBOARD_CACHE_LOCK_WAIT segundos pelo resultado e, se ele não chegar,
+      calculam por conta própria.
+    """
+    timeout = DASHBOARD_CACHE_TIMEOUT if timeout is None else timeout
+    stale = DASHBOARD_CACHE_STALE if stale is None else stale
+
+    envelope = cache.get(chave)
+    if envelope is not None:
+        if envelope['expira_em'] > time.time():
+            _contar('acerto')
+            return envelope['valor']
+        _contar('vencido')
+        calculado, valor = _calcular_com_lock(chave, calcular, timeout, stale)
+        return valor if calculado else envelope['valor']
+
+    _contar('falha')
+    calculado, valor = _calcular_com_lock(chave, calcular, timeout, stale)
+    if calculado:
+        return valor
+
+    # Outra requisição está calculando a mesma chave: espera o resultado
+    _contar('espera')
+    limite = time.monotonic() + DASHBOARD_CACHE_LOCK_WAIT
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        envelope = cache.get(chave)
+        if envelope is not None:
+            return envelope['valor']
+
+    _contar('espera_esgotada')
+    valor = calcular()
+    _gravar(chave, valor, timeout, stale)
+    return valor
+
+
+def obter_varios(chaves):
+    """Valores ainda válidos de várias chaves em uma ida ao cache: {chave: valor}."""
+    agora = time.time()
+    encontrados = {}
+    for chave, envelope in cache.get_many(chaves).items():
+        if envelope['expira_em'] > agora:
+            encontrados[chave] = envelope['valor']
+    _contar('acerto', len(encontrados))
+    _contar('falha', len(set(chaves)) - len(encontrados))
+    return encontrados
+
+
+def gravar_varios(valores, timeout=None, stale=None):
+    """Grava vários valores {chave: valor} no mesmo formato usado por `obter_ou_calcular`."""
+    timeout = DASHBOARD_CACHE_TIMEOUT if timeout is None else timeout
+    stale = DASHBOARD_CACHE_STALE if stale is None else stale
+    expira_em = time.time() + timeout
+    cache.set_many(
+        {chave: {'valor': valor, 'expira_em': expira_em} for chave, valor in valores.items()},
+        timeout=timeout + stale
+    )
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.aquecimento import aquecer_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Pré-calcula no cache os painéis mais usados do dashboard (mês atual, mês anterior '
+        'e ano atual por plataforma) das empresas com assinatura ativa.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas com assinatura ativa.')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resultado = aquecer_cache(options['empresas'])
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['paineis']} painéis aquecidos em {resultado['empresas']} empresa(s) em {duracao:.1f}s."
+        ))
+        if resultado['erros']:
+            self.stdout.write(self.style.WARNING(f"{resultado['erros']} empresa(s) com erro (ver log)."))
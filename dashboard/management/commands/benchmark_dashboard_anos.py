@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Avg, Sum
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from dashboard.views import CAMPOS_ANUAIS, AllYearsDashboardAPIView
+from empresas.models import Empresa
+from venda.models import MESES_PT, Venda
+from venda.resumos import reconstruir_resumos
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o endpoint de todos os anos (loop por ano x consulta agrupada) em uma '
+        'empresa sintética. Tudo roda dentro de uma transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--anos', type=int, default=10, help='Anos de histórico da empresa sintética.')
+        parser.add_argument('--por-dia', type=int, default=1, help='Vendas por dia.')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções de cada cenário.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            try:
+                empresa = self._criar_empresa(options['anos'], options['por_dia'])
+                self._comparar(empresa, options['repeticoes'])
+            finally:
+                transaction.set_rollback(True)
+
+    def _criar_empresa(self, anos, por_dia):
+        aleatorio = random.Random(42)
+        empresa = Empresa.objects.create(
+            tipo='PJ', sigla='BENCH10', razao_social='Benchmark', cnpj='00000000000000',
+            email_comercial='benchmark@example.com', telefone1='0'
+        )
+        hoje = date.today()
+        dia = date(hoje.year - anos, 1, 1)
+        vendas = []
+        while dia < date(hoje.year, 1, 1):
+            for _ in range(por_dia):
+                invest = Decimal(aleatorio.randint(50, 500))
+                fat_camp = Decimal(aleatorio.randint(0, 2000))
+                leads = aleatorio.randint(1, 40)
+                clientes = aleatorio.randint(0, 10)
+                vendas.append(Venda(
+                    empresa=empresa, data=dia, mes=MESES_PT[dia.month], ano=dia.year,
+                    semana=str(dia.isocalendar()[1]), plataforma=aleatorio.choice(['google', 'instagram', 'facebook']),
+                    invest_realizado=invest, invest_projetado=invest + 50,
+                    vendas_google=Decimal(aleatorio.randint(0, 900)), vendas_instagram=Decimal(aleatorio.randint(0, 900)),
+                    vendas_facebook=Decimal(aleatorio.randint(0, 900)), fat_proj=Decimal(3000),
+                    fat_camp_realizado=fat_camp, fat_geral=fat_camp + 1000,
+                    ticket_medio_realizado=Decimal(aleatorio.randint(10, 90)),
+                    roi_realizado=((fat_camp - invest) / invest).quantize(Decimal('0.01')),
+                    cac_realizado=(invest / clientes).quantize(Decimal('0.01')) if clientes else Decimal(0),
+                    taxa_conversao=(Decimal(clientes) / leads).quantize(Decimal('0.001')),
+                    leads=leads, clientes_novos=clientes, clientes_recorrentes=aleatorio.randint(0, 8), conversoes=clientes,
+                ))
+            dia += timedelta(days=1)
+        # bulk_create não dispara os signals: os resumos são reconstruídos de uma vez
+        Venda.objects.bulk_create(vendas, batch_size=1000)
+        reconstruir_resumos([empresa.id])
+        self.stdout.write(f"Empresa sintética: {len(vendas)} vendas em {anos} anos.")
+        return empresa
+
+    def _comparar(self, empresa, repeticoes):
+        requisicao = RequestFactory().get('/api/dashboard/all-years/', {'plataforma': 'todas'})
+        requisicao.empresa = empresa
+        view = AllYearsDashboardAPIView()
+        view.request = Request(requisicao)
+
+        cenarios = [
+            ('Loop por ano (linhas de Venda)', lambda: self._loop_por_ano(empresa)),
+            ('Agrupado por ano (resumos)', lambda: view.calcular_anos(list(CAMPOS_ANUAIS))),
+            ('Agrupado, fields=faturamento,invest_realizado', lambda: view.calcular_anos(['invest_realizado', 'faturamento'])),
+        ]
+        for nome, executar in cenarios:
+            with CaptureQueriesContext(connection) as consultas:
+                executar()
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                executar()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            self.stdout.write(
+                f"{nome}: {statistics.median(tempos):.2f} ms (mediana de {repeticoes}), "
+                f"{len(consultas.captured_queries)} consulta(s)"
+            )
+
+    @staticmethod
+    def _loop_por_ano(empresa):
+        """Implementação anterior: lista os anos e agrega cada um separadamente."""
+        vendas = Venda.objects.filter(empresa=empresa)
+        agregacoes = {
+            chave: Avg(campo) if tipo == 'media' else Sum(campo)
+            for chave, (tipo, campo) in CAMPOS_ANUAIS.items()
+        }
+        anos = list(vendas.values_list('ano', flat=True).distinct().order_by('ano'))
+        return {ano: vendas.filter(ano=ano).aggregate(**agregacoes) for ano in anos}
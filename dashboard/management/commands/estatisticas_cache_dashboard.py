@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.cache_utils import estatisticas_cache, zerar_estatisticas_cache
+
+
+class Command(BaseCommand):
+    help = 'Mostra os contadores de acerto/falha/espera do cache do dashboard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zerar', action='store_true',
+                            help='Zera os contadores depois de exibir.')
+
+    def handle(self, *args, **options):
+        stats = estatisticas_cache()
+        for nome, valor in stats.items():
+            self.stdout.write(f"{nome}: {valor}")
+
+        consultas = stats['acerto'] + stats['falha'] + stats['vencido']
+        if consultas:
+            taxa = stats['acerto'] / consultas * 100
+            self.stdout.write(self.style.SUCCESS(f"Taxa de acerto: {taxa:.1f}% de {consultas} leitura(s)."))
+
+        if options['zerar']:
+            zerar_estatisticas_cache()
+            self.stdout.write('Contadores zerados.')
@@ -0,0 +1,434 @@
+"""
+Motor de métricas do dashboard (DashboardAPIView e VendaViewSet.dashboard).
+
+Um painel (ano, mês, tipo de filtro, plataforma e tipo de comparação) precisa do
+período principal, da série histórica, do período de comparação, das médias e das
+séries semanais. Em vez de uma consulta por bloco, o motor lê de uma vez os resumos
+semanais (agrupados por plataforma, ano, mês e semana) de todos os meses que os
+painéis pedidos envolvem e, quando há série diária, os resumos diários do período.
+Todos os blocos são derivados em memória: no máximo duas idas ao banco por carga,
+qualquer que seja o número de painéis. O painel resumido de /api/vendas/dashboard/
+usa a mesma leitura dos fragmentos semanais e a mesma camada de cache.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q
+
+from venda.models import MESES_PT, VendaResumoDiario, VendaResumoSemanal
+from venda.resumos import CAMPOS_RESUMO, ESCOPO_TODAS, escopo_plataforma
+
+from .cache_utils import chave_dashboard, gravar_varios, obter_ou_calcular, obter_varios
+from .serializers import DashboardDataSerializer
+from .series import series_semanais
+
+# Chave da resposta -> campo somado nos resumos
+METRICAS_SOMA = [
+    ('invest_realizado', 'invest_realizado'),
+    ('invest_projetado', 'invest_projetado'),
+    ('faturamento', 'fat_geral'),
+    ('faturamento_campanha', 'fat_camp_realizado'),
+    ('clientes_novos', 'clientes_novos'),
+    ('clientes_recorrentes', 'clientes_recorrentes'),
+    ('leads', 'leads'),
+    ('vendas_google', 'vendas_google'),
+    ('vendas_instagram', 'vendas_instagram'),
+    ('vendas_facebook', 'vendas_facebook'),
+]
+# Chave da resposta -> KPI exibido como média das vendas
+METRICAS_MEDIA = [
+    ('roi', 'roi_realizado'),
+    ('ticket_medio', 'ticket_medio_realizado'),
+    ('taxa_conversao', 'taxa_conversao'),
+    ('cac', 'cac_realizado'),
+]
+CHAVES_MEDIAS = [f'{chave}_avg' for chave, _ in METRICAS_SOMA + METRICAS_MEDIA]
+
+# Séries históricas: chave na resposta -> campo somado / KPI médio
+SERIES_SOMA = [
+    ('invest_realizado_data', 'invest_realizado', float),
+    ('invest_projetado_data', 'invest_projetado', float),
+    ('fat_camp_realizado_data', 'fat_camp_realizado', float),
+    ('fat_geral_data', 'fat_geral', float),
+    ('leads_data', 'leads', int),
+    ('clientes_novos_data', 'clientes_novos', int),
+    ('clientes_recorrentes_data', 'clientes_recorrentes', int),
+    ('vendas_google_data', 'vendas_google', float),
+    ('vendas_instagram_data', 'vendas_instagram', float),
+    ('vendas_facebook_data', 'vendas_facebook', float),
+]
+SERIES_MEDIA = [
+    ('taxa_conversao_data', 'taxa_conversao'),
+    ('roi_data', 'roi_realizado'),
+    ('ticket_medio_data', 'ticket_medio_realizado'),
+    ('cac_data', 'cac_realizado'),
+]
+# Campos das séries semanais (mês atual x mês anterior)
+CAMPOS_SEMANAIS = ['fat_camp_realizado', 'fat_geral']
+# Médias repetidas ao longo do gráfico
+SERIES_MEDIAS = ['roi', 'ticket_medio', 'taxa_conversao', 'cac', 'faturamento', 'clientes_novos', 'leads', 'invest_realizado']
+
+
+def ler_semanais(empresa, meses_por_escopo):
+    """
+    Fragmentos semanais da empresa nos meses de cada escopo, em uma consulta.
+
+    Recebe {escopo: {(ano, mes), ...}} e devolve {(escopo, ano, mes): [linhas]},
+    com as linhas em ordem cronológica de semana ISO.
+    """
+    if not empresa or not meses_por_escopo:
+        return {}
+
+    filtro = Q()
+    for escopo, meses in meses_por_escopo.items():
+        por_ano = {}
+        for ano, mes in meses:
+            por_ano.setdefault(ano, set()).add(mes)
+        for ano, lista_meses in por_ano.items():
+            filtro |= Q(plataforma=escopo, ano=ano, mes__in=sorted(lista_meses))
+
+    semanais = {}
+    linhas = (
+        VendaResumoSemanal.objects.filter(empresa=empresa).filter(filtro)
+        .values('plataforma', 'ano', 'mes', 'iso_ano', 'semana', *CAMPOS_RESUMO)
+        # Em janeiro a semana 52/53 do ano ISO anterior vem antes da semana 1
+        .order_by('plataforma', 'ano', 'mes', 'iso_ano', 'semana')
+    )
+    for linha in linhas:
+        semanais.setdefault((linha['plataforma'], linha['ano'], linha['mes']), []).append(linha)
+    return semanais
+
+
+def _mes_anterior(ano, mes):
+    return (ano - 1, 12) if mes == 1 else (ano, mes - 1)
+
+
+def _somar(linhas):
+    """Soma linhas de resumo campo a campo."""
+    total = dict.fromkeys(CAMPOS_RESUMO, 0)
+    for linha in linhas:
+        for campo in CAMPOS_RESUMO:
+            total[campo] += linha[campo]
+    return total
+
+
+def _media(total, campo):
+    """Média de um KPI a partir de soma e quantidade; None quando não há valores."""
+    quantidade = total[f'{campo}_qtd']
+    return total[f'{campo}_soma'] / quantidade if quantidade else None
+
+
+def _media_simples(valores):
+    valores = [v for v in valores if v is not None]
+    return sum(valores) / len(valores) if valores else 0
+
+
+def _metricas(total):
+    metricas = {chave: total[campo] for chave, campo in METRICAS_SOMA}
+    metricas.update({chave: _media(total, campo) for chave, campo in METRICAS_MEDIA})
+    return metricas
+
+
+def _tem_dados(medias):
+    """Ao menos um dos indicadores principais diferente de zero."""
+    return any(medias.get(chave) for chave in ('faturamento_avg', 'clientes_novos_avg', 'leads_avg', 'invest_realizado_avg'))
+
+
+class PainelDashboard:
+    """Períodos envolvidos em um painel do dashboard, a partir dos parâmetros validados."""
+
+    def __init__(self, params):
+        self.year = params['year']
+        self.month = params.get('month')
+        self.filter_type = params['filterType']
+        self.comparison_type = params.get('comparisonType') or 'mes_anterior'
+        self.comparison_month = params.get('comparisonMonth')
+        self.comparison_year = params.get('comparisonYear')
+        self.escopo = escopo_plataforma(params.get('plataforma'))
+
+        year, month = self.year, self.month
+        ano_inteiro = [(year, m) for m in range(1, 13)]
+
+        # Período principal
+        if month and self.filter_type != 'ano':
+            self.meses_principais = [(year, month)]
+        else:
+            self.meses_principais = ano_inteiro
+
+        # Série diária (qualquer filtro que não seja o anual)
+        self.serie_diaria = self.filter_type != 'ano'
+
+        # Período de comparação e séries semanais
+        self.meses_comparacao = []
+        self.meses_semanais = []
+        if self.filter_type == 'mes' and month:
+            tipo = self.comparison_type
+            if tipo == 'mes_anterior':
+                self.meses_comparacao = [_mes_anterior(year, month)]
+            elif tipo == 'mes_aleatorio':
+                # Se não foram fornecidos, usa valores padrão (junho do ano atual)
+                self.meses_comparacao = [(int(self.comparison_year or year), int(self.comparison_month or 6))]
+            elif tipo == 'media_ano':
+                self.meses_comparacao = [(year, m) for m in range(1, month + 1)]
+            elif tipo == 'ano_anterior':
+                self.meses_comparacao = [(year - 1, month)]
+            elif tipo == 'ano_especifico':
+                self.meses_comparacao = [(int(self.comparison_year or year - 1), month)]
+            self.meses_semanais = [(year, month), _mes_anterior(year, month)]
+        elif self.filter_type == 'ano':
+            ano_comparacao = year
+            if self.comparison_type == 'ano_anterior':
+                ano_comparacao = year - 1
+            elif self.comparison_type == 'ano_especifico':
+                ano_comparacao = int(self.comparison_year or year - 1)
+            self.meses_comparacao = [(ano_comparacao, m) for m in range(1, 13)]
+
+    def meses(self):
+        return set(self.meses_principais) | set(self.meses_comparacao) | set(self.meses_semanais)
+
+    def intervalo_diario(self):
+        if self.month:
+            inicio = date(self.year, self.month, 1)
+            fim = date(self.year + 1, 1, 1) if self.month == 12 else date(self.year, self.month + 1, 1)
+        else:
+            inicio, fim = date(self.year, 1, 1), date(self.year + 1, 1, 1)
+        return inicio, fim
+
+
+class MetricasDashboard:
+    """Calcula um ou mais painéis do dashboard da empresa com uma leitura agrupada dos resumos."""
+
+    def __init__(self, empresa):
+        self.empresa = empresa
+
+    def calcular(self, lista_params):
+        """Recebe parâmetros validados (DashboardSerializer) e devolve os dados de cada painel."""
+        paineis = [PainelDashboard(params) for params in lista_params]
+        semanais = self._carregar_semanais(paineis)
+        diarios = self._carregar_diarios(paineis)
+        return [self._montar(painel, semanais, diarios) for painel in paineis]
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def _carregar_semanais(self, paineis):
+        """Fragmentos semanais de todos os meses pedidos: {(escopo, ano, mes): [linhas]}."""
+        meses_por_escopo = {}
+        for painel in paineis:
+            meses_por_escopo.setdefault(painel.escopo, set()).update(painel.meses())
+        return ler_semanais(self.empresa, meses_por_escopo)
+
+    def _carregar_diarios(self, paineis):
+        """Resumos diários dos períodos com série diária: {escopo: [linhas]}."""
+        intervalos = [(painel.escopo, painel.intervalo_diario()) for painel in paineis if painel.serie_diaria]
+        if not self.empresa or not intervalos:
+            return {}
+
+        filtro = Q()
+        for escopo, (inicio, fim) in set(intervalos):
+            filtro |= Q(plataforma=escopo, data__gte=inicio, data__lt=fim)
+
+        diarios = {}
+        linhas = (
+            VendaResumoDiario.objects.filter(empresa=self.empresa).filter(filtro)
+            .values('plataforma', 'data', *CAMPOS_RESUMO)
+            .order_by('plataforma', 'data')
+        )
+        for linha in linhas:
+            diarios.setdefault(linha['plataforma'], []).append(linha)
+        return diarios
+
+    # ------------------------------------------------------------------
+    # Montagem
+    # ------------------------------------------------------------------
+
+    def _montar(self, painel, semanais, diarios):
+        mensais = {}
+        for ano, mes in painel.meses():
+            linhas = semanais.get((painel.escopo, ano, mes))
+            if linhas:
+                mensais[(ano, mes)] = _somar(linhas)
+
+        def totais(meses):
+            return [mensais[m] for m in meses if m in mensais]
+
+        metrics = _metricas(_somar(totais(painel.meses_principais)))
+
+        # Série histórica: meses do ano (filtro anual) ou dias do período
+        if painel.filter_type == 'ano':
+            historico = [(MESES_PT[mes], mensais[(ano, mes)]) for ano, mes in painel.meses_principais if (ano, mes) in mensais]
+        else:
+            inicio, fim = painel.intervalo_diario()
+            historico = [
+                (linha['data'].strftime('%d/%m'), linha)
+                for linha in diarios.get(painel.escopo, [])
+                if inicio <= linha['data'] < fim
+            ]
+
+        yearly_metrics = self._medias(painel, totais(painel.meses_comparacao))
+
+        # Séries semanais do mês atual e do anterior
+        linhas_atual, linhas_anterior = [], []
+        if painel.meses_semanais:
+            atual, anterior = painel.meses_semanais
+            linhas_atual = semanais.get((painel.escopo,) + atual, [])
+            linhas_anterior = semanais.get((painel.escopo,) + anterior, [])
+        # Semanas reais cadastradas no mês (ex: [19, 20, 21])
+        semanas = series_semanais(linhas_atual, linhas_anterior, CAMPOS_SEMANAIS)
+
+        response_data = {chave: float(valor or 0) for chave, valor in metrics.items()}
+        for chave in ('clientes_novos', 'clientes_recorrentes', 'leads'):
+            response_data[chave] = int(metrics[chave] or 0)
+
+        response_data['labels'] = [rotulo for rotulo, _ in historico]
+        for chave, campo, tipo in SERIES_SOMA:
+            response_data[chave] = [tipo(linha[campo] or 0) for _, linha in historico]
+        for chave, campo in SERIES_MEDIA:
+            response_data[chave] = [float(_media(linha, campo) or 0) for _, linha in historico]
+        response_data['saldo_invest_data'] = [float(linha['invest_projetado'] - linha['invest_realizado']) for _, linha in historico]
+        response_data['saldo_fat_data'] = [float(linha['fat_geral'] - linha['fat_camp_realizado']) for _, linha in historico]
+
+        # Dados de média para os gráficos (mesmo valor para todos os pontos)
+        for chave in SERIES_MEDIAS:
+            response_data[f'{chave}_avg_data'] = [float(yearly_metrics.get(f'{chave}_avg', 0))] * len(historico)
+
+        response_data.update({
+            'weekly_labels': [f"Semana {w}" for w in semanas['semanas']],
+            'weekly_fat_camp_current': semanas['atual']['fat_camp_realizado'],
+            'weekly_fat_camp_previous': semanas['anterior']['fat_camp_realizado'],
+            'weekly_fat_geral_current': semanas['atual']['fat_geral'],
+            'weekly_fat_geral_previous': semanas['anterior']['fat_geral'],
+            'weekly_fat_camp_avg': semanas['media']['fat_camp_realizado'],
+            'weekly_fat_geral_avg': semanas['media']['fat_geral'],
+        })
+
+        # Adiciona as médias de comparação se existirem
+        if yearly_metrics:
+            response_data.update({chave: float(yearly_metrics.get(chave, 0)) for chave in CHAVES_MEDIAS})
+        return response_data
+
+    @staticmethod
+    def _medias(painel, meses):
+        """Bloco de comparação (chaves *_avg) a partir dos totais mensais do período de comparação."""
+        zeros = dict.fromkeys(CHAVES_MEDIAS, 0)
+        if painel.filter_type == 'mes' and painel.month:
+            if not meses:
+                return zeros
+            if painel.comparison_type == 'media_ano':
+                # Média dos meses: somas divididas pelo número de meses, KPIs pela média mensal
+                medias = {f'{chave}_avg': sum(m[campo] for m in meses) / len(meses) for chave, campo in METRICAS_SOMA}
+                medias.update({f'{chave}_avg': _media_simples(_media(m, campo) for m in meses) for chave, campo in METRICAS_MEDIA})
+            else:
+                # Comparação com mês específico: valores diretos
+                medias = {f'{chave}_avg': valor or 0 for chave, valor in _metricas(_somar(meses)).items()}
+            return medias if _tem_dados(medias) else zeros
+
+        if painel.filter_type == 'ano':
+            if not meses:
+                return zeros
+            # Totais do ano de comparação; KPIs pela média dos meses com valores
+            medias = {f'{chave}_avg': sum(m[campo] for m in meses) for chave, campo in METRICAS_SOMA}
+            medias.update({f'{chave}_avg': _media_simples(_media(m, campo) for m in meses) for chave, campo in METRICAS_MEDIA})
+            return medias
+
+        return {}
+
+
+def _numero(valor):
+    """Decimal -> float (como o JSONEncoder do DRF); inteiros e None ficam como estão."""
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+
+def _por_registro(total, campo):
+    """Média de um campo somado por linha de Venda; None quando não há vendas."""
+    return total[campo] / total['registros'] if total['registros'] else None
+
+
+def painel_vendas(empresa, year, month, week, filter_type):
+    """
+    Dados do GET /api/vendas/dashboard/ a partir dos fragmentos semanais do ano.
+
+    Métricas do mês, da semana ISO (`week`) ou do ano; médias anuais por venda;
+    série de um ponto por mês (filtro 'mes') ou por semana ISO (demais filtros).
+    """
+    semanais = ler_semanais(empresa, {ESCOPO_TODAS: {(year, mes) for mes in range(1, 13)}})
+    linhas_ano = [linha for mes in range(1, 13) for linha in semanais.get((ESCOPO_TODAS, year, mes), [])]
+
+    if filter_type == 'mes':
+        linhas = semanais.get((ESCOPO_TODAS, year, month), [])
+    elif filter_type == 'semana' and week:
+        linhas = [linha for linha in linhas_ano if linha['semana'] == int(week)]
+    else:
+        linhas = linhas_ano
+
+    # Como um aggregate sem linhas: somas e médias nulas
+    if linhas:
+        metrics = {chave: _numero(valor) for chave, valor in _metricas(_somar(linhas)).items()}
+    else:
+        metrics = dict.fromkeys([chave for chave, _ in METRICAS_SOMA + METRICAS_MEDIA])
+
+    total_ano = _somar(linhas_ano)
+    yearly_metrics = {f'{chave}_avg': _numero(_por_registro(total_ano, campo)) for chave, campo in METRICAS_SOMA}
+    yearly_metrics.update({f'{chave}_avg': _numero(_media(total_ano, campo)) for chave, campo in METRICAS_MEDIA})
+
+    if filter_type == 'mes':
+        historico = [(date(year, month, 1).strftime('%B'), _somar(linhas))] if linhas else []
+    else:
+        por_semana = {}
+        for linha in linhas:
+            por_semana.setdefault((linha['iso_ano'], linha['semana']), []).append(linha)
+        historico = [(f"Semana {semana}", _somar(por_semana[(iso_ano, semana)])) for iso_ano, semana in sorted(por_semana)]
+
+    response_data = {**metrics, **yearly_metrics, 'labels': [rotulo for rotulo, _ in historico]}
+    for chave, campo, _ in SERIES_SOMA:
+        response_data[chave] = [float(total[campo] or 0) for _, total in historico]
+    for chave, campo in SERIES_MEDIA:
+        response_data[chave] = [float(_media(total, campo) or 0) for _, total in historico]
+    return response_data
+
+
+def painel_vendas_em_cache(empresa, year, month, week, filter_type):
+    """painel_vendas com a mesma camada de cache (versionada por empresa) dos painéis do dashboard."""
+    # month só muda o resultado no filtro mensal; week só no semanal
+    chave = chave_dashboard(
+        'vendas_painel', empresa, year, filter_type,
+        month if filter_type == 'mes' else None,
+        week if filter_type == 'semana' else None,
+    )
+    return obter_ou_calcular(chave, lambda: painel_vendas(empresa, year, month, week, filter_type))
+
+
+def chave_painel(empresa, params):
+    """Chave de cache de um painel; plataforma ausente e 'todas' compartilham a mesma chave."""
+    return chave_dashboard(
+        'painel', empresa, params['year'], params.get('month'), params['filterType'],
+        escopo_plataforma(params.get('plataforma')), params.get('comparisonType'),
+        params.get('comparisonMonth'), params.get('comparisonYear')
+    )
+
+
+def paineis_em_cache(empresa, lista_params):
+    """
+    Dados serializados de cada painel, na ordem recebida.
+
+    Painéis já em cache vêm de uma única leitura (get_many); os demais (sem repetir
+    chaves iguais) são calculados juntos pelo motor e gravados de uma vez.
+    """
+    chaves = [chave_painel(empresa, params) for params in lista_params]
+    em_cache = obter_varios(chaves)
+
+    pendentes = {}
+    for chave, params in zip(chaves, lista_params):
+        if chave not in em_cache and chave not in pendentes:
+            pendentes[chave] = params
+    if pendentes:
+        calculados = MetricasDashboard(empresa).calcular(list(pendentes.values()))
+        novos = {
+            chave: dict(DashboardDataSerializer(dados).data)
+            for chave, dados in zip(pendentes, calculados)
+        }
+        gravar_varios(novos)
+        em_cache.update(novos)
+
+    return [em_cache[chave] for chave in chaves]
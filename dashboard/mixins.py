@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache_utils import versao_dados
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional (ETag / If-None-Match) para endpoints que dependem só das
+    vendas da empresa e dos parâmetros da requisição.
+
+    O ETag é derivado da versão dos dados da empresa (incrementada a cada
+    alteração de Venda/MarketingData) e dos parâmetros normalizados, então pode
+    ser calculado sem consultar o banco. O handler chama `resposta_nao_modificada`
+    antes de qualquer agregação e devolve o 304 quando o cliente já tem a versão atual.
+    """
+    etag_escopo = None
+
+    def calcular_etag(self, request):
+        empresa_id = getattr(getattr(request, 'empresa', None), 'id', None)
+        parametros = sorted((chave, sorted(request.query_params.getlist(chave))) for chave in request.query_params)
+        base = json.dumps([
+            self.etag_escopo or self.__class__.__name__,
+            getattr(self, 'action', None),
+            # Cada representação (JSON, colunar...) tem o seu ETag
+            getattr(getattr(request, 'accepted_renderer', None), 'format', None),
+            empresa_id,
+            versao_dados(empresa_id),
+            parametros,
+        ], default=str)
+        return '"%s"' % hashlib.sha256(base.encode()).hexdigest()[:40]
+
+    def resposta_nao_modificada(self, request):
+        """Response 304 se o If-None-Match bate com o ETag atual; senão None."""
+        self._etag = self.calcular_etag(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+        etags_cliente = [etag.strip() for etag in if_none_match.split(',') if etag.strip()]
+        if self._etag in etags_cliente or '*' in etags_cliente:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': self._etag})
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Resposta por empresa: o navegador guarda, mas sempre revalida
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Accept'])
+        return response
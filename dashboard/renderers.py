@@ -0,0 +1,80 @@
+"""
+Formato colunar compacto para as respostas do dashboard.
+
+Layout binário (little-endian):
+
+    [4 bytes: tamanho N do cabeçalho][N bytes: cabeçalho JSON UTF-8, com espaços
+    até alinhar em 4 bytes][float32 * total: séries numéricas concatenadas]
+
+O cabeçalho traz os valores escalares (totais e médias, exatos), as listas de
+texto (rótulos), as séries constantes {nome: [valor, tamanho]} (as linhas de
+média dos gráficos) e o dicionário de colunas {nome: [início, tamanho]}
+apontando para o buffer float32. No cliente: `new Float32Array(buffer, 4 + N)`.
+"""
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+VERSAO_FORMATO = 1
+
+
+def _numerica(valores):
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in valores)
+
+
+class ColunarRenderer(BaseRenderer):
+    media_type = 'application/vnd.smartstrategy.colunar'
+    format = 'colunar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        escalares, textos, constantes, colunas, series = {}, {}, {}, {}, []
+        inicio = 0
+        for chave, valor in data.items():
+            if isinstance(valor, (list, tuple)) and valor and _numerica(valor):
+                if len(valor) > 1 and all(v == valor[0] for v in valor):
+                    constantes[chave] = [valor[0], len(valor)]
+                    continue
+                colunas[chave] = [inicio, len(valor)]
+                series.append(np.asarray(valor, dtype='<f4'))
+                inicio += len(valor)
+            elif isinstance(valor, (list, tuple)) and not valor:
+                colunas[chave] = [inicio, 0]
+            elif isinstance(valor, (list, tuple)):
+                textos[chave] = list(valor)
+            else:
+                escalares[chave] = valor
+
+        cabecalho = json.dumps({
+            'versao': VERSAO_FORMATO,
+            'escalares': escalares,
+            'textos': textos,
+            'constantes': constantes,
+            'colunas': colunas,
+        }, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # Alinha o início do buffer em 4 bytes para leitura direta como Float32Array
+        cabecalho += b' ' * (-(len(cabecalho) + 4) % 4)
+
+        buffer = np.concatenate(series).tobytes() if series else b''
+        return struct.pack('<I', len(cabecalho)) + cabecalho + buffer
+
+
+def ler_colunar(conteudo):
+    """Decodifica uma resposta colunar de volta para um dicionário (útil para clientes Python e depuração)."""
+    (tamanho,) = struct.unpack_from('<I', conteudo)
+    cabecalho = json.loads(conteudo[4:4 + tamanho])
+    valores = np.frombuffer(conteudo, dtype='<f4', offset=4 + tamanho)
+    dados = dict(cabecalho['escalares'])
+    dados.update(cabecalho['textos'])
+    for chave, (valor, quantidade) in cabecalho['constantes'].items():
+        dados[chave] = [valor] * quantidade
+    for chave, (inicio, quantidade) in cabecalho['colunas'].items():
+        dados[chave] = valores[inicio:inicio + quantidade].tolist()
+    return dados
@@ -12,6 +12,7 @@ class DashboardSerializer(serializers.Serializer):
     filterType = serializers.ChoiceField(choices=['ano', 'mes', 'todos_anos'], required=True)
     comparisonMonth = serializers.IntegerField(required=False, allow_null=True)
     comparisonYear = serializers.IntegerField(required=False, allow_null=True)
+    plataforma = serializers.CharField(required=False, allow_blank=True, allow_null=True)
 
     def validate(self, data):
         if data['filterType'] == 'mes' and not data.get('month'):
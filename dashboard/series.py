@@ -0,0 +1,54 @@
+"""
+Séries semanais dos gráficos do dashboard.
+
+As linhas agrupadas por semana viram uma matriz (semanas x métricas) e todas as
+séries (semana atual, mês anterior alinhado e média) saem de operações vetoriais
+sobre ela, em vez de um dicionário e um laço por métrica.
+"""
+import numpy as np
+
+
+def _matriz(linhas, campos):
+    """Números das semanas e matriz de valores (semanas x campos) das linhas agrupadas."""
+    semanas = np.fromiter((int(linha['semana']) for linha in linhas), dtype=np.int64, count=len(linhas))
+    valores = np.array(
+        [[float(linha[campo] or 0) for campo in campos] for linha in linhas],
+        dtype=np.float64
+    ).reshape(len(linhas), len(campos))
+    return semanas, valores
+
+
+def series_semanais(linhas_atual, linhas_anterior, campos):
+    """
+    Monta as séries semanais de cada campo a partir das semanas do período atual.
+
+    - atual: valor de cada semana cadastrada no período atual;
+    - anterior: valor da mesma semana no período anterior ou, sem ela, a média
+      das semanas do período anterior (zeros se ele não tiver dados);
+    - media: total do período atual dividido pelo número de semanas com valor
+      (todas, se nenhuma tiver), repetido em cada ponto.
+
+    Retorna {'semanas': [...], 'atual': {campo: [...]}, 'anterior': {...}, 'media': {...}}.
+    """
+    semanas, atual = _matriz(linhas_atual, campos)
+    semanas_anterior, valores_anterior = _matriz(linhas_anterior, campos)
+
+    if len(semanas_anterior):
+        anterior = np.repeat(valores_anterior.mean(axis=0, keepdims=True), len(semanas), axis=0)
+        _, indice_atual, indice_anterior = np.intersect1d(semanas, semanas_anterior, return_indices=True)
+        anterior[indice_atual] = valores_anterior[indice_anterior]
+    else:
+        anterior = np.zeros_like(atual)
+
+    com_valor = np.count_nonzero(atual, axis=0)
+    divisor = np.where(com_valor > 0, com_valor, len(semanas))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = np.nan_to_num(atual.sum(axis=0) / divisor)
+    media = np.repeat(medias[np.newaxis, :], len(semanas), axis=0)
+
+    return {
+        'semanas': semanas.tolist(),
+        'atual': {campo: atual[:, i].tolist() for i, campo in enumerate(campos)},
+        'anterior': {campo: anterior[:, i].tolist() for i, campo in enumerate(campos)},
+        'media': {campo: media[:, i].tolist() for i, campo in enumerate(campos)},
+    }
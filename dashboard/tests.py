@@ -1,3 +1,318 @@
-from django.test import TestCase
+import math
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from empresas.models import Empresa
+from venda.models import Venda
+from venda.resumos import reconstruir_resumos
+
+from . import cache_utils
+from .cache_utils import LOCK_TIMEOUT, estatisticas_cache, invalidar_dashboard, obter_ou_calcular
+from .metricas import MetricasDashboard
+from .renderers import ColunarRenderer, ler_colunar
+from .serializers import DashboardSerializer
+from .views import DashboardAPIView
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _params(**dados):
+    serializer = DashboardSerializer(data=dados)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class MetricasDashboardTests(TestCase):
+    """O motor de métricas lê só os resumos: o número de consultas não depende dos painéis nem das vendas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        plataformas = ['google', 'instagram', 'facebook']
+        vendas = []
+        for mes in (1, 2, 3):
+            for dia in range(1, 11):
+                plataforma = plataformas[dia % 3]
+                vendas.append(Venda(
+                    empresa=cls.empresa, data=date(2024, mes, dia), plataforma=plataforma,
+                    invest_realizado=Decimal('100'), invest_projetado=Decimal('120'),
+                    fat_proj=Decimal('500'), fat_camp_realizado=Decimal('300'), fat_geral=Decimal(dia * 10),
+                    leads=10, clientes_novos=2, clientes_recorrentes=1, conversoes=3,
+                    **{f'vendas_{plataforma}': Decimal(dia)},
+                ))
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for venda in vendas:
+                venda.save()
+        # Dentro do setUpTestData os on_commit não rodam: monta os resumos direto
+        reconstruir_resumos([cls.empresa.id])
+
+    def test_painel_mensal_usa_duas_consultas(self):
+        with self.assertNumQueries(2):
+            dados = MetricasDashboard(self.empresa).calcular([_params(year=2024, month=2, filterType='mes')])[0]
+        self.assertEqual(dados['faturamento'], sum(dia * 10 for dia in range(1, 11)))
+
+    def test_painel_anual_usa_uma_consulta(self):
+        with self.assertNumQueries(1):
+            dados = MetricasDashboard(self.empresa).calcular([_params(year=2024, filterType='ano')])[0]
+        self.assertEqual(dados['faturamento'], 3 * sum(dia * 10 for dia in range(1, 11)))
+
+    def test_varios_paineis_nao_multiplicam_consultas(self):
+        lista = [
+            _params(year=2024, month=mes, filterType='mes', plataforma=plataforma)
+            for mes in (1, 2, 3) for plataforma in ('google', 'instagram', 'facebook')
+        ] + [_params(year=2024, filterType='ano')]
+        with self.assertNumQueries(2):
+            resultados = MetricasDashboard(self.empresa).calcular(lista)
+        self.assertEqual(len(resultados), len(lista))
+
+    def test_escopo_de_plataforma(self):
+        dados = MetricasDashboard(self.empresa).calcular(
+            [_params(year=2024, month=1, filterType='mes', plataforma='google')]
+        )[0]
+        # Dias 3, 6 e 9 do mês são as vendas com vendas_google > 0
+        self.assertEqual(dados['faturamento'], 30 + 60 + 90)
+        self.assertEqual(dados['vendas_google'], 3 + 6 + 9)
+
+    def test_view_consulta_uma_vez_e_depois_usa_o_cache(self):
+        fabrica = APIRequestFactory()
+
+        def obter():
+            request = fabrica.get('/api/dashboard/', {'year': 2024, 'month': 3, 'filterType': 'mes'}, secure=True)
+            request.empresa = self.empresa
+            return DashboardAPIView.as_view()(request)
+
+        with self.assertNumQueries(2):
+            resposta = obter()
+        self.assertEqual(resposta.status_code, 200)
+        with self.assertNumQueries(0):
+            em_cache = obter()
+        self.assertEqual(em_cache.data, resposta.data)
+
+    def test_view_reflete_venda_salva_depois_do_cache(self):
+        fabrica = APIRequestFactory()
+
+        def faturamento():
+            request = fabrica.get('/api/dashboard/', {'year': 2024, 'month': 3, 'filterType': 'mes'}, secure=True)
+            request.empresa = self.empresa
+            return DashboardAPIView.as_view()(request).data['faturamento']
+
+        antes = faturamento()
+        with mock.patch('venda.signals.agendar_preenchimento_clima'), \
+                self.captureOnCommitCallbacks(execute=True):
+            Venda(empresa=self.empresa, data=date(2024, 3, 20), fat_geral=Decimal('1000')).save()
+        self.assertEqual(faturamento(), antes + 1000)
+
+    def test_semanas_de_janeiro_em_ordem_cronologica(self):
+        # 01/01/2021 cai na semana ISO 53 de 2020
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for dia in (1, 4, 11):
+                Venda(empresa=self.empresa, data=date(2021, 1, dia), fat_geral=Decimal(dia)).save()
+        reconstruir_resumos([self.empresa.id])
+        dados = MetricasDashboard(self.empresa).calcular([_params(year=2021, month=1, filterType='mes')])[0]
+        self.assertEqual(dados['weekly_labels'], ['Semana 53', 'Semana 1', 'Semana 2'])
+        self.assertEqual(dados['weekly_fat_geral_current'], [1.0, 4.0, 11.0])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ObterOuCalcularTests(SimpleTestCase):
+    """Single-flight do cache do dashboard: um cálculo por chave, espera, valor vencido e lock abandonado."""
+
+    CHAVE = 'dash:teste:1'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.calcular = mock.Mock(return_value='novo')
+
+    def segurar_lock(self):
+        """Outra requisição está calculando a chave."""
+        cache.add(f'{self.CHAVE}:lock', 1, timeout=LOCK_TIMEOUT)
+
+    def gravar_vencido(self):
+        cache.set(self.CHAVE, {'valor': 'antigo', 'expira_em': time.time() - 1}, timeout=60)
+
+    def test_calcula_uma_vez_e_depois_le_do_cache(self):
+        self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60), 'novo')
+        self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60), 'novo')
+        self.calcular.assert_called_once_with()
+        self.assertIsNone(cache.get(f'{self.CHAVE}:lock'))
+        self.assertEqual(estatisticas_cache()['falha'], 1)
+        self.assertEqual(estatisticas_cache()['acerto'], 1)
+
+    def test_sem_lock_espera_o_valor_de_quem_calcula(self):
+        self.segurar_lock()
+
+        def outra_requisicao_grava(_):
+            cache.set(self.CHAVE, {'valor': 'da outra', 'expira_em': time.time() + 60})
+
+        with mock.patch.object(cache_utils.time, 'sleep', side_effect=outra_requisicao_grava):
+            self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60), 'da outra')
+        self.calcular.assert_not_called()
+        self.assertEqual(estatisticas_cache()['espera'], 1)
+
+    def test_espera_esgotada_calcula_por_conta_propria(self):
+        self.segurar_lock()
+        with mock.patch.object(cache_utils, 'DASHBOARD_CACHE_LOCK_WAIT', 0):
+            self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60), 'novo')
+        self.calcular.assert_called_once_with()
+        self.assertEqual(estatisticas_cache()['espera_esgotada'], 1)
+        self.assertEqual(cache.get(self.CHAVE)['valor'], 'novo')
+
+    def test_vencido_com_lock_ocupado_devolve_o_valor_antigo(self):
+        self.gravar_vencido()
+        self.segurar_lock()
+        self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60, stale=60), 'antigo')
+        self.calcular.assert_not_called()
+        self.assertEqual(estatisticas_cache()['vencido'], 1)
+
+    def test_vencido_com_lock_livre_recalcula(self):
+        self.gravar_vencido()
+        self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60, stale=60), 'novo')
+        self.assertEqual(cache.get(self.CHAVE)['valor'], 'novo')
+
+    def test_erro_no_calculo_libera_o_lock(self):
+        self.calcular.side_effect = RuntimeError
+        with self.assertRaises(RuntimeError):
+            obter_ou_calcular(self.CHAVE, self.calcular, timeout=60)
+        self.assertIsNone(cache.get(f'{self.CHAVE}:lock'))
+
+    def test_lock_abandonado_expira_depois_de_lock_timeout(self):
+        # O processo que pegou o lock morreu sem liberá-lo
+        self.segurar_lock()
+        depois = time.time() + LOCK_TIMEOUT + 1
+        with mock.patch('time.time', return_value=depois), \
+                mock.patch.object(cache_utils.time, 'sleep') as dormir:
+            self.assertEqual(obter_ou_calcular(self.CHAVE, self.calcular, timeout=60), 'novo')
+        dormir.assert_not_called()
+        self.calcular.assert_called_once_with()
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class GetCondicionalTests(TestCase):
+    """ETag / If-None-Match do ConditionalGetMixin no DashboardAPIView."""
+
+    PARAMS = {'year': 2024, 'month': 3, 'filterType': 'mes'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def obter(self, params=None, **extra):
+        request = APIRequestFactory().get('/api/dashboard/', params or self.PARAMS, secure=True, **extra)
+        request.empresa = self.empresa
+        return DashboardAPIView.as_view()(request)
+
+    def test_etag_e_cabecalhos_de_revalidacao(self):
+        resposta = self.obter()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta['ETag'].startswith('"'))
+        self.assertEqual(resposta['Cache-Control'], 'private, no-cache')
+        self.assertIn('Accept', resposta['Vary'])
+
+    def test_if_none_match_atual_responde_304_sem_consultar(self):
+        etag = self.obter()['ETag']
+        for if_none_match in (etag, f'"outro", {etag}', '*'):
+            with self.assertNumQueries(0):
+                resposta = self.obter(HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(resposta.status_code, 304)
+            self.assertEqual(resposta['ETag'], etag)
+        self.assertEqual(self.obter(HTTP_IF_NONE_MATCH='"outro"').status_code, 200)
+
+    def test_etag_muda_depois_de_invalidar_o_dashboard(self):
+        etag = self.obter()['ETag']
+        invalidar_dashboard(self.empresa.id)
+        resposta = self.obter(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_etag_por_parametros_e_por_formato(self):
+        json_ = self.obter(HTTP_ACCEPT='application/json')['ETag']
+        colunar = self.obter(HTTP_ACCEPT=ColunarRenderer.media_type)
+        self.assertEqual(colunar.accepted_renderer.format, ColunarRenderer.format)
+        self.assertNotEqual(colunar['ETag'], json_)
+        # O 304 de uma representação não vale para a outra
+        self.assertEqual(self.obter(HTTP_ACCEPT=ColunarRenderer.media_type, HTTP_IF_NONE_MATCH=json_).status_code, 200)
+        self.assertNotEqual(self.obter({**self.PARAMS, 'month': 4})['ETag'], self.obter()['ETag'])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ColunarRendererTests(TestCase):
+    """O formato colunar devolve os mesmos valores do JSON (séries numéricas em float32)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for mes in (2, 3):
+                for dia in range(1, 29, 3):
+                    Venda(
+                        empresa=cls.empresa, data=date(2024, mes, dia), invest_realizado=Decimal('33.33'),
+                        fat_camp_realizado=Decimal(dia * 7), fat_geral=Decimal('1234.57') * dia, leads=dia,
+                        clientes_novos=dia % 3, conversoes=1,
+                    ).save()
+        reconstruir_resumos([cls.empresa.id])
+
+    def assertMesmosValores(self, decodificado, original):
+        self.assertEqual(set(decodificado), set(original))
+        for chave, valor in original.items():
+            if isinstance(valor, list) and valor and all(isinstance(v, float) for v in valor):
+                # Séries constantes vão exatas no cabeçalho; as demais passam por float32
+                constante = len(valor) > 1 and all(v == valor[0] for v in valor)
+                esperado = valor if constante else np.asarray(valor, dtype=np.float32).tolist()
+                self.assertEqual(len(decodificado[chave]), len(esperado), chave)
+                for lido, item in zip(decodificado[chave], esperado):
+                    self.assertTrue(lido == item or (math.isnan(lido) and math.isnan(item)), chave)
+            elif isinstance(valor, float) and math.isnan(valor):
+                self.assertTrue(math.isnan(decodificado[chave]), chave)
+            else:
+                self.assertEqual(decodificado[chave], valor, chave)
+
+    def test_painel_real_ida_e_volta(self):
+        request = APIRequestFactory().get(
+            '/api/dashboard/', {'year': 2024, 'month': 3, 'filterType': 'mes'}, secure=True,
+            HTTP_ACCEPT=ColunarRenderer.media_type,
+        )
+        request.empresa = self.empresa
+        resposta = DashboardAPIView.as_view()(request)
+        resposta.render()
+        painel = dict(resposta.data)
+        self.assertTrue(any(isinstance(valor, list) and len(valor) > 1 for valor in painel.values()))
+        self.assertMesmosValores(ler_colunar(resposta.content), painel)
+
+    def test_nan_none_e_precisao_float32(self):
+        dados = {
+            'serie': [1.5, float('nan'), 0.1, 16777217.0],
+            'com_nulo': [None, 2.0],
+            'constante': [0.1, 0.1, 0.1],
+            'vazia': [],
+            'rotulos': ['Semana 1', 'Semana 2'],
+            'escalar_nulo': None,
+            'escalar_nan': float('nan'),
+            'total': 1234.5678901,
+        }
+        lidos = ler_colunar(ColunarRenderer().render(dados))
+        self.assertMesmosValores(lidos, dados)
+        # float32: 0.1 e inteiros acima de 2**24 perdem precisão; escalares e constantes ficam exatos
+        self.assertNotEqual(lidos['serie'][2], 0.1)
+        self.assertEqual(lidos['serie'][3], 16777216.0)
+        self.assertEqual(lidos['constante'], [0.1, 0.1, 0.1])
+        self.assertEqual(lidos['total'], 1234.5678901)
+        self.assertEqual(lidos['com_nulo'], [None, 2.0])
@@ -6,6 +6,7 @@ app_name = 'dashboard'
 
 urlpatterns = [
     path('dashboard/', views.DashboardAPIView.as_view(), name='dashboard_api'),
+    path('dashboard/batch/', views.DashboardLoteAPIView.as_view(), name='dashboard_batch_api'),
     path('dashboard/all-years/', views.AllYearsDashboardAPIView.as_view(), name='all_years_dashboard_api'),
     path('dashboard/available-years/', views.AvailableYearsAPIView.as_view(), name='available_years_api'),
 ]
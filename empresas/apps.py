@@ -5,3 +5,7 @@ class EmpresasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'empresas'
     verbose_name = 'Empresas'
+
+    def ready(self):
+        # Importa os signals que invalidam o cache da empresa usado pelo middleware
+        from . import signals  # noqa: F401
@@ -0,0 +1,157 @@
+"""
+Cache da empresa (tenant) resolvida a cada requisição pelo EmpresaMiddleware.
+
+Toda requisição autenticada busca a empresa pelo `empresa_id` do token ou pelo
+e-mail comercial antes de chegar na view. Aqui essa busca passa por dois
+níveis: um LRU no próprio processo (validade curta, EMPRESA_CACHE_LOCAL_TTL)
+e uma entrada no cache compartilhado por id e por e-mail. Com os dois
+quentes, resolver a empresa não custa nenhuma consulta.
+
+Só os campos usados pela pilha da requisição (CAMPOS_CONTEXTO) são guardados;
+a Empresa é remontada com `from_db`, então os demais campos continuam
+acessíveis e são carregados do banco sob demanda. Os signals de Empresa
+descartam as entradas depois do commit; o LRU dos outros processos expira
+pela validade curta.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from .models import Empresa
+
+logger = logging.getLogger(__name__)
+
+EMPRESA_CACHE_TIMEOUT = getattr(settings, 'EMPRESA_CACHE_TIMEOUT', 60 * 60)
+EMPRESA_CACHE_LOCAL_TTL = getattr(settings, 'EMPRESA_CACHE_LOCAL_TTL', 30)
+EMPRESA_CACHE_LOCAL_MAX = getattr(settings, 'EMPRESA_CACHE_LOCAL_MAX', 1024)
+
+# Campos lidos pelos middlewares, mixins e logs da requisição (inclui os do __str__)
+CAMPOS_CONTEXTO = [
+    'id', 'tipo', 'nome_fantasia', 'razao_social', 'sigla', 'cnpj', 'cpf', 'email_comercial', 'ativo',
+]
+
+
+class _LRULocal:
+    """LRU com validade por entrada, compartilhado pelas threads do processo."""
+
+    def __init__(self, tamanho, validade):
+        self.tamanho = tamanho
+        self.validade = validade
+        self.itens = OrderedDict()
+        self.trava = threading.Lock()
+
+    def obter(self, chave):
+        with self.trava:
+            item = self.itens.get(chave)
+            if item is None:
+                return None
+            expira, valor = item
+            if expira < time.monotonic():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor):
+        with self.trava:
+            self.itens[chave] = (time.monotonic() + self.validade, valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.tamanho:
+                self.itens.popitem(last=False)
+
+    def remover(self, *chaves):
+        with self.trava:
+            for chave in chaves:
+                self.itens.pop(chave, None)
+
+    def limpar(self):
+        with self.trava:
+            self.itens.clear()
+
+
+_local = _LRULocal(EMPRESA_CACHE_LOCAL_MAX, EMPRESA_CACHE_LOCAL_TTL)
+
+
+def _chave_id(empresa_id):
+    return f"empresa:ctx:id:{empresa_id}"
+
+
+def _chave_email(email):
+    return f"empresa:ctx:email:{email.lower()}"
+
+
+def _montar(valores):
+    """Empresa a partir dos campos guardados (os demais ficam adiados)."""
+    # from_db consome os valores na ordem dos campos do model, não na de field_names
+    campos = [f.attname for f in Empresa._meta.concrete_fields if f.attname in valores]
+    return Empresa.from_db(router.db_for_read(Empresa), campos, [valores[campo] for campo in campos])
+
+
+def _guardar(valores):
+    chave_id, chave_email = _chave_id(valores['id']), _chave_email(valores['email_comercial'])
+    _local.guardar(chave_id, valores)
+    _local.guardar(chave_email, valores['id'])
+    cache.set_many({chave_id: valores, chave_email: valores['id']}, timeout=EMPRESA_CACHE_TIMEOUT)
+
+
+def _valores_em_cache(empresa_id):
+    chave = _chave_id(empresa_id)
+    valores = _local.obter(chave)
+    if valores is None:
+        valores = cache.get(chave)
+        if valores is not None:
+            _local.guardar(chave, valores)
+    return valores
+
+
+def _consultar(**filtro):
+    """Busca no banco só os CAMPOS_CONTEXTO; propaga DoesNotExist/MultipleObjectsReturned como o .get()."""
+    valores = Empresa.objects.values(*CAMPOS_CONTEXTO).get(**filtro)
+    _guardar(valores)
+    return valores
+
+
+def empresa_por_id(empresa_id):
+    """Empresa do id informado (Empresa.DoesNotExist se não existir)."""
+    try:
+        empresa_id = int(empresa_id)
+    except (TypeError, ValueError):
+        raise Empresa.DoesNotExist(f'Empresa inválida: {empresa_id!r}')
+    valores = _valores_em_cache(empresa_id)
+    if valores is None:
+        valores = _consultar(id=empresa_id)
+    return _montar(valores)
+
+
+def empresa_por_email(email):
+    """Empresa com o e-mail comercial informado (mesmas exceções de Empresa.objects.get)."""
+    chave = _chave_email(email)
+    empresa_id = _local.obter(chave)
+    if empresa_id is None:
+        empresa_id = cache.get(chave)
+    valores = _valores_em_cache(empresa_id) if empresa_id is not None else None
+    # O e-mail pode ter mudado depois que a chave foi gravada
+    if valores is None or valores['email_comercial'] != email:
+        valores = _consultar(email_comercial=email)
+    else:
+        _local.guardar(chave, empresa_id)
+    return _montar(valores)
+
+
+def invalidar_empresa(empresa_id, *emails):
+    """Descarta as entradas da empresa (e dos e-mails informados) no processo e no cache compartilhado."""
+    if not empresa_id:
+        return
+    chaves = [_chave_id(empresa_id)] + [_chave_email(email) for email in emails if email]
+    _local.remover(*chaves)
+    cache.delete_many(chaves)
+
+
+def agendar_invalidacao_empresa(empresa_id, *emails):
+    """Descarta o cache da empresa depois do commit da transação atual."""
+    transaction.on_commit(lambda: invalidar_empresa(empresa_id, *emails))
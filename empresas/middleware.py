@@ -1,10 +1,11 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib import messages
+from .contexto import empresa_por_email, empresa_por_id
 from .models import Empresa
 from usuariospainel.models import UserCompanyLink
 import logging
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.authentication import autenticar_jwt
 from django.utils.deprecation import MiddlewareMixin
 from django.conf import settings
 import uuid
@@ -34,10 +35,9 @@ class EmpresaMiddleware(MiddlewareMixin):
             logger.info(f"[MIDDLEWARE] Path não requer empresa: {request.path}")
             return None
 
-        # Tenta autenticar usando o JWT
-        jwt_auth = JWTAuthentication()
+        # Tenta autenticar usando o JWT (o resultado fica na requisição para o DRF reaproveitar)
         try:
-            auth_tuple = jwt_auth.authenticate(request)
+            auth_tuple = autenticar_jwt(request)
             if auth_tuple is None:
                 logger.info(f"[MIDDLEWARE] Usuário não autenticado: {request.path}")
                 return None
@@ -61,7 +61,7 @@ class EmpresaMiddleware(MiddlewareMixin):
             # Se tem empresa_id no token, tenta usar ele
             if empresa_id:
                 try:
-                    empresa = Empresa.objects.get(id=empresa_id)
+                    empresa = empresa_por_id(empresa_id)
                     logger.info(f"[MIDDLEWARE] Empresa encontrada pelo ID do token: {empresa_id}")
                     request.empresa = empresa
                     request.empresa_id = str(empresa.id)
@@ -72,7 +72,7 @@ class EmpresaMiddleware(MiddlewareMixin):
             # Se não encontrou pelo ID ou não tem ID, tenta pelo email
             if user.user_type in ('PJ', 'PFE'):
                 try:
-                    empresa = Empresa.objects.get(email_comercial=user.email)
+                    empresa = empresa_por_email(user.email)
                     logger.info(f"[MIDDLEWARE] Empresa PJ encontrada pelo email: {user.email}")
                     request.empresa = empresa
                     request.empresa_id = str(empresa.id)
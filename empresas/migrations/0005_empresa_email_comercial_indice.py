@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-17 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0004_empresa_asaas_customer_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='empresa',
+            name='email_comercial',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+    ]
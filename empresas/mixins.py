@@ -17,9 +17,7 @@ class EmpresaFilterMixin(mixins.ListModelMixin):
             logger.warning(f"[MIXIN] Nenhuma empresa encontrada para o usuário {self.request.user.email}")
             return queryset.none()
         logger.info(f"[MIXIN] Filtrando queryset por empresa: {empresa} (ID: {empresa.id}) para usuário: {self.request.user.email}")
-        qs = queryset.filter(empresa=empresa)
-        logger.info(f"[MIXIN] Queryset final count: {qs.count()} para empresa: {empresa} (ID: {empresa.id}) e usuário: {self.request.user.email}")
-        return qs
+        return queryset.filter(empresa=empresa)
     
     def perform_create(self, serializer):
         empresa = getattr(self.request, 'empresa', None)
@@ -19,7 +19,8 @@ class Empresa(models.Model):
     razao_social = models.CharField(max_length=100, null=True, blank=True)
     inscricao_estadual = models.CharField(max_length=20, null=True, blank=True)
     inscricao_municipal = models.CharField(max_length=20, null=True, blank=True)
-    email_comercial = models.EmailField()
+    # Indexado: o EmpresaMiddleware resolve a empresa de usuários PJ/PFE pelo e-mail
+    email_comercial = models.EmailField(db_index=True)
     telefone1 = models.CharField(max_length=15)
     telefone2 = models.CharField(max_length=15, null=True, blank=True)
     # ID de cliente no Asaas
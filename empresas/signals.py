@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .contexto import agendar_invalidacao_empresa
+from .models import Empresa
+
+
+@receiver(post_save, sender=Empresa)
+def invalidar_contexto_ao_salvar(sender, instance: Empresa, **kwargs):
+    """Descarta a empresa cacheada para o EmpresaMiddleware (id e e-mail comercial)."""
+    agendar_invalidacao_empresa(instance.pk, instance.__dict__.get('email_comercial'))
+
+
+@receiver(post_delete, sender=Empresa)
+def invalidar_contexto_ao_excluir(sender, instance: Empresa, **kwargs):
+    agendar_invalidacao_empresa(instance.pk, instance.__dict__.get('email_comercial'))
@@ -1,3 +1,109 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import contexto
+from .contexto import EMPRESA_CACHE_LOCAL_TTL, _LRULocal, empresa_por_email, empresa_por_id
+from .models import Empresa
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ContextoEmpresaTests(TestCase):
+    """Cache da empresa do EmpresaMiddleware: LRU do processo + cache compartilhado, invalidados pelos signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', nome_fantasia='Loja', cnpj='1',
+            email_comercial='teste@example.com', telefone1='0',
+        )
+
+    def setUp(self):
+        cache.clear()
+        contexto._local.limpar()
+        self.addCleanup(cache.clear)
+        self.addCleanup(contexto._local.limpar)
+
+    def salvar(self, **campos):
+        empresa = Empresa.objects.get(pk=self.empresa.pk)
+        for campo, valor in campos.items():
+            setattr(empresa, campo, valor)
+        with self.captureOnCommitCallbacks(execute=True):
+            empresa.save()
+        return empresa
+
+    def test_segunda_busca_nao_consulta_o_banco(self):
+        with self.assertNumQueries(1):
+            empresa_por_id(self.empresa.id)
+        with self.assertNumQueries(0):
+            empresa = empresa_por_id(str(self.empresa.id))
+            self.assertEqual(empresa_por_email('teste@example.com').pk, self.empresa.pk)
+            self.assertEqual(empresa.nome_fantasia, 'Loja')
+        # Campos fora de CAMPOS_CONTEXTO continuam acessíveis, carregados sob demanda
+        with self.assertNumQueries(1):
+            self.assertEqual(empresa.telefone1, '0')
+
+    def test_cache_compartilhado_repoe_o_lru(self):
+        empresa_por_id(self.empresa.id)
+        # Outro processo: LRU vazio, cache compartilhado quente
+        contexto._local.limpar()
+        with self.assertNumQueries(0):
+            empresa = empresa_por_id(self.empresa.id)
+            self.assertEqual((empresa.sigla, empresa.razao_social), ('TST', 'Teste'))
+
+    def test_salvar_invalida_o_cache(self):
+        empresa_por_id(self.empresa.id)
+        self.salvar(nome_fantasia='Loja Nova')
+        with self.assertNumQueries(1):
+            self.assertEqual(empresa_por_id(self.empresa.id).nome_fantasia, 'Loja Nova')
+
+    def test_troca_de_email(self):
+        empresa_por_email('teste@example.com')
+        self.salvar(email_comercial='novo@example.com')
+        self.assertEqual(empresa_por_email('novo@example.com').pk, self.empresa.pk)
+        with self.assertRaises(Empresa.DoesNotExist):
+            empresa_por_email('teste@example.com')
+
+    def test_exclusao_invalida_o_cache(self):
+        empresa_por_id(self.empresa.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Empresa.objects.get(pk=self.empresa.pk).delete()
+        with self.assertRaises(Empresa.DoesNotExist):
+            empresa_por_id(self.empresa.id)
+
+    def test_lru_de_outro_processo_fica_velho_ate_a_validade(self):
+        empresa_por_id(self.empresa.id)
+        # Alteração feita por outro processo: só o cache compartilhado é descartado aqui
+        Empresa.objects.filter(pk=self.empresa.pk).update(nome_fantasia='Loja Nova')
+        cache.clear()
+        self.assertEqual(empresa_por_id(self.empresa.id).nome_fantasia, 'Loja')
+        depois = time.monotonic() + EMPRESA_CACHE_LOCAL_TTL + 1
+        with mock.patch.object(contexto.time, 'monotonic', return_value=depois):
+            self.assertEqual(empresa_por_id(self.empresa.id).nome_fantasia, 'Loja Nova')
+
+    def test_id_invalido(self):
+        for valor in (None, 'abc', 999999):
+            with self.assertRaises(Empresa.DoesNotExist):
+                empresa_por_id(valor)
+
+
+class LRULocalTests(SimpleTestCase):
+
+    def test_descarta_o_menos_usado(self):
+        lru = _LRULocal(tamanho=2, validade=60)
+        lru.guardar('a', 1)
+        lru.guardar('b', 2)
+        lru.obter('a')
+        lru.guardar('c', 3)
+        self.assertEqual((lru.obter('a'), lru.obter('b'), lru.obter('c')), (1, None, 3))
+
+    def test_validade_por_entrada(self):
+        lru = _LRULocal(tamanho=2, validade=10)
+        lru.guardar('a', 1)
+        with mock.patch.object(contexto.time, 'monotonic', return_value=time.monotonic() + 11):
+            self.assertIsNone(lru.obter('a'))
+        self.assertEqual(lru.itens, {})
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'formato', 'status', 'progresso', 'usuario', 'empresa', 'criado_em', 'concluido_em']
+    list_filter = ['status', 'tipo', 'formato']
+    search_fields = ['usuario__email', 'empresa__sigla']
+    readonly_fields = ['criado_em', 'iniciado_em', 'concluido_em']
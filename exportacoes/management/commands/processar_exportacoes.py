@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from exportacoes.models import ExportJob
+from exportacoes.servicos import executar_exportacao, liberar_travados
+
+
+class Command(BaseCommand):
+    help = (
+        'Processa no próprio processo as exportações pendentes (por exemplo, as que '
+        'ficaram na fila quando o servidor reiniciou).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--travados', type=int, metavar='MINUTOS',
+                            help='Volta para a fila os jobs em processamento há mais de MINUTOS.')
+        parser.add_argument('--limite', type=int, help='Máximo de jobs processados.')
+
+    def handle(self, *args, **options):
+        if options['travados'] is not None:
+            liberados = liberar_travados(options['travados'])
+            self.stdout.write(f"{liberados} job(s) travado(s) de volta à fila.")
+
+        pendentes = ExportJob.objects.filter(status=ExportJob.STATUS_PENDENTE).order_by('criado_em')
+        ids = list(pendentes.values_list('pk', flat=True)[:options['limite']])
+        processados = 0
+        for job_id in ids:
+            # Outro worker pode ter reivindicado o job nesse meio-tempo
+            if executar_exportacao(job_id):
+                processados += 1
+                job = ExportJob.objects.get(pk=job_id)
+                self.stdout.write(f"{job_id}: {job.get_status_display()}" + (f" ({job.erro})" if job.erro else ''))
+
+        self.stdout.write(self.style.SUCCESS(f"{processados} exportação(ões) processada(s)."))
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('empresas', '0004_empresa_asaas_customer_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('vendas', 'Vendas'), ('marketing', 'Dados de marketing'), ('influencer_vendas', 'Vendas do influencer'), ('influencer_cliques', 'Cliques do influencer'), ('admin_empresas', 'Empresas (admin)'), ('admin_assinaturas', 'Assinaturas (admin)')], max_length=40, verbose_name='Tipo')),
+                ('formato', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel')], default='csv', max_length=10, verbose_name='Formato')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Status')),
+                ('progresso', models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')),
+                ('total_linhas', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de linhas')),
+                ('linhas_processadas', models.PositiveIntegerField(default=0, verbose_name='Linhas processadas')),
+                ('arquivo', models.FileField(blank=True, null=True, upload_to='exportacoes/%Y/%m/', verbose_name='Arquivo')),
+                ('erro', models.TextField(blank=True, null=True, verbose_name='Erro')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='exportacoes', to='empresas.empresa')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportacoes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportação',
+                'verbose_name_plural': 'Exportações',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['usuario', '-criado_em'], name='exportjob_usuario_idx'), models.Index(fields=['status', 'criado_em'], name='exportjob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+
+class ExportJob(models.Model):
+    """Exportação (CSV/XLSX) gerada em segundo plano, com progresso e arquivo para download."""
+
+    STATUS_PENDENTE = 'pendente'
+    STATUS_PROCESSANDO = 'processando'
+    STATUS_CONCLUIDO = 'concluido'
+    STATUS_ERRO = 'erro'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_PROCESSANDO, 'Processando'),
+        (STATUS_CONCLUIDO, 'Concluído'),
+        (STATUS_ERRO, 'Erro'),
+    ]
+    FORMATO_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+    ]
+    TIPO_CHOICES = [
+        ('vendas', 'Vendas'),
+        ('marketing', 'Dados de marketing'),
+        ('influencer_vendas', 'Vendas do influencer'),
+        ('influencer_cliques', 'Cliques do influencer'),
+        ('admin_empresas', 'Empresas (admin)'),
+        ('admin_assinaturas', 'Assinaturas (admin)'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exportacoes')
+    empresa = models.ForeignKey('empresas.Empresa', on_delete=models.CASCADE, null=True, blank=True, related_name='exportacoes')
+    tipo = models.CharField("Tipo", max_length=40, choices=TIPO_CHOICES)
+    formato = models.CharField("Formato", max_length=10, choices=FORMATO_CHOICES, default='csv')
+    parametros = models.JSONField("Parâmetros", default=dict, blank=True)
+
+    status = models.CharField("Status", max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    progresso = models.PositiveSmallIntegerField("Progresso (%)", default=0)
+    total_linhas = models.PositiveIntegerField("Total de linhas", null=True, blank=True)
+    linhas_processadas = models.PositiveIntegerField("Linhas processadas", default=0)
+    arquivo = models.FileField("Arquivo", upload_to='exportacoes/%Y/%m/', null=True, blank=True)
+    erro = models.TextField("Erro", null=True, blank=True)
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+    iniciado_em = models.DateTimeField("Iniciado em", null=True, blank=True)
+    concluido_em = models.DateTimeField("Concluído em", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Exportação"
+        verbose_name_plural = "Exportações"
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['usuario', '-criado_em'], name='exportjob_usuario_idx'),
+            models.Index(fields=['status', 'criado_em'], name='exportjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.formato}) - {self.get_status_display()}"
+
+    def nome_arquivo(self):
+        return f"{self.tipo}_{self.criado_em.strftime('%Y%m%d_%H%M%S')}.{self.formato}"
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+from .models import ExportJob
+from .tipos import TIPOS
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'tipo', 'formato', 'parametros', 'status', 'progresso',
+            'total_linhas', 'linhas_processadas', 'erro', 'tentativas',
+            'criado_em', 'iniciado_em', 'concluido_em', 'download_url',
+        ]
+        read_only_fields = [
+            'id', 'status', 'progresso', 'total_linhas', 'linhas_processadas', 'erro',
+            'tentativas', 'criado_em', 'iniciado_em', 'concluido_em', 'download_url',
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_CONCLUIDO:
+            return None
+        request = self.context.get('request')
+        caminho = f'/api/exportacoes/{obj.pk}/download/'
+        return request.build_absolute_uri(caminho) if request else caminho
+
+    def validate(self, attrs):
+        try:
+            attrs['parametros'] = TIPOS[attrs['tipo']].preparar_parametros(attrs.get('parametros'))
+        except ValueError as e:
+            raise serializers.ValidationError({'parametros': str(e)})
+        return attrs
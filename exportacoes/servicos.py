@@ -0,0 +1,164 @@
+"""
+Execução dos jobs de exportação.
+
+O job é criado pela API e executado fora da requisição: no pool de segundo
+plano do próprio processo (depois do commit) ou pelo comando
+`processar_exportacoes`. A execução "reivindica" o job com um UPDATE
+condicional, então dois workers nunca geram o mesmo arquivo. As linhas são
+lidas com `values_list(...).iterator()` e gravadas em um arquivo temporário
+antes de irem para o storage, com o progresso atualizado a cada bloco.
+"""
+import csv
+import io
+import logging
+import tempfile
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from openpyxl import Workbook
+
+from app.background import executar_em_segundo_plano
+
+from .models import ExportJob
+from .tipos import TIPOS
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 2000
+# Linhas entre duas atualizações de progresso no banco
+INTERVALO_PROGRESSO = 2000
+
+
+def _formatar(valor):
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).strftime("%d/%m/%Y %H:%M") if timezone.is_aware(valor) else valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, UUID):
+        return str(valor)
+    return valor
+
+
+def _linhas(queryset, colunas):
+    for linha in queryset.values_list(*colunas).iterator(chunk_size=TAMANHO_BLOCO):
+        yield [_formatar(valor) for valor in linha]
+
+
+def _com_progresso(job_id, linhas, total):
+    processadas = 0
+    for linha in linhas:
+        yield linha
+        processadas += 1
+        if processadas % INTERVALO_PROGRESSO == 0:
+            ExportJob.objects.filter(pk=job_id).update(
+                linhas_processadas=processadas,
+                progresso=min(99, processadas * 100 // total) if total else 0,
+            )
+
+
+def _escrever_csv(arquivo, titulos, linhas):
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8', newline='')
+    escritor = csv.writer(texto)
+    escritor.writerow(titulos)
+    escritor.writerows(linhas)
+    texto.flush()
+    # Devolve o arquivo binário sem fechá-lo junto com o wrapper
+    texto.detach()
+
+
+def _escrever_xlsx(arquivo, titulos, linhas):
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet('Exportação')
+    planilha.append(titulos)
+    for linha in linhas:
+        planilha.append(linha)
+    workbook.save(arquivo)
+
+
+ESCRITORES = {
+    'csv': _escrever_csv,
+    'xlsx': _escrever_xlsx,
+}
+
+
+def executar_exportacao(job_id):
+    """
+    Gera o arquivo de um job pendente. Retorna False se o job não estava
+    pendente (já concluído ou reivindicado por outro worker).
+    """
+    reivindicado = ExportJob.objects.filter(pk=job_id, status=ExportJob.STATUS_PENDENTE).update(
+        status=ExportJob.STATUS_PROCESSANDO,
+        iniciado_em=timezone.now(),
+        concluido_em=None,
+        tentativas=F('tentativas') + 1,
+        progresso=0,
+        linhas_processadas=0,
+        erro=None,
+    )
+    if not reivindicado:
+        return False
+
+    job = ExportJob.objects.select_related('usuario', 'empresa').get(pk=job_id)
+    try:
+        tipo = TIPOS[job.tipo]
+        colunas = job.parametros.get('colunas') or list(tipo.colunas)
+        queryset = tipo.queryset(job.usuario, job.empresa, job.parametros)
+        total = queryset.count()
+        ExportJob.objects.filter(pk=job_id).update(total_linhas=total)
+
+        with tempfile.TemporaryFile() as arquivo:
+            ESCRITORES[job.formato](
+                arquivo,
+                [tipo.colunas[coluna] for coluna in colunas],
+                _com_progresso(job_id, _linhas(queryset, colunas), total),
+            )
+            arquivo.seek(0)
+            job.arquivo.save(job.nome_arquivo(), File(arquivo), save=False)
+
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_CONCLUIDO,
+            arquivo=job.arquivo.name,
+            progresso=100,
+            linhas_processadas=total,
+            concluido_em=timezone.now(),
+        )
+        logger.info(f"[EXPORTACAO] Job {job_id} ({job.tipo}/{job.formato}) concluído: {total} linhas")
+    except Exception as e:
+        logger.error(f"[EXPORTACAO] Erro no job {job_id}: {str(e)}")
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.STATUS_ERRO,
+            erro=str(e),
+            concluido_em=timezone.now(),
+        )
+    return True
+
+
+def agendar_exportacao(job_id):
+    """Executa o job no pool de segundo plano depois do commit da transação atual."""
+    transaction.on_commit(lambda: executar_em_segundo_plano(executar_exportacao, job_id))
+
+
+def reenfileirar(job):
+    """Volta um job com erro (ou travado) para pendente e agenda uma nova tentativa."""
+    if job.arquivo:
+        job.arquivo.delete(save=False)
+    ExportJob.objects.filter(pk=job.pk).update(
+        status=ExportJob.STATUS_PENDENTE,
+        arquivo=None,
+        progresso=0,
+        linhas_processadas=0,
+        erro=None,
+    )
+    agendar_exportacao(job.pk)
+
+
+def liberar_travados(minutos):
+    """Volta para pendente os jobs em processamento há mais de `minutos` (worker morto no meio)."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_PROCESSANDO, iniciado_em__lt=limite
+    ).update(status=ExportJob.STATUS_PENDENTE)
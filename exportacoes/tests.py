@@ -0,0 +1,168 @@
+import csv
+import io
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from empresas.models import Empresa
+from venda.models import Venda
+
+from .models import ExportJob
+from .servicos import executar_exportacao, liberar_travados
+from .tipos import TIPOS
+from .views import ExportJobViewSet
+
+MEDIA_TEMPORARIA = tempfile.mkdtemp(prefix='exportacoes-testes-')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_TEMPORARIA, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TEMPORARIA)
+class ExportJobTests(TestCase):
+    """Jobs de exportação: criação, acesso, execução única, nova tentativa e jobs travados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        modelo = get_user_model()
+        cls.usuario = modelo.objects.create_user(username='usuario', email='usuario@example.com', password='x')
+        cls.admin = modelo.objects.create_user(
+            username='admin', email='admin@example.com', password='x', is_staff=True
+        )
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for dia in (1, 2, 3):
+                Venda(empresa=cls.empresa, data=date(2024, 5, dia), fat_geral=Decimal(dia * 100)).save()
+
+    def setUp(self):
+        # O job roda na hora (no commit) em vez de ir para o pool de segundo plano
+        patcher = mock.patch(
+            'exportacoes.servicos.executar_em_segundo_plano', side_effect=lambda funcao, *args: funcao(*args)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def requisitar(self, metodo, acao, usuario, dados=None, empresa=None, **kwargs):
+        url = f'/api/exportacoes/{kwargs["pk"]}/{acao}/' if 'pk' in kwargs else '/api/exportacoes/'
+        request = getattr(APIRequestFactory(), metodo)(url, dados, format='json', secure=True)
+        force_authenticate(request, user=usuario)
+        request.empresa = empresa
+        with self.captureOnCommitCallbacks(execute=True):
+            return ExportJobViewSet.as_view({metodo: acao})(request, **kwargs)
+
+    def criar(self, usuario=None, empresa=None, **dados):
+        return self.requisitar('post', 'create', usuario or self.usuario, dados, empresa or self.empresa)
+
+    def test_cria_o_job_e_gera_o_arquivo_depois_do_commit(self):
+        resposta = self.criar(tipo='vendas', parametros={'colunas': 'fat_geral,data', 'inicio': '2024-05-02'})
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(resposta.data['status'], ExportJob.STATUS_PENDENTE)
+        self.assertEqual(resposta.data['parametros'], {'colunas': ['data', 'fat_geral'], 'inicio': '2024-05-02'})
+
+        job = ExportJob.objects.get(pk=resposta.data['id'])
+        self.assertEqual((job.status, job.total_linhas, job.progresso, job.tentativas), ('concluido', 2, 100, 1))
+        download = self.requisitar('get', 'download', self.usuario, pk=job.pk)
+        conteudo = b''.join(download.streaming_content).decode('utf-8')
+        download.close()
+        self.assertEqual(list(csv.reader(io.StringIO(conteudo))), [
+            ['Data', 'FAT Geral'], ['02/05/2024', '200.00'], ['03/05/2024', '300.00'],
+        ])
+
+    def test_parametros_invalidos_respondem_400(self):
+        resposta = self.criar(tipo='vendas', parametros={'colunas': 'data,senha'})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('parametros', resposta.data)
+        self.assertEqual(self.criar(tipo='admin_empresas', parametros={'inicio': '05/2024'}).status_code, 400)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_somente_admin(self):
+        self.assertEqual(self.criar(tipo='admin_empresas').status_code, 403)
+        resposta = self.criar(usuario=self.admin, tipo='admin_empresas')
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(ExportJob.objects.get(pk=resposta.data['id']).status, ExportJob.STATUS_CONCLUIDO)
+
+    def test_exige_empresa(self):
+        resposta = self.requisitar('post', 'create', self.usuario, {'tipo': 'vendas'}, empresa=None)
+        self.assertEqual(resposta.status_code, 403)
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_jobs_de_outro_usuario_nao_aparecem(self):
+        job = ExportJob.objects.create(usuario=self.admin, tipo='vendas', empresa=self.empresa)
+        self.assertEqual(self.requisitar('get', 'list', self.usuario).data['results'], [])
+        self.assertEqual(len(self.requisitar('get', 'list', self.admin).data['results']), 1)
+        self.assertEqual(self.requisitar('get', 'download', self.usuario, pk=job.pk).status_code, 404)
+
+    def test_download_antes_de_concluir_responde_409(self):
+        job = ExportJob.objects.create(usuario=self.usuario, tipo='vendas', empresa=self.empresa)
+        resposta = self.requisitar('get', 'download', self.usuario, pk=job.pk)
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.data['status'], ExportJob.STATUS_PENDENTE)
+
+    def test_job_reivindicado_nao_roda_duas_vezes(self):
+        job = ExportJob.objects.create(usuario=self.usuario, tipo='vendas', empresa=self.empresa)
+        self.assertTrue(executar_exportacao(job.pk))
+        self.assertFalse(executar_exportacao(job.pk))
+        # Em processamento por outro worker: também não é reivindicado
+        outro = ExportJob.objects.create(
+            usuario=self.usuario, tipo='vendas', empresa=self.empresa, status=ExportJob.STATUS_PROCESSANDO
+        )
+        self.assertFalse(executar_exportacao(outro.pk))
+        job.refresh_from_db()
+        outro.refresh_from_db()
+        self.assertEqual((job.status, job.tentativas), (ExportJob.STATUS_CONCLUIDO, 1))
+        self.assertEqual((outro.status, outro.tentativas), (ExportJob.STATUS_PROCESSANDO, 0))
+
+    def test_erro_e_nova_tentativa(self):
+        with mock.patch.object(TIPOS['vendas'], 'consulta', side_effect=RuntimeError('banco fora do ar')):
+            resposta = self.criar(tipo='vendas')
+        job = ExportJob.objects.get(pk=resposta.data['id'])
+        self.assertEqual((job.status, job.erro), (ExportJob.STATUS_ERRO, 'banco fora do ar'))
+
+        resposta = self.requisitar('post', 'retry', self.usuario, pk=job.pk)
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(resposta.data['status'], ExportJob.STATUS_PENDENTE)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.erro, job.tentativas), (ExportJob.STATUS_CONCLUIDO, None, 2))
+        # Só jobs com erro podem ser refeitos
+        self.assertEqual(self.requisitar('post', 'retry', self.usuario, pk=job.pk).status_code, 409)
+
+    def test_liberar_travados(self):
+        agora = timezone.now()
+        travado = ExportJob.objects.create(
+            usuario=self.usuario, tipo='vendas', empresa=self.empresa,
+            status=ExportJob.STATUS_PROCESSANDO, iniciado_em=agora - timedelta(hours=2),
+        )
+        recente = ExportJob.objects.create(
+            usuario=self.usuario, tipo='vendas', empresa=self.empresa,
+            status=ExportJob.STATUS_PROCESSANDO, iniciado_em=agora - timedelta(minutes=5),
+        )
+        self.assertEqual(liberar_travados(30), 1)
+        travado.refresh_from_db()
+        recente.refresh_from_db()
+        self.assertEqual(travado.status, ExportJob.STATUS_PENDENTE)
+        self.assertEqual(recente.status, ExportJob.STATUS_PROCESSANDO)
+
+    def test_comando_processa_os_pendentes_e_os_travados(self):
+        pendente = ExportJob.objects.create(usuario=self.usuario, tipo='vendas', empresa=self.empresa)
+        travado = ExportJob.objects.create(
+            usuario=self.usuario, tipo='vendas', empresa=self.empresa,
+            status=ExportJob.STATUS_PROCESSANDO, iniciado_em=timezone.now() - timedelta(hours=2),
+        )
+        saida = io.StringIO()
+        call_command('processar_exportacoes', '--travados', '30', stdout=saida)
+        self.assertIn('1 job(s) travado(s) de volta à fila.', saida.getvalue())
+        self.assertIn('2 exportação(ões) processada(s).', saida.getvalue())
+        for job in (pendente, travado):
+            job.refresh_from_db()
+            self.assertEqual(job.status, ExportJob.STATUS_CONCLUIDO)
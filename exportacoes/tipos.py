@@ -0,0 +1,158 @@
+"""
+Tipos de exportação disponíveis para os jobs.
+
+Cada tipo define as colunas (campo do values_list -> título), a consulta já
+restrita ao que o usuário pode ver e o campo de data usado nos filtros
+`inicio`/`fim` dos parâmetros.
+"""
+from datetime import date
+
+from django.core.exceptions import PermissionDenied
+
+from ai_marketing_agent.models import MarketingData
+from assinaturas.models import Assinatura
+from empresas.models import Empresa
+from influencer.models import Click, Venda as VendaInfluencer
+from venda.exportacao import COLUNAS as COLUNAS_VENDAS
+from venda.models import Venda
+
+
+class TipoExportacao:
+    def __init__(self, colunas, consulta, campo_data=None, exige_empresa=False, somente_admin=False):
+        self.colunas = colunas
+        self.consulta = consulta
+        self.campo_data = campo_data
+        self.exige_empresa = exige_empresa
+        self.somente_admin = somente_admin
+
+    def verificar_acesso(self, usuario, empresa):
+        """Levanta PermissionDenied se o usuário não puder gerar esta exportação."""
+        if self.somente_admin and not usuario.is_staff:
+            raise PermissionDenied('Exportação disponível apenas para administradores.')
+        if self.exige_empresa and empresa is None:
+            raise PermissionDenied('Empresa não encontrada. Por favor, selecione uma empresa primeiro.')
+
+    def preparar_parametros(self, parametros):
+        """Valida {colunas, inicio, fim} e devolve os parâmetros normalizados (ValueError se inválidos)."""
+        parametros = dict(parametros or {})
+        colunas = parametros.get('colunas') or list(self.colunas)
+        if isinstance(colunas, str):
+            colunas = [coluna.strip() for coluna in colunas.split(',') if coluna.strip()]
+        invalidas = [coluna for coluna in colunas if coluna not in self.colunas]
+        if invalidas:
+            raise ValueError(f"Colunas inválidas: {', '.join(invalidas)}. Colunas disponíveis: {', '.join(self.colunas)}")
+        # Mantém a ordem do registro, como nas exportações diretas
+        normalizados = {'colunas': [coluna for coluna in self.colunas if coluna in colunas]}
+
+        for chave in ('inicio', 'fim'):
+            if parametros.get(chave):
+                if not self.campo_data:
+                    raise ValueError(f'Filtro {chave} não disponível para esta exportação.')
+                try:
+                    normalizados[chave] = date.fromisoformat(str(parametros[chave])).isoformat()
+                except ValueError:
+                    raise ValueError(f'Data inválida em {chave}: use AAAA-MM-DD.')
+        return normalizados
+
+    def queryset(self, usuario, empresa, parametros):
+        self.verificar_acesso(usuario, empresa)
+        queryset = self.consulta(usuario, empresa)
+        if parametros.get('inicio'):
+            queryset = queryset.filter(**{f'{self.campo_data}__gte': parametros['inicio']})
+        if parametros.get('fim'):
+            queryset = queryset.filter(**{f'{self.campo_data}__lte': parametros['fim']})
+        return queryset
+
+
+def _do_influencer(modelo, usuario):
+    # Mesmo escopo das telas do influencer: staff vê tudo, o influencer só o que é dele
+    return modelo.objects.all() if usuario.is_staff else modelo.objects.filter(influencer__usuario=usuario)
+
+
+TIPOS = {
+    'vendas': TipoExportacao(
+        colunas=COLUNAS_VENDAS,
+        consulta=lambda usuario, empresa: Venda.objects.filter(empresa=empresa).order_by('data', 'id'),
+        campo_data='data',
+        exige_empresa=True,
+    ),
+    'marketing': TipoExportacao(
+        colunas={
+            'data': "Data",
+            'campaign_name': "Campanha",
+            'platform': "Plataforma",
+            'clicks': "Cliques",
+            'impressions': "Impressões",
+            'cost': "Custo (R$)",
+            'conversions': "Conversões",
+            'ctr': "CTR (%)",
+            'cpc': "CPC (R$)",
+            'cpm': "CPM (R$)",
+            'conversion_rate': "Taxa de Conversão (%)",
+            'source_file': "Arquivo Original",
+        },
+        consulta=lambda usuario, empresa: MarketingData.objects.filter(empresa=empresa).order_by('data', 'id'),
+        campo_data='data',
+        exige_empresa=True,
+    ),
+    'influencer_vendas': TipoExportacao(
+        colunas={
+            'data_venda': "Data",
+            'produto__nome': "Produto",
+            'cliente_nome': "Cliente",
+            'cliente_email': "E-mail do cliente",
+            'quantidade': "Quantidade",
+            'preco_unitario': "Preço unitário",
+            'preco_total': "Preço total",
+            'comissao': "Comissão",
+            'status': "Status",
+            'origem': "Origem",
+        },
+        consulta=lambda usuario, empresa: _do_influencer(VendaInfluencer, usuario).order_by('data_venda', 'id'),
+        campo_data='data_venda__date',
+    ),
+    'influencer_cliques': TipoExportacao(
+        colunas={
+            'timestamp': "Data",
+            'tipo_clique': "Tipo",
+            'produto__nome': "Produto",
+            'loja_parceira__nome': "Loja parceira",
+        },
+        consulta=lambda usuario, empresa: _do_influencer(Click, usuario).order_by('timestamp', 'id'),
+        campo_data='timestamp__date',
+    ),
+    'admin_empresas': TipoExportacao(
+        colunas={
+            'id': "ID",
+            'sigla': "Sigla",
+            'nome_fantasia': "Nome fantasia",
+            'razao_social': "Razão social",
+            'tipo': "Tipo",
+            'cnpj': "CNPJ",
+            'cpf': "CPF",
+            'email_comercial': "E-mail comercial",
+            'telefone1': "Telefone",
+            'ativo': "Ativa",
+            'created_at': "Criada em",
+        },
+        consulta=lambda usuario, empresa: Empresa.objects.order_by('id'),
+        campo_data='created_at__date',
+        somente_admin=True,
+    ),
+    'admin_assinaturas': TipoExportacao(
+        colunas={
+            'id': "ID",
+            'empresa__sigla': "Empresa",
+            'plano__nome': "Plano",
+            'inicio': "Início",
+            'fim': "Fim",
+            'payment_status': "Status do pagamento",
+            'next_payment_date': "Próximo pagamento",
+            'ativa': "Ativa",
+            'expirada': "Expirada",
+        },
+        consulta=lambda usuario, empresa: Assinatura.objects.order_by('empresa_id', '-inicio'),
+        campo_data='inicio__date',
+        somente_admin=True,
+    ),
+}
@@ -0,0 +1,65 @@
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .models import ExportJob
+from .serializers import ExportJobSerializer
+from .servicos import agendar_exportacao, reenfileirar
+from .tipos import TIPOS
+
+
+class ExportJobViewSet(mixins.CreateModelMixin,
+                       mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    Exportações em segundo plano.
+
+    POST cria o job e responde 202 na hora; o arquivo é gerado fora da
+    requisição. O cliente acompanha `status`/`progresso` pelo GET do job e
+    baixa o resultado em /download/ quando o status for "concluido".
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(usuario=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        empresa = getattr(request, 'empresa', None)
+        try:
+            TIPOS[serializer.validated_data['tipo']].verificar_acesso(request.user, empresa)
+        except PermissionDenied as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+
+        job = serializer.save(usuario=request.user, empresa=empresa)
+        agendar_exportacao(job.pk)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_CONCLUIDO or not job.arquivo:
+            return Response(
+                {'error': 'Exportação ainda não concluída', 'status': job.status, 'progresso': job.progresso},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(job.arquivo.open('rb'), as_attachment=True, filename=job.nome_arquivo())
+
+    @action(detail=True, methods=['post'], url_path='retry')
+    def retry(self, request, pk=None):
+        """Gera de novo uma exportação que terminou com erro."""
+        job = self.get_object()
+        if job.status != ExportJob.STATUS_ERRO:
+            return Response(
+                {'error': 'Só exportações com erro podem ser refeitas'},
+                status=status.HTTP_409_CONFLICT
+            )
+        reenfileirar(job)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
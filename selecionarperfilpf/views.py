@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.authentication import JWTAuthenticationPorRequisicao
 from rest_framework_simplejwt.tokens import RefreshToken
 from usuariospainel.models import UserCompanyLink
 from empresas.models import Empresa
@@ -33,7 +33,7 @@ class SelecionarEmpresaView(APIView):
     View para listar empresas disponíveis para o usuário PF
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def get(self, request):
         if request.user.user_type != 'PF':
@@ -56,7 +56,7 @@ class SelecionarEmpresaJWTView(APIView):
     View para selecionar uma empresa e atualizar o token JWT
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def post(self, request):
         if request.user.user_type != 'PF':
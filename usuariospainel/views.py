@@ -4,7 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from accounts.authentication import JWTAuthenticationPorRequisicao
 from .models import UserCompanyLink
 from .serializers import (
     UserCompanyLinkSerializer,
@@ -27,7 +27,7 @@ class UserCompanyLinkListView(generics.ListAPIView):
     """
     serializer_class = UserCompanyLinkSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def get_queryset(self):
         print(f"[VIEW] Usuário: {self.request.user.email} (tipo: {self.request.user.user_type})")
@@ -71,7 +71,7 @@ class UserCompanyLinkCreateView(generics.CreateAPIView):
     """
     serializer_class = CreateUserCompanyLinkSerializer
     permission_classes = [IsCompanyOwner]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def perform_create(self, serializer):
         if not self.request.user.empresa_atual:
@@ -84,7 +84,7 @@ class UserCompanyLinkDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     serializer_class = UserCompanyLinkSerializer
     permission_classes = [IsCompanyOwner]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def get_queryset(self):
         if hasattr(self.request, 'empresa_id'):
@@ -98,7 +98,7 @@ class UserCompanyLinkAcceptView(APIView):
     View para aceitar um convite de vínculo
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def post(self, request, pk):
         link = get_object_or_404(UserCompanyLink, pk=pk, user=request.user)
@@ -128,7 +128,7 @@ class UserCompanyLinkRejectView(APIView):
     View para rejeitar um convite de vínculo
     """
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def post(self, request, pk):
         link = get_object_or_404(UserCompanyLink, pk=pk, user=request.user)
@@ -152,7 +152,7 @@ class UserCompanyLinkToggleStatusView(APIView):
     View para ativar/desativar um vínculo
     """
     permission_classes = [IsCompanyOwner]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [JWTAuthenticationPorRequisicao]
 
     def post(self, request, pk):
         empresa_id = getattr(request, 'empresa_id', None)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class VendaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'venda'
+
+    def ready(self):
+        # Importa os signals para manter os resumos do dashboard atualizados
+        from . import signals  # noqa: F401
@@ -0,0 +1,200 @@
+"""
+Serviço de clima das vendas.
+
+O campo `clima` de uma Venda guarda a condição do tempo do dia em que ela foi
+registrada. A consulta ao provedor nunca acontece dentro do save: as vendas do
+dia salvas sem clima são preenchidas em segundo plano depois do commit (só as
+gravadas na transação; vendas de datas passadas ficam como estão), e a
+condição de cada (cidade, dia) é memoizada no cache e na tabela ClimaDiario,
+então um dia inteiro de importações custa no máximo uma consulta de rede.
+
+Provedores (setting CLIMA_PROVIDER):
+- 'wttr': previsão do wttr.in, com timeout (CLIMA_TIMEOUT);
+- 'local': sem rede, devolve CLIMA_LOCAL_CONDICAO (testes e desenvolvimento offline).
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from app.background import executar_em_segundo_plano
+from dashboard.cache_utils import invalidar_dashboard
+
+from .models import ClimaDiario, Venda
+
+logger = logging.getLogger(__name__)
+
+CLIMA_PROVIDER = getattr(settings, 'CLIMA_PROVIDER', 'wttr')
+CLIMA_CIDADE = getattr(settings, 'CLIMA_CIDADE', 'Praia Grande')
+CLIMA_TIMEOUT = getattr(settings, 'CLIMA_TIMEOUT', 5)
+CLIMA_LOCAL_CONDICAO = getattr(settings, 'CLIMA_LOCAL_CONDICAO', 'Desconhecido')
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Palavras da descrição do provedor -> condição gravada na venda (primeira que casar)
+CONDICOES = [
+    (('sunny', 'clear'), 'Ensolarado'),
+    (('cloud', 'overcast'), 'Nublado'),
+    (('rain', 'showers'), 'Chuvoso'),
+    (('thunderstorm', 'storm'), 'Tempestade'),
+    (('snow',), 'Nevando'),
+]
+
+# Empresa -> ids das vendas com preenchimento já agendado e ainda não iniciado
+_pendentes = {}
+_pendentes_lock = threading.Lock()
+# Uma consulta ao provedor por vez no processo; as demais reaproveitam o resultado
+_consulta_lock = threading.Lock()
+
+
+def traduzir_condicao(descricao):
+    """Mapeia a descrição em inglês do provedor para os estados usados nas vendas."""
+    descricao = descricao.lower()
+    for palavras, condicao in CONDICOES:
+        if any(palavra in descricao for palavra in palavras):
+            return condicao
+    return 'Desconhecido'
+
+
+# ----------------------------------------------------------------------
+# Provedores: devolvem {data: condição} para os dias que conseguirem informar
+# ----------------------------------------------------------------------
+
+def _consultar_wttr(cidade):
+    resposta = requests.get(f'https://wttr.in/{quote(cidade)}?format=j1', timeout=CLIMA_TIMEOUT)
+    resposta.raise_for_status()
+    condicoes = {}
+    for dia in resposta.json().get('weather', []):
+        # Condição mais frequente ao longo das horas do dia
+        descricoes = [
+            hora['weatherDesc'][0]['value']
+            for hora in dia.get('hourly', [])
+            if hora.get('weatherDesc')
+        ]
+        data = datetime.strptime(dia['date'], '%Y-%m-%d').date()
+        condicoes[data] = traduzir_condicao(Counter(descricoes).most_common(1)[0][0]) if descricoes else 'Desconhecido'
+    return condicoes
+
+
+def _consultar_local(cidade):
+    return {date.today(): CLIMA_LOCAL_CONDICAO}
+
+
+PROVEDORES = {
+    'wttr': _consultar_wttr,
+    'local': _consultar_local,
+}
+
+
+# ----------------------------------------------------------------------
+# Consulta memoizada
+# ----------------------------------------------------------------------
+
+def _chave_cache(cidade, dia):
+    return f"clima:{cidade.lower().replace(' ', '_')}:{dia.isoformat()}"
+
+
+def condicao_do_dia(dia=None, cidade=None):
+    """
+    Condição do tempo da cidade no dia (padrão: hoje em CLIMA_CIDADE).
+
+    Procura no cache, depois na tabela ClimaDiario e só então no provedor; todos
+    os dias devolvidos pelo provedor são gravados. Devolve None se o provedor
+    falhar, para que a venda continue sem clima e seja preenchida numa próxima vez.
+    """
+    dia = dia or date.today()
+    cidade = cidade or CLIMA_CIDADE
+    condicao = _memoizada(cidade, dia)
+    if condicao is not None:
+        return condicao
+
+    with _consulta_lock:
+        condicao = _memoizada(cidade, dia)
+        if condicao is not None:
+            return condicao
+        return _consultar_provedor(cidade, dia)
+
+
+def _memoizada(cidade, dia):
+    chave = _chave_cache(cidade, dia)
+    condicao = cache.get(chave)
+    if condicao is not None:
+        return condicao
+
+    registro = ClimaDiario.objects.filter(cidade=cidade, data=dia).values_list('condicao', flat=True).first()
+    if registro is not None:
+        cache.set(chave, registro, CACHE_TIMEOUT)
+    return registro
+
+
+def _consultar_provedor(cidade, dia):
+    try:
+        condicoes = PROVEDORES[CLIMA_PROVIDER](cidade)
+    except Exception as e:
+        logger.warning(f"[CLIMA] Provedor {CLIMA_PROVIDER} indisponível para {cidade}: {str(e)}")
+        return None
+
+    for data, valor in condicoes.items():
+        ClimaDiario.objects.update_or_create(cidade=cidade, data=data, defaults={'condicao': valor})
+        cache.set(_chave_cache(cidade, data), valor, CACHE_TIMEOUT)
+    return condicoes.get(dia)
+
+
+# ----------------------------------------------------------------------
+# Preenchimento das vendas
+# ----------------------------------------------------------------------
+
+def precisa_de_clima(venda):
+    """Venda do dia ainda sem clima (a condição de hoje não vale para outras datas)."""
+    return not venda.clima and venda.data == date.today()
+
+
+def preencher_clima(empresa_id):
+    """
+    Grava a condição de hoje nas vendas agendadas da empresa que são de hoje e
+    ainda estão sem clima. Retorna quantas foram atualizadas.
+    """
+    with _pendentes_lock:
+        ids = _pendentes.pop(empresa_id, set())
+    if not ids:
+        return 0
+
+    hoje = date.today()
+    condicao = condicao_do_dia(hoje)
+    if condicao is None:
+        return 0
+
+    vendas = Venda.objects.filter(Q(clima__isnull=True) | Q(clima=''), id__in=ids, data=hoje)
+    # update() não dispara os signals: o clima não entra nos resumos do dashboard
+    atualizadas = vendas.update(clima=condicao)
+    if atualizadas and empresa_id:
+        # A listagem de vendas mostra o clima: renova o ETag dela
+        invalidar_dashboard(empresa_id)
+    return atualizadas
+
+
+def agendar_preenchimento_clima(empresa_id, venda_ids):
+    """
+    Preenche o clima das vendas informadas da empresa em segundo plano, depois do commit.
+
+    Várias vendas salvas na mesma transação (importação) geram um único preenchimento.
+    """
+    venda_ids = set(venda_ids)
+    if not venda_ids:
+        return
+
+    def executar():
+        with _pendentes_lock:
+            agendado = empresa_id in _pendentes
+            _pendentes.setdefault(empresa_id, set()).update(venda_ids)
+        if not agendado:
+            executar_em_segundo_plano(preencher_clima, empresa_id)
+
+    transaction.on_commit(executar)
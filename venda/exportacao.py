@@ -0,0 +1,148 @@
+"""
+Exportação de vendas.
+
+As colunas exportáveis ficam registradas em COLUNAS (chave do parâmetro
+?columns= -> título no arquivo). As linhas saem de `values_list(...).iterator()`,
+então a memória usada não cresce com o número de vendas da empresa: o CSV é
+enviado em pedaços e o Excel é escrito pelo openpyxl em modo write-only num
+arquivo temporário.
+"""
+import csv
+import tempfile
+
+from django.utils.text import compress_sequence
+from openpyxl import Workbook
+
+from .models import PLATAFORMA_CHOICES
+
+# chave (campo de Venda) -> título da coluna, na ordem do arquivo
+COLUNAS = {
+    'data': "Data",
+    # Parte da chave (data, plataforma) usada pela importação
+    'plataforma': "Plataforma",
+    'mes': "Mês",
+    'ano': "Ano",
+    'semana': "Semana",
+    'invest_realizado': "Invest. Realizado",
+    'invest_projetado': "Invest. Projetado",
+    'saldo_invest': "Saldo Invest.",
+    'vendas_google': "Vendas Google",
+    'vendas_instagram': "Vendas Instagram",
+    'vendas_facebook': "Vendas Facebook",
+    'fat_proj': "FAT Projetado",
+    'fat_camp_realizado': "FAT Campanha",
+    'fat_geral': "FAT Geral",
+    'saldo_fat': "Saldo FAT",
+    'roi_realizado': "ROI",
+    'roas_realizado': "ROAS",
+    'cac_realizado': "CAC",
+    'ticket_medio_realizado': "TKT Médio",
+    'arpu_realizado': "ARPU",
+    'leads': "Leads",
+    'clientes_novos': "Novos",
+    'clientes_recorrentes': "Recorrentes",
+    'conversoes': "Conversões",
+    'taxa_conversao': "Taxa Conv.",
+    'clima': "Clima",
+}
+
+# Separação opcional do Excel em várias planilhas: ?sheets= -> campo agrupador
+SEPARACOES = {
+    'plataforma': 'plataforma',
+    'ano': 'data__year',
+}
+
+TAMANHO_BLOCO = 2000
+# Linhas de CSV juntadas em cada pedaço enviado ao cliente
+LINHAS_POR_PEDACO = 500
+
+
+def colunas_pedidas(parametro):
+    """
+    Colunas pedidas em ?columns= (todas quando vazio), na ordem do registro.
+
+    Levanta ValueError com as chaves desconhecidas.
+    """
+    if not parametro:
+        return list(COLUNAS)
+    pedidas = [coluna.strip() for coluna in parametro.split(',') if coluna.strip()]
+    invalidas = [coluna for coluna in pedidas if coluna not in COLUNAS]
+    if invalidas or not pedidas:
+        raise ValueError(', '.join(invalidas))
+    return [coluna for coluna in COLUNAS if coluna in pedidas]
+
+
+def linhas(queryset, colunas, chunk_size=TAMANHO_BLOCO):
+    """Tuplas com os valores das colunas, lidas do banco em blocos."""
+    indice_data = colunas.index('data') if 'data' in colunas else None
+    for linha in queryset.values_list(*colunas).iterator(chunk_size=chunk_size):
+        if indice_data is not None and linha[indice_data]:
+            linha = list(linha)
+            linha[indice_data] = linha[indice_data].strftime("%d/%m/%Y")
+        yield linha
+
+
+class _Eco:
+    """Arquivo falso para o csv.writer: devolve a linha formatada em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(queryset, colunas, chunk_size=TAMANHO_BLOCO):
+    """Gera o CSV (cabeçalho + linhas) em pedaços de bytes UTF-8."""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([COLUNAS[coluna] for coluna in colunas]).encode('utf-8')
+    pedaco = []
+    for linha in linhas(queryset, colunas, chunk_size):
+        pedaco.append(escritor.writerow(linha))
+        if len(pedaco) >= LINHAS_POR_PEDACO:
+            yield ''.join(pedaco).encode('utf-8')
+            pedaco = []
+    if pedaco:
+        yield ''.join(pedaco).encode('utf-8')
+
+
+def gerar_csv_gzip(queryset, colunas, chunk_size=TAMANHO_BLOCO):
+    """O mesmo CSV compactado em gzip, também em pedaços."""
+    return compress_sequence(gerar_csv(queryset, colunas, chunk_size))
+
+
+def _titulo_planilha(separar_por, chave):
+    if separar_por == 'plataforma':
+        return dict(PLATAFORMA_CHOICES).get(chave, chave or 'Sem plataforma')
+    return str(chave) if chave else 'Sem ano'
+
+
+def gerar_excel(queryset, colunas, separar_por=None, chunk_size=TAMANHO_BLOCO):
+    """
+    Escreve o .xlsx em um arquivo temporário e o devolve aberto no início.
+
+    Com `separar_por` ('plataforma' ou 'ano') cada valor vira uma planilha; as
+    vendas são lidas ordenadas por esse campo, então cada planilha é escrita de
+    uma vez. O arquivo some ao ser fechado (o FileResponse fecha ao terminar).
+    """
+    workbook = Workbook(write_only=True)
+    cabecalho = [COLUNAS[coluna] for coluna in colunas]
+
+    if separar_por is None:
+        planilha = workbook.create_sheet('Vendas')
+        planilha.append(cabecalho)
+        for linha in linhas(queryset, colunas, chunk_size):
+            planilha.append(linha)
+    else:
+        campo = SEPARACOES[separar_por]
+        chave_atual, planilha = object(), None
+        for chave, *linha in linhas(queryset.order_by(campo, 'data'), [campo] + colunas, chunk_size):
+            if chave != chave_atual:
+                chave_atual = chave
+                planilha = workbook.create_sheet(_titulo_planilha(separar_por, chave))
+                planilha.append(cabecalho)
+            planilha.append(linha)
+        if planilha is None:
+            workbook.create_sheet('Vendas').append(cabecalho)
+
+    arquivo = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
@@ -1,11 +1,11 @@
 from django import forms
 from .models import Venda
-from .utils import obter_clima
 
 class VendaForm(forms.ModelForm):
     class Meta:
         model = Venda
-        exclude = ['clima']
+        # Clima e campos temporais inteiros são preenchidos pelo modelo
+        exclude = ['clima', 'iso_ano', 'iso_semana', 'mes_num']
 
         widgets = {
             'data': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
@@ -63,7 +63,6 @@ class VendaForm(forms.ModelForm):
 
     def save(self, commit=True):
         instance = super().save(commit=False)
-        instance.clima = obter_clima()
         if commit:
             instance.save()
         return instance
@@ -0,0 +1,246 @@
+"""
+Importação de vendas a partir de planilhas (CSV ou XLSX).
+
+Aceita o mesmo layout da exportação: a primeira linha traz os títulos de
+COLUNAS (ou as próprias chaves, como em ?columns=), e as colunas calculadas
+(mês, ano, semana, saldos e KPIs) são ignoradas e recalculadas. A plataforma
+vem da coluna "Plataforma", do nome da planilha (o Excel exportado com
+?sheets=plataforma) ou do padrão informado. A mesma chave (data, plataforma)
+repetida no arquivo é relatada como erro; vale a primeira linha.
+
+O arquivo é lido em streaming (csv.reader / openpyxl `read_only=True`) e as
+vendas são gravadas em blocos pela chave (empresa, data, plataforma): a chave
+existente é atualizada, a nova é criada. A memória usada depende do tamanho
+do bloco, não do arquivo.
+"""
+import csv
+import io
+import logging
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from openpyxl import load_workbook
+
+from .exportacao import COLUNAS
+from .lote import TAMANHO_BLOCO, agendar_manutencao, gravar_vendas_por_chave, sem_clima
+from .models import PLATAFORMA_CHOICES, Venda
+from .serializers import VendaSerializer
+
+logger = logging.getLogger(__name__)
+
+# Colunas de valores lidas da planilha; as calculadas pelo modelo ficam de fora
+# (a plataforma faz parte da chave e é tratada à parte)
+CAMPOS_IMPORTADOS = [
+    campo for campo in COLUNAS
+    if campo not in VendaSerializer.Meta.read_only_fields and campo != 'plataforma'
+]
+CAMPOS_INTEIROS = {'leads', 'clientes_novos', 'clientes_recorrentes', 'conversoes'}
+
+# Título normalizado -> campo (títulos da exportação, chaves e a plataforma)
+TITULOS = {titulo.strip().lower(): campo for campo, titulo in COLUNAS.items()}
+TITULOS.update({campo: campo for campo in COLUNAS})
+TITULOS.update({'plataforma': 'plataforma'})
+
+# Valor normalizado (chave ou nome exibido) -> plataforma
+PLATAFORMAS = {chave: chave for chave, _ in PLATAFORMA_CHOICES}
+PLATAFORMAS.update({nome.lower(): chave for chave, nome in PLATAFORMA_CHOICES})
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y')
+MAX_ERROS = 100
+
+
+class ErroImportacao(ValueError):
+    """Arquivo que não pode ser importado (formato ou cabeçalho inválido)."""
+
+
+def _texto(valor):
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+def _data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f'data inválida: {valor!r}')
+
+
+def _decimal(valor):
+    if isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+        return Decimal(str(valor))
+    texto = valor.replace('R$', '').strip()
+    if ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f'número inválido: {valor!r}')
+
+
+def _inteiro(valor):
+    numero = _decimal(valor)
+    if numero != numero.to_integral_value():
+        raise ValueError(f'inteiro inválido: {valor!r}')
+    return int(numero)
+
+
+def _plataforma(valor):
+    plataforma = PLATAFORMAS.get(str(valor).strip().lower())
+    if plataforma is None:
+        raise ValueError(f'plataforma inválida: {valor!r}')
+    return plataforma
+
+
+def _mapear_cabecalho(cabecalho):
+    """Índice da coluna -> campo; colunas desconhecidas ou calculadas são ignoradas."""
+    mapa = {}
+    for indice, titulo in enumerate(cabecalho):
+        campo = TITULOS.get(str(titulo).strip().lower()) if titulo is not None else None
+        if campo == 'plataforma' or campo in CAMPOS_IMPORTADOS:
+            mapa[indice] = campo
+    if 'data' not in mapa.values():
+        raise ErroImportacao('Cabeçalho sem a coluna "Data".')
+    return mapa
+
+
+def _planilhas_csv(arquivo):
+    """[(None, linhas)] de um CSV UTF-8 separado por vírgula ou ponto e vírgula."""
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    if isinstance(amostra, bytes):
+        amostra = amostra.decode('utf-8-sig', errors='ignore')
+        arquivo = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        dialeto = csv.Sniffer().sniff(amostra.split('\n', 1)[0], delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    yield None, csv.reader(arquivo, dialeto)
+
+
+def _planilhas_xlsx(arquivo):
+    """(título, linhas) de cada planilha, lidas em modo read-only."""
+    try:
+        workbook = load_workbook(arquivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ErroImportacao(f'Arquivo Excel inválido: {str(e)}')
+    try:
+        for planilha in workbook.worksheets:
+            yield planilha.title, planilha.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+LEITORES = {
+    'csv': _planilhas_csv,
+    'xlsx': _planilhas_xlsx,
+}
+
+
+def formato_do_arquivo(nome):
+    """'csv' ou 'xlsx' pela extensão do nome; ErroImportacao nos demais."""
+    extensao = (nome or '').rsplit('.', 1)[-1].lower()
+    if extensao not in LEITORES:
+        raise ErroImportacao('Formato não suportado: envie um arquivo .csv ou .xlsx.')
+    return extensao
+
+
+def _converter(linha, mapa, plataforma_planilha):
+    """Linha da planilha -> (chave, valores) ou None se estiver vazia."""
+    valores = {}
+    for indice, campo in mapa.items():
+        valor = _texto(linha[indice]) if indice < len(linha) else None
+        valores[campo] = None if valor in (None, '') else valor
+    if all(valor is None for valor in valores.values()):
+        return None
+
+    if valores['data'] is None:
+        raise ValueError('data vazia')
+    data = _data(valores.pop('data'))
+    plataforma = valores.pop('plataforma', None)
+    plataforma = _plataforma(plataforma) if plataforma is not None else plataforma_planilha
+
+    for campo, valor in valores.items():
+        if valor is None:
+            continue
+        valores[campo] = _inteiro(valor) if campo in CAMPOS_INTEIROS else _decimal(valor)
+    return (data, plataforma), valores
+
+
+def importar_vendas(empresa, arquivo, formato, plataforma=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Importa as vendas do arquivo para a empresa.
+
+    Cada bloco é gravado na sua própria transação; linhas inválidas são puladas
+    e relatadas. Retorna {'criadas', 'atualizadas', 'ignoradas', 'erros'} com
+    até MAX_ERROS erros no formato {'planilha', 'linha', 'erro'}.
+    """
+    plataforma_padrao = _plataforma(plataforma) if plataforma else Venda._meta.get_field('plataforma').default
+    resultado = {'criadas': 0, 'atualizadas': 0, 'ignoradas': 0, 'erros': []}
+    meses = set()
+    # Só as vendas do dia gravadas aqui recebem o clima
+    vendas_sem_clima = set()
+    bloco = {}
+    # Chave -> (planilha, linha) da primeira ocorrência no arquivo; limitada a
+    # dias x plataformas, não ao número de linhas
+    lidas = {}
+
+    def ignorar(titulo, numero, erro):
+        resultado['ignoradas'] += 1
+        if len(resultado['erros']) < MAX_ERROS:
+            resultado['erros'].append({'planilha': titulo, 'linha': numero, 'erro': erro})
+
+    def gravar():
+        criadas, atualizadas, meses_bloco = gravar_vendas_por_chave(empresa, bloco, tamanho_bloco)
+        resultado['criadas'] += len(criadas)
+        resultado['atualizadas'] += len(atualizadas)
+        meses.update(meses_bloco)
+        vendas_sem_clima.update(sem_clima(criadas + atualizadas))
+        bloco.clear()
+
+    try:
+        for titulo, linhas in LEITORES[formato](arquivo):
+            # Planilha com nome de plataforma (exportação separada por plataforma)
+            plataforma_planilha = PLATAFORMAS.get((titulo or '').strip().lower(), plataforma_padrao)
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                continue
+            mapa = _mapear_cabecalho(cabecalho)
+
+            for numero, linha in enumerate(linhas, start=2):
+                try:
+                    convertida = _converter(linha, mapa, plataforma_planilha)
+                except ValueError as e:
+                    ignorar(titulo, numero, str(e))
+                    continue
+                if convertida is None:
+                    continue
+                chave, valores = convertida
+                if chave in lidas:
+                    planilha_anterior, linha_anterior = lidas[chave]
+                    origem = f'linha {linha_anterior}' + (f' da planilha {planilha_anterior}' if planilha_anterior else '')
+                    ignorar(titulo, numero, (
+                        f"data {chave[0].strftime('%d/%m/%Y')} e plataforma {chave[1]} repetidas "
+                        f"(já lidas na {origem})"
+                    ))
+                    continue
+                lidas[chave] = (titulo, numero)
+                bloco[chave] = valores
+                if len(bloco) >= tamanho_bloco:
+                    gravar()
+        if bloco:
+            gravar()
+    finally:
+        # Os blocos já gravados ficam: a manutenção deles roda mesmo se o arquivo falhar no meio
+        agendar_manutencao(meses, vendas_sem_clima)
+
+    logger.info(
+        f"[VENDAS IMPORTACAO] Empresa {empresa.id}: {resultado['criadas']} criadas, "
+        f"{resultado['atualizadas']} atualizadas, {resultado['ignoradas']} ignoradas"
+    )
+    return resultado
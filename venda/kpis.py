@@ -0,0 +1,176 @@
+"""
+KPIs derivados de Venda calculados por coluna para um lote inteiro.
+
+Aplica as mesmas regras de `Venda.save()` (saldos, ROI, ROAS, ARPU, taxa de
+conversão e CAC), mas operando sobre colunas do lote em vez de linha a linha e
+sem o log de cada cálculo. Os valores continuam Decimal (arrays NumPy de objetos)
+para que o resultado gravado seja idêntico ao do save.
+
+`expressoes_kpis()` traz as mesmas regras como expressões de banco, para
+recalcular linhas já gravadas com UPDATE sem carregá-las no Python.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db.models import Case, DecimalField, F, FloatField, Q, Value, When
+from django.db.models.functions import Abs, Cast, Coalesce, Floor, Mod, Round
+from django.db.models.lookups import Exact, GreaterThan, IsNull, LessThan
+
+from .models import Venda
+
+CAMPOS_KPIS = [
+    'saldo_invest', 'saldo_fat', 'roi_realizado', 'roas_realizado',
+    'arpu_realizado', 'taxa_conversao', 'cac_realizado',
+]
+
+ZERO_MOEDA = Decimal('0.00')
+ZERO_TAXA = Decimal('0.000')
+
+
+def _coluna(vendas, campo):
+    return np.array([getattr(venda, campo) for venda in vendas], dtype=object)
+
+
+def _dividir(numerador, denominador, padrao):
+    """numerador / denominador onde o denominador não é zero; `padrao` no restante."""
+    resultado = np.full(len(numerador), padrao, dtype=object)
+    validos = denominador != 0
+    resultado[validos] = numerador[validos] / denominador[validos]
+    return resultado
+
+
+def calcular_kpis(vendas):
+    """
+    Preenche os campos derivados de uma lista de vendas (já com valores válidos).
+
+    Assim como no save, ROI e ROAS só são recalculados quando há investimento realizado.
+    """
+    if not vendas:
+        return vendas
+
+    invest_realizado = _coluna(vendas, 'invest_realizado')
+    fat_camp_realizado = _coluna(vendas, 'fat_camp_realizado')
+    fat_geral = _coluna(vendas, 'fat_geral')
+    clientes_novos = _coluna(vendas, 'clientes_novos')
+
+    calculados = {
+        'saldo_invest': _coluna(vendas, 'invest_projetado') - invest_realizado,
+        'saldo_fat': fat_geral - _coluna(vendas, 'fat_proj'),
+        'arpu_realizado': _dividir(fat_geral, _coluna(vendas, 'clientes_recorrentes'), ZERO_MOEDA),
+        'taxa_conversao': _dividir(clientes_novos, _coluna(vendas, 'leads'), ZERO_TAXA),
+        'cac_realizado': _dividir(invest_realizado, clientes_novos, ZERO_MOEDA),
+    }
+
+    # Se o faturamento da campanha for igual ao investimento, o ROI usa o faturamento geral
+    com_invest = invest_realizado != 0
+    base_roi = np.where(fat_camp_realizado == invest_realizado, fat_geral, fat_camp_realizado)
+    roi = _coluna(vendas, 'roi_realizado')
+    roas = _coluna(vendas, 'roas_realizado')
+    roi[com_invest] = (base_roi[com_invest] - invest_realizado[com_invest]) / invest_realizado[com_invest]
+    roas[com_invest] = fat_camp_realizado[com_invest] / invest_realizado[com_invest]
+    calculados['roi_realizado'] = roi
+    calculados['roas_realizado'] = roas
+
+    for campo, valores in calculados.items():
+        for venda, valor in zip(vendas, valores):
+            setattr(venda, campo, valor)
+    return vendas
+
+
+# ----------------------------------------------------------------------
+# Versão em expressões de banco
+# ----------------------------------------------------------------------
+
+def _valor(campo):
+    # Campo nulo vale zero, como em Venda._ensure_valid_values
+    return Coalesce(F(campo), Value(0), output_field=DecimalField())
+
+
+def _real(campo):
+    # Divisão em ponto flutuante: no SQLite um decimal inteiro é gravado como INTEGER
+    return Cast(_valor(campo), FloatField())
+
+
+def _zero(campo):
+    return Q(**{campo: 0}) | Q(**{f'{campo}__isnull': True})
+
+
+def _casas(campo):
+    return Venda._meta.get_field(campo).decimal_places
+
+
+def expressoes_kpis():
+    """{campo: expressão} com os KPIs derivados calculados pelo banco (sem arredondar)."""
+    invest = _real('invest_realizado')
+    fat_camp = _real('fat_camp_realizado')
+    fat_geral = _real('fat_geral')
+
+    return {
+        'saldo_invest': Cast(_valor('invest_projetado') - _valor('invest_realizado'), FloatField()),
+        'saldo_fat': Cast(_valor('fat_geral') - _valor('fat_proj'), FloatField()),
+        # Sem investimento realizado, o save mantém ROI e ROAS como estão
+        'roi_realizado': Case(
+            When(_zero('invest_realizado'), then=F('roi_realizado')),
+            When(Exact(_valor('fat_camp_realizado'), _valor('invest_realizado')), then=(fat_geral - invest) / invest),
+            default=(fat_camp - invest) / invest,
+            output_field=FloatField(),
+        ),
+        'roas_realizado': Case(
+            When(_zero('invest_realizado'), then=F('roas_realizado')),
+            default=fat_camp / invest,
+            output_field=FloatField(),
+        ),
+        'arpu_realizado': Case(
+            When(_zero('clientes_recorrentes'), then=Value(ZERO_MOEDA)),
+            default=fat_geral / _real('clientes_recorrentes'),
+            output_field=FloatField(),
+        ),
+        'taxa_conversao': Case(
+            When(_zero('leads'), then=Value(ZERO_TAXA)),
+            default=_real('clientes_novos') / _real('leads'),
+            output_field=FloatField(),
+        ),
+        'cac_realizado': Case(
+            When(_zero('clientes_novos'), then=Value(ZERO_MOEDA)),
+            default=invest / _real('clientes_novos'),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def valor_gravado(campo, expressao):
+    """
+    Expressão arredondada às casas decimais do campo, para o UPDATE.
+
+    Arredonda "metade para o par", como o Decimal do save: o ROUND do banco
+    levaria 30,625 a 30,63 onde o save grava 30,62.
+    """
+    escala = 10 ** _casas(campo)
+    escalado = expressao * Value(float(escala))
+    piso = Floor(escalado)
+    empate = Q(LessThan(Abs(escalado - piso - Value(0.5)), Value(1e-9)))
+    par = Case(
+        When(Q(Exact(Mod(piso, Value(2)), Value(0))), then=piso),
+        default=piso + Value(1),
+        output_field=FloatField(),
+    )
+    return Case(
+        When(empate, then=par / Value(float(escala))),
+        default=Round(expressao, _casas(campo)),
+        output_field=DecimalField(),
+    )
+
+
+def filtro_divergente(campo, expressao):
+    """
+    Q das linhas em que o valor gravado de `campo` não corresponde ao recalculado.
+
+    A diferença precisa passar de meia unidade da última casa, para que um
+    empate exato (ex.: 0,125 gravado como 0,12 ou 0,13) não conte como divergência.
+    """
+    tolerancia = 0.5 * 10 ** -_casas(campo) + 1e-9
+    diferenca = Abs(Cast(F(campo), FloatField()) - expressao)
+    return (
+        Q(GreaterThan(diferenca, Value(tolerancia)))
+        | (Q(**{f'{campo}__isnull': True}) & ~Q(IsNull(expressao, True)))
+    )
@@ -0,0 +1,89 @@
+"""
+Serialização só de leitura das vendas, direto de `values()`.
+
+O VendaSerializer monta uma instância de Venda por linha e passa cada campo
+pelo `to_representation` genérico do DRF (o DecimalField refaz o quantize com
+um contexto novo a cada valor). Aqui os conversores são montados uma vez, a
+partir dos próprios campos do VendaSerializer, e aplicados aos dicionários do
+`values()`; o JSON resultante é o mesmo.
+"""
+import decimal
+
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.settings import api_settings
+
+from .serializers import VendaSerializer
+
+
+def _conversor_decimal(campo):
+    coerce_to_string = getattr(campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if (not coerce_to_string or campo.localize or campo.normalize_output
+            or campo.decimal_places is None or campo.rounding is not None):
+        return campo.to_representation
+    # Mesmo arredondamento do quantize do DRF (o do contexto, ROUND_HALF_EVEN)
+    formato = f'.{campo.decimal_places}f'
+    # Acima disso o quantize do DRF estoura o max_digits; fica com o campo
+    limite = campo.max_digits - campo.decimal_places if campo.max_digits is not None else None
+
+    def converter(valor):
+        if isinstance(valor, decimal.Decimal) and valor.is_finite() and (limite is None or valor.adjusted() < limite):
+            return format(valor, formato)
+        return campo.to_representation(valor)
+    return converter
+
+
+def _conversor_data(campo):
+    formato = getattr(campo, 'format', api_settings.DATE_FORMAT)
+    if formato is None:
+        return campo.to_representation
+    if formato.lower() == drf_fields.ISO_8601:
+        return lambda valor: valor.isoformat() if not isinstance(valor, str) else valor
+    return campo.to_representation
+
+
+def _conversor(campo):
+    """Função valor -> representação equivalente a `campo.to_representation`."""
+    tipo = type(campo)
+    if tipo is drf_fields.DecimalField:
+        return _conversor_decimal(campo)
+    if tipo is drf_fields.DateField:
+        return _conversor_data(campo)
+    if tipo is drf_fields.IntegerField:
+        return int
+    if tipo is drf_fields.CharField:
+        return str
+    if tipo is relations.PrimaryKeyRelatedField and campo.pk_field is None:
+        # values('empresa') já traz a chave primária
+        return None
+    return campo.to_representation
+
+
+class LeitorVendas:
+    """
+    Serializa vendas a partir de `values()`, com o mesmo JSON do VendaSerializer.
+
+        leitor = LeitorVendas(['data', 'fat_geral'])
+        dados = leitor.serializar(leitor.valores(queryset))
+    """
+
+    def __init__(self, campos=None):
+        campos_serializer = VendaSerializer(fields=campos).fields
+        self.campos = list(campos_serializer)
+        self.conversores = [(nome, _conversor(campo)) for nome, campo in campos_serializer.items()]
+
+    def valores(self, queryset, extras=()):
+        """queryset.values() com as colunas do leitor (e `extras`, como a chave do cursor)."""
+        return queryset.values(*dict.fromkeys([*self.campos, *extras]))
+
+    def serializar(self, linhas):
+        conversores = self.conversores
+        resultado = []
+        for linha in linhas:
+            item = {}
+            for nome, converter in conversores:
+                valor = linha[nome]
+                # Como no ModelSerializer: None sai como None, sem passar pelo campo
+                item[nome] = valor if valor is None or converter is None else converter(valor)
+            resultado.append(item)
+        return resultado
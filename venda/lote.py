@@ -0,0 +1,189 @@
+"""
+Criação e atualização de vendas em lote.
+
+Substitui o caminho linha a linha (serializer + `Venda.save()` + signals) por
+um único cálculo de KPIs para o lote, `bulk_create`/`bulk_update` em blocos e
+uma única manutenção por mês afetado (as linhas de VendaPlataforma são
+regravadas junto com cada bloco): os resumos do dashboard são recalculados
+uma vez por (empresa, mês), o cache é invalidado uma vez por empresa e o clima
+das vendas do dia é preenchido em segundo plano, tudo depois do commit.
+"""
+import logging
+from datetime import date
+
+from django.db import connection, transaction
+
+from dashboard.cache_utils import agendar_invalidacao
+
+from .clima import agendar_preenchimento_clima, precisa_de_clima
+from .kpis import calcular_kpis
+from .models import Venda
+from .plataformas import sincronizar_plataformas
+from .resumos import agendar_recalculo
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 1000
+
+# Campos regravados na atualização em lote (a chave e o clima não mudam)
+CAMPOS_ATUALIZAVEIS = [
+    campo.name for campo in Venda._meta.concrete_fields
+    if not campo.primary_key and campo.name not in ('empresa', 'data', 'plataforma', 'clima')
+]
+
+
+def criar_vendas(vendas, batch_size=TAMANHO_BLOCO):
+    """Grava as vendas (instâncias novas, não salvas) com bulk_create. Retorna a lista gravada."""
+    if not vendas:
+        return vendas
+
+    for venda in vendas:
+        venda.preencher_campos_temporais()
+        venda._ensure_valid_values()
+    calcular_kpis(vendas)
+
+    with transaction.atomic():
+        inserir_vendas(vendas, batch_size=batch_size)
+        sincronizar_plataformas(vendas, batch_size=batch_size)
+        meses = meses_afetados(vendas)
+        agendar_manutencao(meses, sem_clima(vendas))
+
+    logger.info(f"[VENDAS LOTE] {len(vendas)} vendas criadas em {len(meses)} mês(es)")
+    return vendas
+
+
+def inserir_vendas(vendas, batch_size=TAMANHO_BLOCO):
+    """
+    bulk_create que deixa o pk em todas as vendas, mesmo sem RETURNING.
+
+    No MySQL (can_return_rows_from_bulk_insert falso) o bulk_create não devolve
+    os ids: relê, na mesma transação, os ids das chaves (empresa, data,
+    plataforma) inseridas e atribui os novos em ordem às vendas. Quem chama
+    abre a transação.
+    """
+    if not vendas:
+        return
+    if connection.features.can_return_rows_from_bulk_insert:
+        Venda.objects.bulk_create(vendas, batch_size=batch_size)
+        return
+
+    anteriores = _ids_por_chave(vendas)
+    Venda.objects.bulk_create(vendas, batch_size=batch_size)
+    novos = {
+        chave: iter([venda_id for venda_id in ids if venda_id not in anteriores.get(chave, ())])
+        for chave, ids in _ids_por_chave(vendas).items()
+    }
+    for venda in vendas:
+        venda.pk = next(novos[(venda.empresa_id, venda.data, venda.plataforma)])
+
+
+def _ids_por_chave(vendas):
+    """{(empresa_id, data, plataforma): [ids em ordem crescente]} gravados para as chaves das vendas."""
+    chaves = {(venda.empresa_id, venda.data, venda.plataforma) for venda in vendas}
+    ids = {}
+    consulta = Venda.objects.filter(
+        empresa_id__in={empresa_id for empresa_id, _, _ in chaves},
+        data__in={data for _, data, _ in chaves},
+    ).order_by('id').values_list('id', 'empresa_id', 'data', 'plataforma')
+    for venda_id, *chave in consulta.iterator(chunk_size=TAMANHO_BLOCO):
+        if tuple(chave) in chaves:
+            ids.setdefault(tuple(chave), []).append(venda_id)
+    return ids
+
+
+def meses_afetados(vendas):
+    """{(empresa_id, primeiro dia do mês)} das vendas informadas."""
+    return {(venda.empresa_id, date(venda.data.year, venda.data.month, 1)) for venda in vendas}
+
+
+def sem_clima(vendas):
+    """{(empresa_id, id)} das vendas gravadas que precisam do clima do dia."""
+    return {(venda.empresa_id, venda.pk) for venda in vendas if precisa_de_clima(venda)}
+
+
+def agendar_manutencao(meses, vendas_sem_clima=()):
+    """
+    bulk_create/bulk_update não disparam os signals de Venda: agenda a manutenção
+    uma vez por mês/empresa (resumos) e por empresa (cache e clima). O clima é
+    preenchido só nas vendas de `vendas_sem_clima` ({(empresa_id, id)}, ver `sem_clima`).
+    """
+    for empresa_id, mes in sorted(meses, key=lambda item: (item[0] or 0, item[1])):
+        agendar_recalculo(empresa_id, mes)
+    for empresa_id in {empresa_id for empresa_id, _ in meses}:
+        agendar_invalidacao(empresa_id)
+    ids = {}
+    for empresa_id, venda_id in vendas_sem_clima:
+        ids.setdefault(empresa_id, set()).add(venda_id)
+    for empresa_id, venda_ids in ids.items():
+        agendar_preenchimento_clima(empresa_id, venda_ids)
+
+
+def gravar_vendas_por_chave(empresa, linhas, batch_size=TAMANHO_BLOCO):
+    """
+    Grava um bloco de vendas da empresa pela chave (data, plataforma).
+
+    `linhas` é {(data, plataforma): {campo: valor}}. Chaves já gravadas são
+    atualizadas só nos campos informados (os derivados são recalculados); as
+    demais viram vendas novas. Duas leituras, um INSERT em lote e um UPDATE
+    em lote por bloco. Retorna (criadas, atualizadas, meses afetados); a
+    manutenção dos meses fica com quem chama (`agendar_manutencao`).
+    """
+    if not linhas:
+        return [], [], set()
+
+    # Só as chaves e o pk das datas do bloco (índice empresa + data); com a
+    # chave repetida no banco, atualiza a venda mais antiga
+    ids = {}
+    chaves = Venda.objects.filter(empresa=empresa, data__in={data for data, _ in linhas}).order_by('-id')
+    for venda_id, data, plataforma in chaves.values_list('id', 'data', 'plataforma'):
+        if (data, plataforma) in linhas:
+            ids[(data, plataforma)] = venda_id
+    # As vendas completas (os KPIs dependem dos campos não informados) só das chaves do bloco
+    carregadas = Venda.objects.in_bulk(ids.values())
+    existentes = {chave: carregadas[venda_id] for chave, venda_id in ids.items()}
+
+    novas, atualizadas = [], []
+    for (data, plataforma), valores in linhas.items():
+        venda = existentes.get((data, plataforma))
+        if venda is None:
+            novas.append(Venda(empresa=empresa, data=data, plataforma=plataforma, **valores))
+            continue
+        for campo, valor in valores.items():
+            setattr(venda, campo, valor)
+        atualizadas.append(venda)
+
+    todas = novas + atualizadas
+    for venda in todas:
+        venda.preencher_campos_temporais()
+        venda._ensure_valid_values()
+    calcular_kpis(todas)
+
+    with transaction.atomic():
+        inserir_vendas(novas, batch_size=batch_size)
+        _atualizar(atualizadas, CAMPOS_ATUALIZAVEIS)
+        sincronizar_plataformas(todas, batch_size=batch_size)
+    return novas, atualizadas, meses_afetados(todas)
+
+
+def _atualizar(vendas, campos):
+    """
+    Regrava `campos` das vendas com um único UPDATE preparado (executemany).
+
+    O bulk_update do ORM monta um CASE WHEN por campo e por linha; com ~20
+    campos por venda isso custa segundos por bloco só para compilar o SQL.
+    """
+    if not vendas:
+        return
+    qn = connection.ops.quote_name
+    campos = [Venda._meta.get_field(campo) for campo in campos]
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        qn(Venda._meta.db_table),
+        ', '.join(f'{qn(campo.column)} = %s' for campo in campos),
+        qn(Venda._meta.pk.column),
+    )
+    parametros = [
+        [campo.get_db_prep_save(getattr(venda, campo.attname), connection) for campo in campos] + [venda.pk]
+        for venda in vendas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
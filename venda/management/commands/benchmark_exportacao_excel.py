@@ -0,0 +1,125 @@
+import gc
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from openpyxl import Workbook
+
+from empresas.models import Empresa
+from venda.exportacao import COLUNAS, gerar_excel
+from venda.models import MESES_PT, Venda
+
+
+def _status_memoria(campo):
+    """Valor (MB) de um campo de /proc/self/status, como VmRSS ou VmHWM."""
+    with open('/proc/self/status') as status:
+        for linha in status:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1]) / 1024
+    return 0.0
+
+
+def _zerar_pico():
+    # Linux >= 4.0: reinicia o VmHWM (pico de RSS) do processo
+    with open('/proc/self/clear_refs', 'w') as arquivo:
+        arquivo.write('5')
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o pico de RSS e o tempo da exportação Excel (Workbook em memória x '
+        'write-only em arquivo temporário) com vendas sintéticas desfeitas ao final. Só Linux.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=100000, help='Vendas sintéticas.')
+
+    def handle(self, *args, **options):
+        try:
+            _zerar_pico()
+        except OSError:
+            raise CommandError('O benchmark precisa de /proc/self/clear_refs (Linux).')
+
+        with transaction.atomic():
+            try:
+                empresa = self._semear(options['linhas'])
+                vendas = Venda.objects.filter(empresa=empresa)
+                colunas = list(COLUNAS)
+                # O write-only roda primeiro: o que o Workbook em memória alocar
+                # depois não volta para o sistema e distorceria a medição seguinte
+                cenarios = [
+                    ('write-only + arquivo temporário', lambda: self._write_only(vendas, colunas)),
+                    ('write-only, uma planilha por ano', lambda: self._write_only(vendas, colunas, 'ano')),
+                    ('Workbook em memória (anterior)', lambda: self._anterior(vendas)),
+                ]
+                for nome, executar in cenarios:
+                    gc.collect()
+                    _zerar_pico()
+                    base = _status_memoria('VmRSS')
+                    inicio = time.perf_counter()
+                    tamanho = executar()
+                    duracao = time.perf_counter() - inicio
+                    pico = _status_memoria('VmHWM')
+                    self.stdout.write(
+                        f"{nome}: pico de RSS {pico:.1f} MB (+{pico - base:.1f} MB), "
+                        f"{duracao:.1f} s, arquivo {tamanho / 1024 / 1024:.1f} MB"
+                    )
+            finally:
+                transaction.set_rollback(True)
+
+    def _semear(self, quantidade):
+        aleatorio = random.Random(42)
+        empresa = Empresa.objects.create(
+            tipo='PJ', sigla='BENCHXL', razao_social='Benchmark', cnpj='00000000000000',
+            email_comercial='benchmark@example.com', telefone1='0'
+        )
+        inicio = date(date.today().year - 5, 1, 1)
+        vendas = []
+        for indice in range(quantidade):
+            # Grava em blocos para a própria semeadura não inflar o RSS medido depois
+            if len(vendas) == 2000:
+                Venda.objects.bulk_create(vendas)
+                vendas = []
+            dia = inicio + timedelta(days=indice % 1825)
+            invest = Decimal(aleatorio.randint(50, 500))
+            vendas.append(Venda(
+                empresa=empresa, data=dia, mes=MESES_PT[dia.month], ano=dia.year, mes_num=dia.month,
+                semana=str(dia.isocalendar()[1]), iso_ano=dia.isocalendar()[0], iso_semana=dia.isocalendar()[1],
+                plataforma=aleatorio.choice(['google', 'instagram', 'facebook']),
+                invest_realizado=invest, invest_projetado=invest + 50, saldo_invest=Decimal(50),
+                vendas_google=Decimal(aleatorio.randint(0, 900)), fat_proj=Decimal(3000),
+                fat_camp_realizado=Decimal(aleatorio.randint(0, 2000)), fat_geral=Decimal(aleatorio.randint(0, 5000)),
+                leads=aleatorio.randint(1, 40), clientes_novos=aleatorio.randint(0, 10), clima='Ensolarado',
+            ))
+        # bulk_create não dispara os signals (resumos/cache não interessam aqui)
+        Venda.objects.bulk_create(vendas)
+        self.stdout.write(f"{quantidade} vendas sintéticas criadas.")
+        return empresa
+
+    @staticmethod
+    def _write_only(vendas, colunas, separar_por=None):
+        arquivo = gerar_excel(vendas, colunas, separar_por)
+        try:
+            arquivo.seek(0, 2)
+            return arquivo.tell()
+        finally:
+            arquivo.close()
+
+    @staticmethod
+    def _anterior(vendas):
+        """Implementação anterior: instâncias completas, Workbook normal e BytesIO."""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(list(COLUNAS.values()))
+        for venda in vendas:
+            sheet.append([
+                venda.data.strftime("%d/%m/%Y") if venda.data else "",
+                *[getattr(venda, campo) for campo in list(COLUNAS)[1:]]
+            ])
+        output = BytesIO()
+        workbook.save(output)
+        return len(output.getvalue())
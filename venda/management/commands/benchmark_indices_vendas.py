@@ -0,0 +1,124 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from empresas.models import Empresa
+from venda.models import MESES_PT, Venda
+
+INDICES = ['venda_empresa_data_idx', 'venda_emp_iso_sem_plat_idx', 'venda_emp_ano_mes_idx']
+
+
+class Command(BaseCommand):
+    help = (
+        'Mostra os planos (EXPLAIN) e tempos das consultas de Venda com e sem os índices '
+        'compostos, usando dados sintéticos desfeitos ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresas', type=int, default=20, help='Empresas sintéticas.')
+        parser.add_argument('--anos', type=int, default=3, help='Anos de vendas diárias por empresa.')
+        parser.add_argument('--repeticoes', type=int, default=30, help='Execuções de cada consulta.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'mysql', 'postgresql'):
+            raise CommandError(f'Banco {connection.vendor} não suportado pelo benchmark.')
+
+        with transaction.atomic():
+            try:
+                empresa = self._semear(options['empresas'], options['anos'])
+                consultas = self._consultas(empresa)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('== Com índices =='))
+                com = self._medir(consultas, options['repeticoes'])
+
+                self.stdout.write(self.style.MIGRATE_HEADING('== Sem índices =='))
+                sem = self._medir(consultas, options['repeticoes'], ignorar_indices=True)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('== Resumo (mediana) =='))
+                for nome in consultas:
+                    self.stdout.write(f"{nome}: sem índices {sem[nome]:.2f} ms -> com índices {com[nome]:.2f} ms")
+            finally:
+                # Desfaz os dados sintéticos (e o DROP INDEX nos bancos com DDL transacional)
+                transaction.set_rollback(True)
+
+    def _semear(self, quantidade, anos):
+        aleatorio = random.Random(42)
+        inicio = date(date.today().year - anos, 1, 1)
+        fim = date(date.today().year, 1, 1)
+        vendas = []
+        empresas = []
+        for numero in range(quantidade):
+            empresa = Empresa.objects.create(
+                tipo='PJ', sigla=f'BIDX{numero}', razao_social='Benchmark', cnpj='00000000000000',
+                email_comercial=f'benchmark{numero}@example.com', telefone1='0'
+            )
+            empresas.append(empresa)
+            dia = inicio
+            while dia < fim:
+                vendas.append(Venda(
+                    empresa=empresa, data=dia, mes=MESES_PT[dia.month], ano=dia.year, mes_num=dia.month,
+                    semana=str(dia.isocalendar()[1]), iso_ano=dia.isocalendar()[0], iso_semana=dia.isocalendar()[1],
+                    plataforma=aleatorio.choice(['google', 'instagram', 'facebook']),
+                    invest_realizado=Decimal(aleatorio.randint(0, 500)), fat_geral=Decimal(aleatorio.randint(0, 4000)),
+                    leads=aleatorio.randint(0, 40),
+                ))
+                dia += timedelta(days=1)
+        # bulk_create não dispara os signals (sem recálculo de resumos durante a carga)
+        Venda.objects.bulk_create(vendas, batch_size=1000)
+        self.stdout.write(f"{len(vendas)} vendas sintéticas em {quantidade} empresa(s).")
+        return empresas[len(empresas) // 2]
+
+    def _consultas(self, empresa):
+        """Formatos de consulta usados pelo recálculo de resumos, pela API de vendas e pela importação."""
+        ano = date.today().year - 1
+        vendas = Venda.objects.filter(empresa=empresa)
+        return {
+            'recalculo_mes': vendas.filter(data__gte=date(ano, 6, 1), data__lt=date(ano, 7, 1))
+                .order_by().values('empresa_id', 'data').annotate(total=Sum('fat_geral'), registros=Count('id')),
+            'lista_ordenada': vendas.order_by('-data')[:50],
+            'lista_por_ano': vendas.filter(ano=ano).order_by('data'),
+            'lista_por_mes': vendas.filter(ano=ano, mes_num=6).order_by('data'),
+            'importacao_semana': vendas.filter(iso_ano=ano, iso_semana=23, plataforma='google'),
+        }
+
+    def _sql(self, queryset, ignorar_indices):
+        sql, params = queryset.query.sql_with_params()
+        if ignorar_indices:
+            # Texto diferente evita reaproveitar o plano já preparado pelo driver
+            sql = f'{sql} /* sem índices */'
+        if ignorar_indices and connection.vendor == 'mysql':
+            # MySQL não desfaz DDL: em vez de remover os índices, pede ao planejador que os ignore
+            tabela = connection.ops.quote_name(Venda._meta.db_table)
+            sql = sql.replace(f'FROM {tabela}', f"FROM {tabela} IGNORE INDEX ({', '.join(INDICES)})", 1)
+        return sql, params
+
+    def _medir(self, consultas, repeticoes, ignorar_indices=False):
+        with connection.cursor() as cursor:
+            if ignorar_indices and connection.vendor != 'mysql':
+                for indice in INDICES:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(indice)}')
+
+            prefixo_explain = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+            medianas = {}
+            for nome, queryset in consultas.items():
+                sql, params = self._sql(queryset, ignorar_indices)
+                cursor.execute(prefixo_explain + sql, params)
+                self.stdout.write(f"-- {nome}")
+                for linha in cursor.fetchall():
+                    self.stdout.write(f"   {linha}")
+
+                tempos = []
+                for _ in range(repeticoes):
+                    inicio = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                medianas[nome] = statistics.median(tempos)
+                self.stdout.write(f"   {medianas[nome]:.2f} ms (mediana de {repeticoes})")
+        return medianas
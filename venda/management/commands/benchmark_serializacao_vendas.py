@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.utils.encoders import JSONEncoder
+
+from empresas.models import Empresa
+from venda.leitura import LeitorVendas
+from venda.models import Venda
+from venda.serializers import VendaSerializer
+
+
+def _json(dados):
+    return json.dumps(dados, cls=JSONEncoder)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o custo por linha do VendaSerializer (instâncias) com o LeitorVendas '
+        '(values() + conversores) nas vendas de uma empresa e confere que o JSON é idêntico.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help='ID da empresa (padrão: a com mais vendas).')
+        parser.add_argument('--linhas', type=int, default=5000, help='Vendas serializadas por rodada.')
+        parser.add_argument('--repeticoes', type=int, default=5, help='Rodadas por cenário (vale a melhor).')
+        parser.add_argument('--fields', help='Campos, como no ?fields= da listagem (padrão: todos).')
+
+    def handle(self, *args, **options):
+        empresa_id = options['empresa'] or (
+            Empresa.objects.order_by().filter(vendas__isnull=False)
+            .values_list('id', flat=True).first()
+        )
+        if empresa_id is None:
+            raise CommandError('Nenhuma empresa com vendas.')
+        campos = [campo.strip() for campo in options['fields'].split(',')] if options['fields'] else None
+
+        vendas = Venda.objects.filter(empresa_id=empresa_id).order_by('data', 'id')[:options['linhas']]
+        leitor = LeitorVendas(campos)
+
+        # (nome, leitura do banco, serialização das linhas lidas)
+        cenarios = [
+            ('VendaSerializer (instâncias)', lambda: list(vendas.all()),
+             lambda linhas: VendaSerializer(linhas, many=True, fields=campos).data),
+            ('LeitorVendas (values())', lambda: list(leitor.valores(vendas)), leitor.serializar),
+        ]
+        resultados = {}
+        for nome, ler, serializar in cenarios:
+            leituras, serializacoes = [], []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                linhas = ler()
+                meio = time.perf_counter()
+                dados = serializar(linhas)
+                leituras.append(meio - inicio)
+                serializacoes.append(time.perf_counter() - meio)
+            resultados[nome] = dados
+            quantidade = len(dados) or 1
+            self.stdout.write(
+                f"{nome}: serialização {min(serializacoes) * 1e6 / quantidade:.1f} µs/linha, "
+                f"leitura do banco {min(leituras) * 1e6 / quantidade:.1f} µs/linha ({len(dados)} linhas)"
+            )
+
+        referencia, rapido = (_json(dados) for dados in resultados.values())
+        if referencia != rapido:
+            raise CommandError('O JSON do LeitorVendas difere do VendaSerializer.')
+        self.stdout.write(self.style.SUCCESS('JSON idêntico nos dois caminhos.'))
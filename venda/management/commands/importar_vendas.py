@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from empresas.models import Empresa
+from venda.importacao import formato_do_arquivo, importar_vendas
+from venda.lote import TAMANHO_BLOCO
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa vendas de um CSV/XLSX no layout da exportação, criando ou atualizando '
+        'as vendas da empresa pela chave (data, plataforma).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo .csv ou .xlsx.')
+        parser.add_argument('--empresa', type=int, required=True, help='ID da empresa.')
+        parser.add_argument('--plataforma', help='Plataforma das linhas sem a coluna "Plataforma" (padrão: google).')
+        parser.add_argument('--lote', type=int, default=TAMANHO_BLOCO, help='Vendas gravadas por bloco.')
+
+    def handle(self, *args, **options):
+        try:
+            empresa = Empresa.objects.get(pk=options['empresa'])
+        except Empresa.DoesNotExist:
+            raise CommandError(f"Empresa {options['empresa']} não encontrada.")
+
+        try:
+            formato = formato_do_arquivo(options['arquivo'])
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_vendas(
+                    empresa, arquivo, formato,
+                    plataforma=options['plataforma'], tamanho_bloco=options['lote']
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for erro in resultado['erros']:
+            planilha = f"{erro['planilha']}, " if erro['planilha'] else ''
+            self.stdout.write(self.style.WARNING(f"{planilha}linha {erro['linha']}: {erro['erro']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['criadas']} venda(s) criada(s), {resultado['atualizadas']} atualizada(s), "
+            f"{resultado['ignoradas']} linha(s) ignorada(s)."
+        ))
@@ -0,0 +1,110 @@
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from dashboard.cache_utils import invalidar_dashboard
+from venda.kpis import CAMPOS_KPIS, expressoes_kpis, filtro_divergente, valor_gravado
+from venda.models import Venda
+from venda.resumos import recalcular_mes
+
+
+def _data(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula no banco os KPIs derivados das vendas (saldos, ROI, ROAS, ARPU, '
+        'taxa de conversão e CAC) com UPDATEs em blocos, sem carregar as linhas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--inicio', type=_data, help='Data inicial (AAAA-MM-DD), inclusiva.')
+        parser.add_argument('--fim', type=_data, help='Data final (AAAA-MM-DD), inclusiva.')
+        parser.add_argument('--lote', type=int, default=10000,
+                            help='Faixa de IDs atualizada por transação.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Só mostra as divergências, sem gravar.')
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Exemplos exibidos por campo no --dry-run.')
+
+    def handle(self, *args, **options):
+        vendas = Venda.objects.order_by()
+        if options['empresas']:
+            vendas = vendas.filter(empresa_id__in=options['empresas'])
+        if options['inicio']:
+            vendas = vendas.filter(data__gte=options['inicio'])
+        if options['fim']:
+            vendas = vendas.filter(data__lte=options['fim'])
+
+        expressoes = expressoes_kpis()
+        filtros = {campo: filtro_divergente(campo, expressoes[campo]) for campo in CAMPOS_KPIS}
+
+        if options['dry_run']:
+            self._relatorio(vendas, expressoes, filtros, options['limite'])
+            return
+
+        limites = vendas.aggregate(minimo=Min('id'), maximo=Max('id'))
+        if limites['minimo'] is None:
+            self.stdout.write('Nenhuma venda no filtro informado.')
+            return
+
+        alteradas = {campo: 0 for campo in CAMPOS_KPIS}
+        meses = set()
+        divergente = reduce(or_, filtros.values())
+        for inicio in range(limites['minimo'], limites['maximo'] + 1, options['lote']):
+            bloco = vendas.filter(id__gte=inicio, id__lt=inicio + options['lote'])
+            with transaction.atomic():
+                meses.update(
+                    bloco.filter(divergente)
+                    .values_list('empresa_id', 'data__year', 'data__month').distinct()
+                )
+                # Um UPDATE por campo, só nas linhas em que ele diverge
+                for campo in CAMPOS_KPIS:
+                    alteradas[campo] += bloco.filter(filtros[campo]).update(
+                        **{campo: valor_gravado(campo, expressoes[campo])}
+                    )
+            self.stdout.write(f"IDs {inicio}-{min(inicio + options['lote'] - 1, limites['maximo'])} processados", ending='\r')
+
+        # UPDATE não dispara os signals: recalcula os resumos dos meses afetados
+        for empresa_id, ano, mes in sorted(meses, key=lambda item: (item[0] or 0, item[1], item[2])):
+            if empresa_id:
+                recalcular_mes(empresa_id, ano, mes)
+        for empresa_id in {empresa_id for empresa_id, _, _ in meses}:
+            invalidar_dashboard(empresa_id)
+
+        self.stdout.write('')
+        for campo, quantidade in alteradas.items():
+            self.stdout.write(f"{campo}: {quantidade} linha(s) atualizada(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"KPIs recalculados; resumos refeitos em {len(meses)} mês(es)."
+        ))
+
+    def _relatorio(self, vendas, expressoes, filtros, limite):
+        contagens = vendas.aggregate(
+            total=Count('id'),
+            divergentes=Count('id', filter=reduce(or_, filtros.values())),
+            **{campo: Count('id', filter=filtros[campo]) for campo in CAMPOS_KPIS}
+        )
+        self.stdout.write(f"{contagens['divergentes']} de {contagens['total']} venda(s) com KPIs divergentes.")
+        for campo in CAMPOS_KPIS:
+            if not contagens[campo]:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{campo}: {contagens[campo]} divergência(s)"))
+            exemplos = (
+                vendas.filter(filtros[campo])
+                .values('id', 'data', campo, novo=valor_gravado(campo, expressoes[campo]))
+                .order_by('id')[:limite]
+            )
+            for exemplo in exemplos:
+                self.stdout.write(f"  #{exemplo['id']} {exemplo['data']}: {exemplo[campo]} -> {exemplo['novo']}")
+        self.stdout.write(self.style.WARNING('Dry-run: nada foi gravado.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from venda.resumos import reconstruir_resumos
+
+
+class Command(BaseCommand):
+    help = 'Apaga e recria do zero os resumos (rollups) de vendas usados pelo dashboard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        totais = reconstruir_resumos(options['empresas'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumos reconstruídos: {totais['diario']} diário(s), "
+            f"{totais['semanal']} semanal(is), {totais['mensal']} mensal(is)."
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from venda.resumos import reconstruir_resumos, verificar_resumos
+
+
+class Command(BaseCommand):
+    help = 'Verifica se os resumos (rollups) de vendas batem com as linhas de Venda.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, action='append', dest='empresas',
+                            help='ID da empresa (pode ser repetido). Padrão: todas.')
+        parser.add_argument('--corrigir', action='store_true',
+                            help='Reconstrói os resumos das empresas com divergência.')
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Quantidade máxima de divergências exibidas.')
+
+    def handle(self, *args, **options):
+        divergencias = verificar_resumos(options['empresas'])
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS('Resumos consistentes.'))
+            return
+
+        for nivel, chave, campo, esperado, gravado in divergencias[:options['limite']]:
+            self.stdout.write(f"[{nivel}] {chave} {campo}: esperado={esperado} gravado={gravado}")
+        self.stdout.write(self.style.WARNING(f"{len(divergencias)} divergência(s) encontrada(s)."))
+
+        if options['corrigir']:
+            empresas = sorted({chave[0] for _, chave, _, _, _ in divergencias})
+            reconstruir_resumos(empresas)
+            self.stdout.write(self.style.SUCCESS(f"Resumos reconstruídos para {len(empresas)} empresa(s)."))
+        else:
+            raise CommandError('Resumos inconsistentes. Use --corrigir para reconstruir.')
@@ -0,0 +1,227 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:04
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+# Cópia fixa do cálculo de venda.resumos no momento desta migração
+FILTROS_PLATAFORMA = {
+    'google': Q(vendas_google__gt=0),
+    'instagram': Q(vendas_instagram__gt=0),
+    'facebook': Q(vendas_facebook__gt=0),
+}
+ESCOPOS = ['todas'] + list(FILTROS_PLATAFORMA)
+CAMPOS_SOMA = [
+    'invest_realizado', 'invest_projetado', 'vendas_google', 'vendas_instagram',
+    'vendas_facebook', 'fat_proj', 'fat_camp_realizado', 'fat_geral',
+    'leads', 'clientes_novos', 'clientes_recorrentes', 'conversoes',
+]
+CAMPOS_MEDIA = ['roi_realizado', 'ticket_medio_realizado', 'taxa_conversao', 'cac_realizado']
+CAMPOS_RESUMO = ['registros'] + CAMPOS_SOMA + [
+    f'{campo}_{sufixo}' for campo in CAMPOS_MEDIA for sufixo in ('soma', 'qtd')
+]
+CHAVES_SEMANAL = ['empresa_id', 'plataforma', 'ano', 'mes', 'iso_ano', 'semana']
+CHAVES_MENSAL = ['empresa_id', 'plataforma', 'ano', 'mes']
+
+
+def _agrupar(linhas, chaves):
+    grupos = {}
+    for linha in linhas:
+        chave = tuple(linha[c] for c in chaves)
+        acumulado = grupos.get(chave)
+        if acumulado is None:
+            grupos[chave] = {c: linha[c] for c in chaves + CAMPOS_RESUMO}
+        else:
+            for campo in CAMPOS_RESUMO:
+                acumulado[campo] += linha[campo]
+    return list(grupos.values())
+
+
+def preencher_resumos(apps, schema_editor):
+    """Gera os resumos das vendas existentes, uma empresa por vez."""
+    Venda = apps.get_model('venda', 'Venda')
+    niveis = [
+        (apps.get_model('venda', 'VendaResumoSemanal'), CHAVES_SEMANAL),
+        (apps.get_model('venda', 'VendaResumoMensal'), CHAVES_MENSAL),
+    ]
+    VendaResumoDiario = apps.get_model('venda', 'VendaResumoDiario')
+
+    expressoes = {}
+    for escopo in ESCOPOS:
+        filtro = FILTROS_PLATAFORMA.get(escopo)
+        expressoes[f'{escopo}_registros'] = Count('id', filter=filtro)
+        for campo in CAMPOS_SOMA:
+            expressoes[f'{escopo}_{campo}'] = Sum(campo, filter=filtro)
+        for campo in CAMPOS_MEDIA:
+            expressoes[f'{escopo}_{campo}_soma'] = Sum(campo, filter=filtro)
+            expressoes[f'{escopo}_{campo}_qtd'] = Count(campo, filter=filtro)
+
+    empresa_ids = (
+        Venda.objects.exclude(empresa__isnull=True)
+        .order_by().values_list('empresa_id', flat=True).distinct()
+    )
+    for empresa_id in list(empresa_ids):
+        diarios = []
+        agrupado = (
+            Venda.objects.filter(empresa_id=empresa_id).order_by()
+            .values('empresa_id', 'data').annotate(**expressoes)
+        )
+        for item in agrupado.iterator():
+            dia = item['data']
+            iso = dia.isocalendar()
+            for escopo in ESCOPOS:
+                if not item[f'{escopo}_registros']:
+                    continue
+                linha = {
+                    'empresa_id': empresa_id, 'plataforma': escopo, 'data': dia,
+                    'ano': dia.year, 'mes': dia.month, 'iso_ano': iso[0], 'semana': iso[1],
+                }
+                for campo in CAMPOS_RESUMO:
+                    linha[campo] = item[f'{escopo}_{campo}'] or 0
+                diarios.append(linha)
+        VendaResumoDiario.objects.bulk_create([VendaResumoDiario(**linha) for linha in diarios], batch_size=1000)
+        for modelo, chaves in niveis:
+            modelo.objects.bulk_create(
+                [modelo(**linha) for linha in _agrupar(diarios, chaves)], batch_size=1000
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0004_empresa_asaas_customer_id'),
+        ('venda', '0009_remove_venda_venda_empresa_ano_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaResumoSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plataforma', models.CharField(max_length=20, verbose_name='Escopo de plataforma')),
+                ('registros', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('invest_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('invest_projetado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_google', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_instagram', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_facebook', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_proj', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_camp_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_geral', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('leads', models.BigIntegerField(default=0)),
+                ('clientes_novos', models.BigIntegerField(default=0)),
+                ('clientes_recorrentes', models.BigIntegerField(default=0)),
+                ('conversoes', models.BigIntegerField(default=0)),
+                ('roi_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('roi_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('ticket_medio_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ticket_medio_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('taxa_conversao_soma', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('taxa_conversao_qtd', models.PositiveIntegerField(default=0)),
+                ('cac_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cac_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mês')),
+                ('iso_ano', models.IntegerField(verbose_name='Ano ISO')),
+                ('semana', models.PositiveSmallIntegerField(verbose_name='Semana ISO')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='empresas.empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo semanal de vendas',
+                'verbose_name_plural': 'Resumos semanais de vendas',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendaResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plataforma', models.CharField(max_length=20, verbose_name='Escopo de plataforma')),
+                ('registros', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('invest_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('invest_projetado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_google', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_instagram', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_facebook', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_proj', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_camp_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_geral', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('leads', models.BigIntegerField(default=0)),
+                ('clientes_novos', models.BigIntegerField(default=0)),
+                ('clientes_recorrentes', models.BigIntegerField(default=0)),
+                ('conversoes', models.BigIntegerField(default=0)),
+                ('roi_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('roi_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('ticket_medio_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ticket_medio_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('taxa_conversao_soma', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('taxa_conversao_qtd', models.PositiveIntegerField(default=0)),
+                ('cac_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cac_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mês')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='empresas.empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo mensal de vendas',
+                'verbose_name_plural': 'Resumos mensais de vendas',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendaResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plataforma', models.CharField(max_length=20, verbose_name='Escopo de plataforma')),
+                ('registros', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('invest_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('invest_projetado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_google', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_instagram', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('vendas_facebook', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_proj', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_camp_realizado', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('fat_geral', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('leads', models.BigIntegerField(default=0)),
+                ('clientes_novos', models.BigIntegerField(default=0)),
+                ('clientes_recorrentes', models.BigIntegerField(default=0)),
+                ('conversoes', models.BigIntegerField(default=0)),
+                ('roi_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('roi_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('ticket_medio_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ticket_medio_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('taxa_conversao_soma', models.DecimalField(decimal_places=3, default=0, max_digits=16)),
+                ('taxa_conversao_qtd', models.PositiveIntegerField(default=0)),
+                ('cac_realizado_soma', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cac_realizado_qtd', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('data', models.DateField(verbose_name='Data')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.PositiveSmallIntegerField(verbose_name='Mês')),
+                ('iso_ano', models.IntegerField(verbose_name='Ano ISO')),
+                ('semana', models.PositiveSmallIntegerField(verbose_name='Semana ISO')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='empresas.empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo diário de vendas',
+                'verbose_name_plural': 'Resumos diários de vendas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendaresumosemanal',
+            constraint=models.UniqueConstraint(fields=('empresa', 'plataforma', 'ano', 'mes', 'iso_ano', 'semana'), name='venda_resumo_sem_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendaresumomensal',
+            constraint=models.UniqueConstraint(fields=('empresa', 'plataforma', 'ano', 'mes'), name='venda_resumo_mes_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='vendaresumodiario',
+            index=models.Index(fields=['empresa', 'plataforma', 'ano', 'mes'], name='venda_resumo_dia_mes_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendaresumodiario',
+            constraint=models.UniqueConstraint(fields=('empresa', 'plataforma', 'data'), name='venda_resumo_dia_uniq'),
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
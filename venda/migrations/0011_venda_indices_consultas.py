@@ -0,0 +1,21 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venda', '0010_venda_resumos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'data'], name='venda_empresa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'ano', 'semana', 'plataforma'], name='venda_emp_ano_sem_plat_idx'),
+        ),
+    ]
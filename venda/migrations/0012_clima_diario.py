@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venda', '0011_venda_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClimaDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cidade', models.CharField(max_length=100, verbose_name='Cidade')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('condicao', models.CharField(max_length=50, verbose_name='Condição')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Clima diário',
+                'verbose_name_plural': 'Climas diários',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='climadiario',
+            constraint=models.UniqueConstraint(fields=('cidade', 'data'), name='venda_clima_cidade_data_uniq'),
+        ),
+    ]
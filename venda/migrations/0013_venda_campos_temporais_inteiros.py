@@ -0,0 +1,52 @@
+# Generated by Django 4.2.21 on 2026-10-17 00:06
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractIsoYear, ExtractMonth, ExtractWeek
+
+
+def preencher_campos_inteiros(apps, schema_editor):
+    """Calcula ano/semana ISO e número do mês das vendas existentes no próprio banco."""
+    Venda = apps.get_model('venda', 'Venda')
+    Venda.objects.filter(data__isnull=False).update(
+        iso_ano=ExtractIsoYear('data'),
+        iso_semana=ExtractWeek('data'),
+        mes_num=ExtractMonth('data'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venda', '0012_clima_diario'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='venda',
+            name='venda_emp_ano_sem_plat_idx',
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='iso_ano',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Ano ISO'),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='iso_semana',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Semana ISO'),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='mes_num',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Mês (número)'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'iso_ano', 'iso_semana', 'plataforma'], name='venda_emp_iso_sem_plat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'ano', 'mes_num'], name='venda_emp_ano_mes_idx'),
+        ),
+        migrations.RunPython(preencher_campos_inteiros, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.21 on 2026-10-17 00:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Cópia fixa de venda.models.CAMPOS_PLATAFORMA no momento desta migração
+CAMPOS_PLATAFORMA = {
+    'google': 'vendas_google',
+    'instagram': 'vendas_instagram',
+    'facebook': 'vendas_facebook',
+}
+
+
+def preencher_vendas_plataforma(apps, schema_editor):
+    """Gera uma linha por venda e plataforma com valor > 0, em blocos."""
+    Venda = apps.get_model('venda', 'Venda')
+    VendaPlataforma = apps.get_model('venda', 'VendaPlataforma')
+    for plataforma, campo in CAMPOS_PLATAFORMA.items():
+        linhas = Venda.objects.filter(**{f'{campo}__gt': 0}).values_list('id', 'empresa_id', 'data', campo)
+        bloco = []
+        for venda_id, empresa_id, data, valor in linhas.iterator(chunk_size=2000):
+            bloco.append(VendaPlataforma(
+                venda_id=venda_id, empresa_id=empresa_id, data=data, plataforma=plataforma, valor=valor,
+            ))
+            if len(bloco) >= 2000:
+                VendaPlataforma.objects.bulk_create(bloco)
+                bloco = []
+        VendaPlataforma.objects.bulk_create(bloco)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0004_empresa_asaas_customer_id'),
+        ('venda', '0013_venda_campos_temporais_inteiros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaPlataforma',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('plataforma', models.CharField(max_length=20, verbose_name='Plataforma')),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Valor (R$)')),
+                ('empresa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='empresas.empresa')),
+                ('venda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plataformas', to='venda.venda')),
+            ],
+            options={
+                'verbose_name': 'Venda por plataforma',
+                'verbose_name_plural': 'Vendas por plataforma',
+                'indexes': [models.Index(fields=['empresa', 'plataforma', 'data'], name='venda_plat_emp_plat_data_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendaplataforma',
+            constraint=models.UniqueConstraint(fields=('venda', 'plataforma'), name='venda_plataforma_uniq'),
+        ),
+        migrations.RunPython(preencher_vendas_plataforma, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,26 @@
 from django.db import models
 from datetime import date
-from .utils import obter_clima  # Importa a função que obtém o clima atual
 from empresas.models import Empresa
 import logging
 
+MESES_PT = {
+    1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
+    7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
+}
+
 PLATAFORMA_CHOICES = [
     ('google', 'Google'),
     ('instagram', 'Instagram'),
     ('facebook', 'Facebook'),
 ]
 
+# Plataforma -> campo de Venda com o valor vendido nela (origem do VendaPlataforma)
+CAMPOS_PLATAFORMA = {
+    'google': 'vendas_google',
+    'instagram': 'vendas_instagram',
+    'facebook': 'vendas_facebook',
+}
+
 class Venda(models.Model):
     # Campo de empresa
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='vendas', null=True, blank=True)
@@ -21,6 +32,11 @@ class Venda(models.Model):
     mes = models.CharField("Mês", max_length=20, blank=True, null=True)  # Mês extraído da data
     ano = models.IntegerField("Ano", blank=True, null=True)  # Ano extraído da data
     semana = models.CharField("Semana", max_length=10, blank=True, null=True)  # Semana do ano referente à data
+    # Versões inteiras para filtros e ordenação: ano/semana ISO (a semana 1 pode
+    # começar em dezembro e a 52/53 terminar em janeiro) e número do mês
+    iso_ano = models.IntegerField("Ano ISO", blank=True, null=True)
+    iso_semana = models.PositiveSmallIntegerField("Semana ISO", blank=True, null=True)
+    mes_num = models.PositiveSmallIntegerField("Mês (número)", blank=True, null=True)
 
     # -------------------------------
     # Campos Relacionados ao Investimento
@@ -92,16 +108,19 @@ class Venda(models.Model):
         verbose_name='Plataforma'
     )
 
+    class Meta:
+        indexes = [
+            # Recálculo dos resumos, listagem e exportação: empresa + intervalo/ordem de data
+            models.Index(fields=['empresa', 'data'], name='venda_empresa_data_idx'),
+            # Consolidação semanal da importação (get_or_create por empresa, semana ISO e plataforma)
+            models.Index(fields=['empresa', 'iso_ano', 'iso_semana', 'plataforma'], name='venda_emp_iso_sem_plat_idx'),
+            # Filtros da API por ano e número do mês
+            models.Index(fields=['empresa', 'ano', 'mes_num'], name='venda_emp_ano_mes_idx'),
+        ]
+
     def save(self, *args, **kwargs):
-        # Atualiza os campos temporais (mês, ano, semana) com base na data informada
-        if self.data:
-            month_pt = {
-                1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
-                7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
-            }
-            self.mes = month_pt.get(self.data.month, self.data.month)
-            self.ano = self.data.year                 # Ano extraído da data
-            self.semana = str(self.data.isocalendar().week)  # Número da semana no ano
+        # Atualiza os campos temporais (mês, ano, semana e as versões inteiras) com base na data informada
+        self.preencher_campos_temporais()
         
         # Garante que campos decimal sejam None se não tiverem valor válido
         from decimal import Decimal, InvalidOperation
@@ -154,13 +173,28 @@ class Venda(models.Model):
         else:
             self.cac_realizado = Decimal('0.00')
         
-        # Se o campo clima estiver vazio, obtém a informação atual usando a função obter_clima()
-        if not self.clima:
-            self.clima = obter_clima()
+        # O campo clima vazio é preenchido depois do commit pelo serviço de clima
+        # (venda.clima), sem consulta de rede dentro do save
         
-        # Chama o método save() da classe base para efetivamente salvar o registro no banco de dados
-        super().save(*args, **kwargs)
+        # Chama o método save() da classe base e regrava as linhas de VendaPlataforma
+        # na mesma transação (os resumos são recalculados só depois do commit)
+        from django.db import transaction
+        from .plataformas import sincronizar_plataformas
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            sincronizar_plataformas([self])
     
+    def preencher_campos_temporais(self):
+        """Atualiza mês, ano e semana a partir da data (também usado na criação em lote)."""
+        if self.data:
+            iso = self.data.isocalendar()
+            self.mes = MESES_PT.get(self.data.month, self.data.month)
+            self.ano = self.data.year                 # Ano extraído da data
+            self.semana = str(iso.week)  # Número da semana no ano
+            self.iso_ano = iso.year
+            self.iso_semana = iso.week
+            self.mes_num = self.data.month
+
     def _ensure_valid_values(self):
         """Garante que todos os campos tenham valores válidos"""
         from decimal import Decimal, InvalidOperation
@@ -243,3 +277,148 @@ class Venda(models.Model):
     def __str__(self):
         # Define a representação textual do objeto Venda
         return f"{self.data.strftime('%d/%m/%Y')} - Faturamento: R$ {self.fat_geral}"
+
+
+class VendaResumoBase(models.Model):
+    """
+    Campos comuns aos resumos pré-agregados (rollups) de Venda.
+
+    Cada linha guarda as somas de um balde (dia, fragmento de semana ou mês)
+    para um escopo de plataforma: 'todas' ou uma plataforma com vendas_<plataforma> > 0,
+    o mesmo critério usado pelos filtros do dashboard. Campos que o dashboard
+    exibe como média guardam soma e quantidade para que a média seja exata.
+    """
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='+')
+    plataforma = models.CharField("Escopo de plataforma", max_length=20)
+    registros = models.PositiveIntegerField("Registros", default=0)
+
+    # Somas
+    invest_realizado = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    invest_projetado = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    vendas_google = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    vendas_instagram = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    vendas_facebook = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    fat_proj = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    fat_camp_realizado = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    fat_geral = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    leads = models.BigIntegerField(default=0)
+    clientes_novos = models.BigIntegerField(default=0)
+    clientes_recorrentes = models.BigIntegerField(default=0)
+    conversoes = models.BigIntegerField(default=0)
+
+    # Soma e quantidade de valores não nulos dos KPIs exibidos como média
+    roi_realizado_soma = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    roi_realizado_qtd = models.PositiveIntegerField(default=0)
+    ticket_medio_realizado_soma = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    ticket_medio_realizado_qtd = models.PositiveIntegerField(default=0)
+    taxa_conversao_soma = models.DecimalField(max_digits=16, decimal_places=3, default=0)
+    taxa_conversao_qtd = models.PositiveIntegerField(default=0)
+    cac_realizado_soma = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    cac_realizado_qtd = models.PositiveIntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class VendaResumoDiario(VendaResumoBase):
+    """Resumo de Venda por empresa, escopo de plataforma e dia."""
+    data = models.DateField("Data")
+    ano = models.IntegerField("Ano")
+    mes = models.PositiveSmallIntegerField("Mês")
+    iso_ano = models.IntegerField("Ano ISO")
+    semana = models.PositiveSmallIntegerField("Semana ISO")
+
+    class Meta:
+        verbose_name = "Resumo diário de vendas"
+        verbose_name_plural = "Resumos diários de vendas"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'plataforma', 'data'], name='venda_resumo_dia_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['empresa', 'plataforma', 'ano', 'mes'], name='venda_resumo_dia_mes_idx'),
+        ]
+
+
+class VendaResumoSemanal(VendaResumoBase):
+    """
+    Resumo de Venda por empresa, escopo de plataforma e semana ISO dentro do mês.
+
+    Uma semana que atravessa a virada do mês gera um fragmento para cada mês, que é
+    exatamente o recorte usado pelos gráficos semanais do dashboard; a semana ISO
+    completa é a soma dos fragmentos com o mesmo (iso_ano, semana).
+    """
+    ano = models.IntegerField("Ano")
+    mes = models.PositiveSmallIntegerField("Mês")
+    iso_ano = models.IntegerField("Ano ISO")
+    semana = models.PositiveSmallIntegerField("Semana ISO")
+
+    class Meta:
+        verbose_name = "Resumo semanal de vendas"
+        verbose_name_plural = "Resumos semanais de vendas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['empresa', 'plataforma', 'ano', 'mes', 'iso_ano', 'semana'],
+                name='venda_resumo_sem_uniq',
+            ),
+        ]
+
+
+class VendaResumoMensal(VendaResumoBase):
+    """Resumo de Venda por empresa, escopo de plataforma e mês."""
+    ano = models.IntegerField("Ano")
+    mes = models.PositiveSmallIntegerField("Mês")
+
+    class Meta:
+        verbose_name = "Resumo mensal de vendas"
+        verbose_name_plural = "Resumos mensais de vendas"
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'plataforma', 'ano', 'mes'], name='venda_resumo_mes_uniq'),
+        ]
+
+
+class VendaPlataforma(models.Model):
+    """
+    Valor vendido em uma plataforma por uma Venda (uma linha por plataforma com valor > 0).
+
+    Mantido a partir de Venda.save() e dos caminhos em lote (venda.plataformas).
+    Empresa e data são copiadas da venda para que o filtro de plataforma seja
+    uma faixa do índice (empresa, plataforma, data), sem passar pela tabela de Venda.
+    """
+    venda = models.ForeignKey(Venda, on_delete=models.CASCADE, related_name='plataformas')
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='+', null=True, blank=True)
+    data = models.DateField("Data")
+    plataforma = models.CharField("Plataforma", max_length=20)
+    valor = models.DecimalField("Valor (R$)", max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = "Venda por plataforma"
+        verbose_name_plural = "Vendas por plataforma"
+        constraints = [
+            models.UniqueConstraint(fields=['venda', 'plataforma'], name='venda_plataforma_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['empresa', 'plataforma', 'data'], name='venda_plat_emp_plat_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.data.strftime('%d/%m/%Y')} - {self.plataforma}: R$ {self.valor}"
+
+
+class ClimaDiario(models.Model):
+    """Condição do tempo consultada para uma cidade em um dia (memoização do serviço de clima)."""
+    cidade = models.CharField("Cidade", max_length=100)
+    data = models.DateField("Data")
+    condicao = models.CharField("Condição", max_length=50)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Clima diário"
+        verbose_name_plural = "Climas diários"
+        constraints = [
+            models.UniqueConstraint(fields=['cidade', 'data'], name='venda_clima_cidade_data_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.cidade} {self.data.strftime('%d/%m/%Y')}: {self.condicao}"
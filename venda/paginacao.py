@@ -0,0 +1,126 @@
+"""
+Paginação por cursor (keyset) da listagem de vendas.
+
+A página seguinte é buscada a partir da última linha entregue
+(`data > x OR (data = x AND id > y)`), e não por OFFSET. Por isso o custo de
+cada página não depende de quantas vendas vêm antes dela, e uma venda
+inserida no meio da navegação não faz linhas se repetirem ou sumirem. A
+ordem é sempre (data, id); `?ordering=-data` inverte as duas, e qualquer outra
+ordenação é recusada com 400 em vez de ignorada.
+"""
+import base64
+import json
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class VendaCursorPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Cursor inválido'
+    ordering_query_param = 'ordering'
+    ordenacoes = ('data', '-data')
+
+    def _tamanho_pagina(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(tamanho, 1), self.max_page_size)
+
+    @staticmethod
+    def _codificar(data, id, anterior=False):
+        posicao = {'d': data.isoformat(), 'i': id}
+        if anterior:
+            posicao['a'] = 1
+        return base64.urlsafe_b64encode(json.dumps(posicao, separators=(',', ':')).encode()).decode()
+
+    def _decodificar(self, cursor):
+        try:
+            posicao = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return date.fromisoformat(posicao['d']), int(posicao['i']), bool(posicao.get('a'))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.tamanho = self._tamanho_pagina(request)
+        ordenacao = request.query_params.get(self.ordering_query_param) or 'data'
+        if ordenacao not in self.ordenacoes:
+            raise ValidationError({
+                self.ordering_query_param: [f"Ordenação não suportada na listagem: use {' ou '.join(self.ordenacoes)}."]
+            })
+        self.decrescente = ordenacao == '-data'
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        posicao = self._decodificar(cursor) if cursor else None
+        # "anterior" percorre a lista de trás para frente a partir do cursor
+        self.anterior = bool(posicao and posicao[2])
+        reverso = self.decrescente != self.anterior
+
+        ordem = ('-data', '-id') if reverso else ('data', 'id')
+        queryset = queryset.order_by(*ordem)
+        if posicao:
+            data, id, _ = posicao
+            if reverso:
+                queryset = queryset.filter(Q(data__lt=data) | Q(data=data, id__lt=id))
+            else:
+                queryset = queryset.filter(Q(data__gt=data) | Q(data=data, id__gt=id))
+
+        # Uma linha a mais indica se existe página depois desta
+        linhas = list(queryset[:self.tamanho + 1])
+        self.tem_mais = len(linhas) > self.tamanho
+        linhas = linhas[:self.tamanho]
+        if self.anterior:
+            linhas.reverse()
+        self.tem_antes = bool(posicao) if not self.anterior else self.tem_mais
+        self.tem_depois = self.tem_mais if not self.anterior else True
+        self.pagina = linhas
+        return linhas
+
+    @staticmethod
+    def _chave(linha):
+        # Aceita instâncias e dicionários (values())
+        if isinstance(linha, dict):
+            return linha['data'], linha['id']
+        return linha.data, linha.id
+
+    def get_next_link(self):
+        if not self.tem_depois or not self.pagina:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self._codificar(*self._chave(self.pagina[-1])))
+
+    def get_previous_link(self):
+        if not self.tem_antes:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.pagina:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self._codificar(*self._chave(self.pagina[0]), anterior=True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,101 @@
+"""
+Manutenção do fato normalizado de vendas por plataforma (VendaPlataforma).
+
+Cada venda gera uma linha por plataforma com valor > 0 no seu campo
+vendas_<plataforma> (CAMPOS_PLATAFORMA), o mesmo critério dos filtros de
+plataforma do dashboard. Com empresa e data copiadas da venda, o escopo de
+uma plataforma é uma faixa do índice (empresa, plataforma, data); a
+plataforma é texto livre, então uma plataforma nova é só mais uma chave em
+CAMPOS_PLATAFORMA, sem coluna nova nesta tabela.
+"""
+import logging
+
+from django.db import transaction
+
+from .models import CAMPOS_PLATAFORMA, Venda, VendaPlataforma
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 1000
+
+
+def linhas_da_venda(venda):
+    """Linhas de VendaPlataforma (não salvas) de uma venda já gravada."""
+    linhas = []
+    for plataforma, campo in CAMPOS_PLATAFORMA.items():
+        valor = getattr(venda, campo)
+        if valor is not None and valor > 0:
+            linhas.append(VendaPlataforma(
+                venda_id=venda.pk, empresa_id=venda.empresa_id, data=venda.data,
+                plataforma=plataforma, valor=valor,
+            ))
+    return linhas
+
+
+def sincronizar_plataformas(vendas, batch_size=TAMANHO_BLOCO):
+    """Regrava as linhas de VendaPlataforma das vendas informadas (já gravadas, com pk)."""
+    vendas = [venda for venda in vendas if venda.pk is not None]
+    if not vendas:
+        return
+    with transaction.atomic():
+        for inicio in range(0, len(vendas), batch_size):
+            bloco = vendas[inicio:inicio + batch_size]
+            VendaPlataforma.objects.filter(venda_id__in=[venda.pk for venda in bloco]).delete()
+            VendaPlataforma.objects.bulk_create(
+                [linha for venda in bloco for linha in linhas_da_venda(venda)], batch_size=batch_size
+            )
+
+
+def _esperadas(empresa_id):
+    """{(venda_id, plataforma): (data, valor)} calculado a partir das colunas de Venda."""
+    esperadas = {}
+    vendas = Venda.objects.filter(empresa_id=empresa_id).values_list(
+        'id', 'data', *CAMPOS_PLATAFORMA.values()
+    )
+    for venda_id, data, *valores in vendas.iterator(chunk_size=TAMANHO_BLOCO):
+        for plataforma, valor in zip(CAMPOS_PLATAFORMA, valores):
+            if valor is not None and valor > 0:
+                esperadas[(venda_id, plataforma)] = (data, valor)
+    return esperadas
+
+
+def reconstruir_plataformas(empresa_id, batch_size=TAMANHO_BLOCO):
+    """Apaga e recria as linhas de VendaPlataforma da empresa. Retorna quantas foram gravadas."""
+    esperadas = _esperadas(empresa_id)
+    with transaction.atomic():
+        VendaPlataforma.objects.filter(empresa_id=empresa_id).delete()
+        VendaPlataforma.objects.bulk_create(
+            [
+                VendaPlataforma(venda_id=venda_id, empresa_id=empresa_id, data=data, plataforma=plataforma, valor=valor)
+                for (venda_id, plataforma), (data, valor) in esperadas.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(esperadas)
+
+
+def verificar_plataformas(empresa_id):
+    """
+    Compara as linhas de VendaPlataforma da empresa com as colunas de Venda.
+
+    Retorna divergências no formato de `verificar_resumos`:
+    ('plataformas', (empresa_id, venda_id, plataforma), campo, esperado, gravado).
+    """
+    esperadas = _esperadas(empresa_id)
+    gravadas = {
+        (venda_id, plataforma): (data, valor)
+        for venda_id, plataforma, data, valor in VendaPlataforma.objects.filter(empresa_id=empresa_id)
+        .values_list('venda_id', 'plataforma', 'data', 'valor')
+    }
+    divergencias = []
+    for chave in esperadas.keys() | gravadas.keys():
+        esperada, gravada = esperadas.get(chave), gravadas.get(chave)
+        if esperada == gravada:
+            continue
+        campo = 'data' if esperada and gravada and esperada[0] != gravada[0] else 'valor'
+        indice = 0 if campo == 'data' else 1
+        divergencias.append((
+            'plataformas', (empresa_id, *chave), campo,
+            esperada and esperada[indice], gravada and gravada[indice],
+        ))
+    return divergencias
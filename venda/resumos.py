@@ -0,0 +1,280 @@
+"""
+Resumos pré-agregados (rollups) de Venda usados pelo dashboard.
+
+Os resumos são mantidos por mês: qualquer alteração em uma Venda recalcula o mês
+afetado (dias, fragmentos semanais e o próprio mês) a partir das linhas de Venda,
+então o custo de manutenção é limitado ao tamanho de um mês, e não ao histórico
+inteiro da empresa.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast, NullIf
+
+from .models import (
+    CAMPOS_PLATAFORMA, Venda, VendaPlataforma, VendaResumoDiario, VendaResumoSemanal, VendaResumoMensal,
+)
+from .plataformas import reconstruir_plataformas, verificar_plataformas
+
+logger = logging.getLogger(__name__)
+
+ESCOPO_TODAS = 'todas'
+
+# Escopos de plataforma: vendas com linha em VendaPlataforma (vendas_<plataforma> > 0)
+ESCOPOS = [ESCOPO_TODAS] + list(CAMPOS_PLATAFORMA)
+
+CAMPOS_SOMA = [
+    'invest_realizado', 'invest_projetado', 'vendas_google', 'vendas_instagram',
+    'vendas_facebook', 'fat_proj', 'fat_camp_realizado', 'fat_geral',
+    'leads', 'clientes_novos', 'clientes_recorrentes', 'conversoes',
+]
+CAMPOS_MEDIA = ['roi_realizado', 'ticket_medio_realizado', 'taxa_conversao', 'cac_realizado']
+
+CAMPOS_RESUMO = ['registros'] + CAMPOS_SOMA + [
+    f'{campo}_{sufixo}' for campo in CAMPOS_MEDIA for sufixo in ('soma', 'qtd')
+]
+
+# Chaves de cada nível a partir das linhas diárias
+CHAVES_DIARIO = ['empresa_id', 'plataforma', 'data', 'ano', 'mes', 'iso_ano', 'semana']
+CHAVES_SEMANAL = ['empresa_id', 'plataforma', 'ano', 'mes', 'iso_ano', 'semana']
+CHAVES_MENSAL = ['empresa_id', 'plataforma', 'ano', 'mes']
+
+NIVEIS = [
+    ('diario', VendaResumoDiario, CHAVES_DIARIO),
+    ('semanal', VendaResumoSemanal, CHAVES_SEMANAL),
+    ('mensal', VendaResumoMensal, CHAVES_MENSAL),
+]
+
+
+def escopo_plataforma(plataforma):
+    """Converte o parâmetro `plataforma` do dashboard no escopo gravado nos resumos."""
+    return plataforma if plataforma in CAMPOS_PLATAFORMA else ESCOPO_TODAS
+
+
+def Media(campo):
+    """Equivalente a Avg(campo) sobre as linhas de Venda, calculado a partir dos resumos."""
+    return Cast(Sum(f'{campo}_soma'), FloatField()) / NullIf(Sum(f'{campo}_qtd'), 0)
+
+
+def MediaPorRegistro(campo):
+    """Média de um campo somado por linha de Venda (equivalente a Avg(campo) nas vendas)."""
+    return Cast(Sum(campo), FloatField()) / NullIf(Sum('registros'), 0)
+
+
+def resumos(modelo, empresa, plataforma=None):
+    """Queryset de um nível de resumo para a empresa e o escopo de plataforma."""
+    if not empresa:
+        return modelo.objects.none()
+    return modelo.objects.filter(empresa=empresa, plataforma=escopo_plataforma(plataforma))
+
+
+# ----------------------------------------------------------------------
+# Cálculo
+# ----------------------------------------------------------------------
+
+def _agregacoes(caminho=''):
+    """
+    Agregações de CAMPOS_RESUMO sobre os campos de Venda (`caminho` leva até a venda
+    a partir de outro modelo). Os nomes ganham o prefixo 'resumo_' para não colidir
+    com os campos do modelo consultado.
+    """
+    expressoes = {'resumo_registros': Count(f'{caminho}id')}
+    for campo in CAMPOS_SOMA:
+        expressoes[f'resumo_{campo}'] = Sum(f'{caminho}{campo}')
+    for campo in CAMPOS_MEDIA:
+        expressoes[f'resumo_{campo}_soma'] = Sum(f'{caminho}{campo}')
+        expressoes[f'resumo_{campo}_qtd'] = Count(f'{caminho}{campo}')
+    return expressoes
+
+
+def calcular_diarios(vendas, plataformas=None):
+    """
+    Agrupa as vendas por (empresa, dia) e devolve uma linha de resumo por escopo.
+
+    O escopo 'todas' vem das próprias vendas; os de plataforma, das linhas de
+    VendaPlataforma (`plataformas`, por padrão as das vendas informadas),
+    agrupadas também pela plataforma. Dias sem nenhuma venda no escopo não
+    geram linha.
+    """
+    if plataformas is None:
+        plataformas = VendaPlataforma.objects.filter(venda__in=vendas.values('pk'))
+    todas = (
+        vendas.exclude(empresa__isnull=True)
+        .order_by()
+        .values('empresa_id', 'data')
+        .annotate(**_agregacoes())
+    )
+    por_plataforma = (
+        plataformas.exclude(empresa__isnull=True)
+        .order_by()
+        .values('empresa_id', 'data', 'plataforma')
+        .annotate(**_agregacoes('venda__'))
+    )
+    linhas = []
+    for consulta in (todas, por_plataforma):
+        for item in consulta.iterator():
+            dia = item['data']
+            iso = dia.isocalendar()
+            linha = {
+                'empresa_id': item['empresa_id'],
+                'plataforma': item.get('plataforma', ESCOPO_TODAS),
+                'data': dia,
+                'ano': dia.year,
+                'mes': dia.month,
+                'iso_ano': iso[0],
+                'semana': iso[1],
+            }
+            for campo in CAMPOS_RESUMO:
+                linha[campo] = item[f'resumo_{campo}'] or 0
+            linhas.append(linha)
+    return linhas
+
+
+def agrupar(linhas, chaves):
+    """Soma linhas de resumo agrupando pelas chaves informadas."""
+    grupos = {}
+    for linha in linhas:
+        chave = tuple(linha[c] for c in chaves)
+        acumulado = grupos.get(chave)
+        if acumulado is None:
+            grupos[chave] = {c: linha[c] for c in chaves + CAMPOS_RESUMO}
+        else:
+            for campo in CAMPOS_RESUMO:
+                acumulado[campo] += linha[campo]
+    return list(grupos.values())
+
+
+def calcular_niveis(vendas, plataformas=None):
+    """Calcula as linhas esperadas dos três níveis de resumo para as vendas informadas."""
+    diarios = calcular_diarios(vendas, plataformas)
+    return {
+        'diario': diarios,
+        'semanal': agrupar(diarios, CHAVES_SEMANAL),
+        'mensal': agrupar(diarios, CHAVES_MENSAL),
+    }
+
+
+def _gravar(niveis, batch_size=1000):
+    for nome, modelo, _ in NIVEIS:
+        modelo.objects.bulk_create([modelo(**linha) for linha in niveis[nome]], batch_size=batch_size)
+
+
+# ----------------------------------------------------------------------
+# Manutenção
+# ----------------------------------------------------------------------
+
+def _intervalo_mes(ano, mes):
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio, fim
+
+
+def recalcular_mes(empresa_id, ano, mes):
+    """Recalcula todos os resumos de um mês da empresa a partir das linhas de Venda."""
+    inicio, fim = _intervalo_mes(ano, mes)
+    vendas = Venda.objects.filter(empresa_id=empresa_id, data__gte=inicio, data__lt=fim)
+    # Faixa do índice (empresa, plataforma, data) por plataforma
+    plataformas = VendaPlataforma.objects.filter(empresa_id=empresa_id, data__gte=inicio, data__lt=fim)
+    with transaction.atomic():
+        niveis = calcular_niveis(vendas, plataformas)
+        for _, modelo, _ in NIVEIS:
+            modelo.objects.filter(empresa_id=empresa_id, ano=ano, mes=mes).delete()
+        _gravar(niveis)
+
+
+def agendar_recalculo(empresa_id, data):
+    """
+    Agenda o recálculo do mês de `data` para depois do commit da transação atual.
+
+    Fora de transação o recálculo é imediato. Adiar para o commit evita gravar
+    resumos de uma empresa que está sendo excluída em cascata.
+    """
+    if not empresa_id or not data:
+        return
+    ano, mes = data.year, data.month
+
+    def executar():
+        try:
+            recalcular_mes(empresa_id, ano, mes)
+        except Exception as e:
+            logger.error(f"[RESUMOS] Erro ao recalcular empresa {empresa_id} {mes}/{ano}: {str(e)}")
+
+    transaction.on_commit(executar)
+
+
+def reconstruir_resumos(empresa_ids=None, batch_size=1000):
+    """
+    Apaga e recria os resumos a partir das linhas de Venda, refazendo antes as
+    linhas de VendaPlataforma de cada empresa.
+
+    Sem `empresa_ids`, reconstrói os resumos de todas as empresas com vendas.
+    Retorna um dicionário {nivel: linhas gravadas}.
+    """
+    if empresa_ids is None:
+        empresa_ids = (
+            Venda.objects.exclude(empresa__isnull=True)
+            .order_by().values_list('empresa_id', flat=True).distinct()
+        )
+    totais = {nome: 0 for nome, _, _ in NIVEIS}
+    for empresa_id in list(empresa_ids):
+        with transaction.atomic():
+            reconstruir_plataformas(empresa_id, batch_size=batch_size)
+            niveis = calcular_niveis(
+                Venda.objects.filter(empresa_id=empresa_id),
+                VendaPlataforma.objects.filter(empresa_id=empresa_id),
+            )
+            for _, modelo, _ in NIVEIS:
+                modelo.objects.filter(empresa_id=empresa_id).delete()
+            _gravar(niveis, batch_size=batch_size)
+        for nome in totais:
+            totais[nome] += len(niveis[nome])
+    return totais
+
+
+def _normalizar(valor):
+    return Decimal(str(valor)).quantize(Decimal('0.001'))
+
+
+def verificar_resumos(empresa_ids=None):
+    """
+    Compara os resumos gravados com os valores recalculados a partir de Venda,
+    e as linhas de VendaPlataforma com as colunas vendas_<plataforma>.
+
+    Retorna uma lista de divergências (nivel, chave, campo, esperado, gravado);
+    linhas ausentes ou sobrando aparecem com campo 'registros' e o outro lado None.
+    """
+    if empresa_ids is None:
+        empresa_ids = set(
+            Venda.objects.exclude(empresa__isnull=True)
+            .order_by().values_list('empresa_id', flat=True).distinct()
+        )
+        for _, modelo, _ in NIVEIS:
+            empresa_ids.update(modelo.objects.order_by().values_list('empresa_id', flat=True).distinct())
+
+    divergencias = []
+    for empresa_id in sorted(empresa_ids):
+        divergencias.extend(verificar_plataformas(empresa_id))
+        esperado_niveis = calcular_niveis(Venda.objects.filter(empresa_id=empresa_id))
+        for nome, modelo, chaves in NIVEIS:
+            esperado = {tuple(l[c] for c in chaves): l for l in esperado_niveis[nome]}
+            gravado = {
+                tuple(l[c] for c in chaves): l
+                for l in modelo.objects.filter(empresa_id=empresa_id).values(*chaves, *CAMPOS_RESUMO)
+            }
+            for chave in esperado.keys() | gravado.keys():
+                linha_esperada = esperado.get(chave)
+                linha_gravada = gravado.get(chave)
+                if linha_esperada is None or linha_gravada is None:
+                    divergencias.append((
+                        nome, chave, 'registros',
+                        linha_esperada and linha_esperada['registros'],
+                        linha_gravada and linha_gravada['registros'],
+                    ))
+                    continue
+                for campo in CAMPOS_RESUMO:
+                    if _normalizar(linha_esperada[campo]) != _normalizar(linha_gravada[campo]):
+                        divergencias.append((nome, chave, campo, linha_esperada[campo], linha_gravada[campo]))
+    return divergencias
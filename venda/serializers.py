@@ -9,6 +9,14 @@ class VendaSerializer(serializers.ModelSerializer):
     clientes_novos = serializers.IntegerField(required=False, allow_null=True)
     clientes_recorrentes = serializers.IntegerField(required=False, allow_null=True)
     conversoes = serializers.IntegerField(required=False, allow_null=True)
+
+    def __init__(self, *args, **kwargs):
+        # `fields` restringe os campos serializados (?fields= da listagem)
+        campos = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for campo in set(self.fields) - set(campos):
+                self.fields.pop(campo)
     
     def to_internal_value(self, data):
         """Converte dados antes da validação"""
@@ -47,6 +55,7 @@ class VendaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Venda
         fields = '__all__'
-        read_only_fields = ('mes', 'ano', 'semana', 'saldo_invest', 'saldo_fat', 
+        read_only_fields = ('mes', 'ano', 'semana', 'iso_ano', 'iso_semana', 'mes_num',
+                          'saldo_invest', 'saldo_fat', 
                           'roi_realizado', 'roas_realizado', 'cac_realizado', 
                           'arpu_realizado', 'taxa_conversao', 'clima') 
\ No newline at end of file
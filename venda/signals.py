@@ -0,0 +1,45 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from dashboard.cache_utils import agendar_invalidacao
+
+from .clima import agendar_preenchimento_clima, precisa_de_clima
+from .models import Venda
+from .resumos import agendar_recalculo
+
+
+def _mes(empresa_id, data):
+    return (empresa_id, data.year, data.month) if empresa_id and data else None
+
+
+@receiver(post_init, sender=Venda)
+def guardar_mes_original(sender, instance: Venda, **kwargs):
+    """Guarda empresa/data carregadas para recalcular também o mês antigo se mudarem."""
+    # Usa __dict__ para não disparar consulta quando o campo foi adiado (.only/.defer)
+    instance._resumo_origem = (instance.__dict__.get('empresa_id'), instance.__dict__.get('data'))
+
+
+@receiver(post_save, sender=Venda)
+def atualizar_resumos_ao_salvar(sender, instance: Venda, raw: bool = False, **kwargs):
+    """Mantém os resumos do dashboard em dia a cada venda salva."""
+    if raw:
+        return
+    atual = (instance.empresa_id, instance.data)
+    origem = getattr(instance, '_resumo_origem', atual)
+    agendar_recalculo(*atual)
+    if _mes(*origem) != _mes(*atual):
+        agendar_recalculo(*origem)
+    # Depois do recálculo dos resumos, descarta o cache do dashboard das empresas afetadas
+    agendar_invalidacao(instance.empresa_id)
+    if origem[0] != instance.empresa_id:
+        agendar_invalidacao(origem[0])
+    # Clima consultado fora do save, depois do commit (só da própria venda)
+    if precisa_de_clima(instance):
+        agendar_preenchimento_clima(instance.empresa_id, [instance.pk])
+    instance._resumo_origem = atual
+
+
+@receiver(post_delete, sender=Venda)
+def atualizar_resumos_ao_excluir(sender, instance: Venda, **kwargs):
+    agendar_recalculo(instance.empresa_id, instance.data)
+    agendar_invalidacao(instance.empresa_id)
@@ -1,3 +1,596 @@
-from django.test import TestCase
+import csv
+import gzip
+from datetime import date
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from openpyxl import load_workbook
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from dashboard.cache_utils import versao_dados
+from empresas.models import Empresa
+
+from . import exportacao
+from .kpis import CAMPOS_KPIS
+from .leitura import LeitorVendas
+from .lote import criar_vendas
+from .models import Venda, VendaPlataforma, VendaResumoDiario, VendaResumoMensal, VendaResumoSemanal
+from .plataformas import verificar_plataformas
+from .resumos import ESCOPO_TODAS, reconstruir_resumos, verificar_resumos
+from .serializers import VendaSerializer
+from .views import VendaViewSet
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ResumosVendaTests(TestCase):
+    """Os resumos do dashboard acompanham cada venda salva ou excluída (depois do commit)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+
+    def setUp(self):
+        # O preenchimento de clima consulta a rede em segundo plano
+        patcher = mock.patch('venda.signals.agendar_preenchimento_clima')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def salvar(self, venda):
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.save()
+        return venda
+
+    def mensal(self, ano, mes, escopo=ESCOPO_TODAS):
+        return VendaResumoMensal.objects.filter(empresa=self.empresa, plataforma=escopo, ano=ano, mes=mes).first()
+
+    def test_venda_nova_entra_nos_resumos(self):
+        self.salvar(Venda(
+            empresa=self.empresa, data=date(2024, 5, 10), fat_geral=Decimal('250'), vendas_instagram=Decimal('40'),
+        ))
+        resumo = self.mensal(2024, 5)
+        self.assertEqual(resumo.registros, 1)
+        self.assertEqual(resumo.fat_geral, Decimal('250'))
+        self.assertEqual(self.mensal(2024, 5, 'instagram').vendas_instagram, Decimal('40'))
+        self.assertIsNone(self.mensal(2024, 5, 'google'))
+        self.assertEqual(VendaResumoDiario.objects.filter(empresa=self.empresa, data=date(2024, 5, 10)).count(), 2)
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+    def test_alteracao_atualiza_os_resumos(self):
+        venda = self.salvar(Venda(empresa=self.empresa, data=date(2024, 5, 10), fat_geral=Decimal('250')))
+        venda.fat_geral = Decimal('400')
+        venda.vendas_google = Decimal('15')
+        self.salvar(venda)
+        self.assertEqual(self.mensal(2024, 5).fat_geral, Decimal('400'))
+        self.assertEqual(self.mensal(2024, 5, 'google').vendas_google, Decimal('15'))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+    def test_mudanca_de_mes_recalcula_o_mes_antigo(self):
+        venda = self.salvar(Venda(empresa=self.empresa, data=date(2024, 5, 31), fat_geral=Decimal('250')))
+        venda.data = date(2024, 6, 1)
+        self.salvar(venda)
+        self.assertIsNone(self.mensal(2024, 5))
+        self.assertFalse(VendaResumoSemanal.objects.filter(empresa=self.empresa, mes=5).exists())
+        self.assertEqual(self.mensal(2024, 6).fat_geral, Decimal('250'))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+    def test_exclusao_remove_dos_resumos(self):
+        mantida = self.salvar(Venda(empresa=self.empresa, data=date(2024, 5, 1), fat_geral=Decimal('100')))
+        excluida = self.salvar(Venda(
+            empresa=self.empresa, data=date(2024, 5, 2), fat_geral=Decimal('250'), vendas_facebook=Decimal('9'),
+        ))
+        with self.captureOnCommitCallbacks(execute=True):
+            excluida.delete()
+        self.assertEqual(self.mensal(2024, 5).registros, 1)
+        self.assertEqual(self.mensal(2024, 5).fat_geral, mantida.fat_geral)
+        self.assertIsNone(self.mensal(2024, 5, 'facebook'))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+    def test_vendas_por_plataforma_acompanham_o_save(self):
+        venda = self.salvar(Venda(
+            empresa=self.empresa, data=date(2024, 5, 10), vendas_google=Decimal('10'), vendas_facebook=Decimal('5'),
+        ))
+        self.assertEqual(
+            sorted(venda.plataformas.values_list('plataforma', 'valor')),
+            [('facebook', Decimal('5.00')), ('google', Decimal('10.00'))],
+        )
+        venda.vendas_google = Decimal('0')
+        self.salvar(venda)
+        self.assertEqual(list(venda.plataformas.values_list('plataforma', flat=True)), ['facebook'])
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.delete()
+        self.assertFalse(VendaPlataforma.objects.filter(empresa=self.empresa).exists())
+
+    def test_lote_sem_retorno_de_ids_grava_as_plataformas(self):
+        # MySQL: o bulk_create não devolve os ids das vendas inseridas
+        existente = self.salvar(Venda(empresa=self.empresa, data=date(2024, 5, 10), vendas_google=Decimal('1')))
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                self.captureOnCommitCallbacks(execute=True):
+            criadas = criar_vendas([
+                Venda(empresa=self.empresa, data=date(2024, 5, 10), vendas_google=Decimal('10')),
+                Venda(empresa=self.empresa, data=date(2024, 5, 11), vendas_facebook=Decimal('5')),
+            ])
+        self.assertNotIn(existente.pk, [venda.pk for venda in criadas])
+        self.assertEqual(
+            sorted(VendaPlataforma.objects.filter(empresa=self.empresa).values_list('venda_id', 'plataforma', 'valor')),
+            sorted([
+                (existente.pk, 'google', Decimal('1.00')),
+                (criadas[0].pk, 'google', Decimal('10.00')),
+                (criadas[1].pk, 'facebook', Decimal('5.00')),
+            ]),
+        )
+        self.assertEqual(self.mensal(2024, 5, 'google').vendas_google, Decimal('11'))
+        self.assertEqual(self.mensal(2024, 5, 'facebook').registros, 1)
+        self.assertEqual(verificar_plataformas(self.empresa.id), [])
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ListagemVendasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(username='teste', email='teste@example.com', password='x')
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for dia in (3, 1, 2):
+                Venda(empresa=cls.empresa, data=date(2024, 5, dia), fat_geral=Decimal(dia)).save()
+
+    def listar(self, **params):
+        request = APIRequestFactory().get('/api/vendas/', params, secure=True)
+        force_authenticate(request, user=self.usuario)
+        request.empresa = self.empresa
+        return VendaViewSet.as_view({'get': 'list'})(request)
+
+    def test_ordenacao_por_data(self):
+        datas = [linha['data'] for linha in self.listar(ordering='-data').data['results']]
+        self.assertEqual(datas, ['2024-05-03', '2024-05-02', '2024-05-01'])
+
+    def test_ordenacao_nao_suportada_responde_400(self):
+        resposta = self.listar(ordering='fat_geral')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('ordering', resposta.data)
+
+    def test_painel_com_parametros_invalidos_responde_400(self):
+        for params in ({'year': 'abc'}, {'year': 2024, 'month': 'maio'}, {'year': 2024, 'week': '1.5'}):
+            request = APIRequestFactory().get('/api/vendas/dashboard/', params, secure=True)
+            force_authenticate(request, user=self.usuario)
+            request.empresa = self.empresa
+            resposta = VendaViewSet.as_view({'get': 'dashboard'})(request)
+            self.assertEqual(resposta.status_code, 400, params)
+            self.assertIn('error', resposta.data)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class LoteVendasTests(TestCase):
+    """POST /api/vendas/bulk/: validação por linha, limite e manutenção igual à do save."""
+
+    LINHA = {
+        'data': '2024-05-10', 'plataforma': 'google', 'invest_realizado': '100.00', 'invest_projetado': '120.00',
+        'vendas_google': '50.00', 'fat_proj': '500.00', 'fat_camp_realizado': '300.00', 'fat_geral': '800.00',
+        'leads': 10, 'clientes_novos': 2, 'clientes_recorrentes': 1, 'conversoes': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(username='teste', email='teste@example.com', password='x')
+
+    def setUp(self):
+        patcher = mock.patch('venda.lote.agendar_preenchimento_clima')
+        self.agendar_clima = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enviar(self, vendas):
+        request = APIRequestFactory().post('/api/vendas/bulk/', {'vendas': vendas}, format='json', secure=True)
+        force_authenticate(request, user=self.usuario)
+        request.empresa = self.empresa
+        with self.captureOnCommitCallbacks(execute=True):
+            return VendaViewSet.as_view({'post': 'bulk'})(request)
+
+    def test_linhas_invalidas_sao_relatadas_e_as_validas_gravadas(self):
+        resposta = self.enviar([self.LINHA, {'plataforma': 'google'}, 'texto', {**self.LINHA, 'leads': 'x'}])
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['criadas'], 1)
+        self.assertEqual([erro['indice'] for erro in resposta.data['erros']], [1, 2, 3])
+        self.assertIn('leads', resposta.data['erros'][2]['errors'])
+        self.assertEqual(Venda.objects.filter(empresa=self.empresa).count(), 1)
+
+    def test_sem_linhas_validas_responde_400(self):
+        resposta = self.enviar([{'plataforma': 'google'}])
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.data['criadas'], 0)
+
+    def test_limite_de_linhas(self):
+        resposta = self.enviar([{}] * (VendaViewSet.max_vendas_lote + 1))
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Venda.objects.exists())
+
+    def test_kpis_iguais_aos_do_save(self):
+        linhas = [self.LINHA, {**self.LINHA, 'data': '2024-05-11', 'clientes_novos': 0, 'clientes_recorrentes': 0}]
+        self.assertEqual(self.enviar(linhas).status_code, 201)
+        for linha in linhas:
+            dados = VendaSerializer().run_validation(dict(linha))
+            esperada = Venda(empresa=self.empresa, **dados)
+            with mock.patch('venda.signals.agendar_preenchimento_clima'):
+                esperada.save()
+            gravada = Venda.objects.filter(empresa=self.empresa, data=esperada.data).exclude(pk=esperada.pk).get()
+            campos = {campo: valor for campo, valor in VendaSerializer(esperada).data.items() if campo != 'id'}
+            self.assertEqual(
+                {campo: valor for campo, valor in VendaSerializer(gravada).data.items() if campo != 'id'}, campos
+            )
+
+    def test_resumos_cache_e_clima_depois_do_commit(self):
+        versao = versao_dados(self.empresa.id)
+        hoje = date.today().isoformat()
+        # MySQL: bulk_create sem RETURNING; o clima ainda recebe os ids das vendas
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            resposta = self.enviar([self.LINHA, {**self.LINHA, 'data': hoje}])
+        self.assertEqual(resposta.status_code, 201)
+        resumo = VendaResumoMensal.objects.get(empresa=self.empresa, plataforma=ESCOPO_TODAS, ano=2024, mes=5)
+        self.assertEqual(resumo.fat_geral, Decimal('800'))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+        self.assertEqual(verificar_plataformas(self.empresa.id), [])
+        self.assertNotEqual(versao_dados(self.empresa.id), versao)
+        self.agendar_clima.assert_called_once_with(
+            self.empresa.id, {Venda.objects.get(empresa=self.empresa, data=date.today()).pk}
+        )
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class LeitorVendasTests(TestCase):
+    """LeitorVendas tem de devolver o mesmo JSON do VendaSerializer, campo a campo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(username='teste', email='teste@example.com', password='x')
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            Venda(
+                empresa=cls.empresa, data=date(2024, 2, 29), plataforma='instagram', invest_realizado=Decimal('0.01'),
+                invest_projetado=Decimal('99999999.99'), fat_geral=Decimal('-1234.5'), fat_camp_realizado=Decimal('7'),
+                leads=3, clientes_novos=0, conversoes=1,
+            ).save()
+            Venda(empresa=cls.empresa, data=date(2023, 12, 31), fat_geral=Decimal('10')).save()
+            Venda(data=date(2024, 1, 1)).save()
+        # Valores nos limites dos campos (max_digits, casas decimais, nulos e vazios)
+        Venda.objects.filter(data=date(2024, 2, 29)).update(
+            roi_realizado=Decimal('9999.99'), taxa_conversao=Decimal('0.125'), clima='Chuvoso',
+        )
+        Venda.objects.filter(data=date(2023, 12, 31)).update(roas_realizado=None, leads=None, clima='')
+
+    def comparar(self, campos=None):
+        vendas = Venda.objects.order_by('id')
+        leitor = LeitorVendas(campos)
+        esperado = VendaSerializer(vendas, many=True, fields=campos).data
+        self.assertEqual(leitor.serializar(leitor.valores(vendas)), [dict(item) for item in esperado])
+
+    def test_todos_os_campos(self):
+        self.comparar()
+
+    def test_cada_campo_isolado(self):
+        for campo in VendaSerializer().fields:
+            with self.subTest(campo=campo):
+                self.comparar([campo])
+
+    def test_subconjunto_pela_api(self):
+        request = APIRequestFactory().get('/api/vendas/', {'fields': 'fat_geral,data,taxa_conversao'}, secure=True)
+        force_authenticate(request, user=self.usuario)
+        request.empresa = self.empresa
+        resultados = VendaViewSet.as_view({'get': 'list'})(request).data['results']
+        vendas = Venda.objects.filter(empresa=self.empresa).order_by('data', 'id')
+        esperado = VendaSerializer(vendas, many=True, fields=['data', 'fat_geral', 'taxa_conversao']).data
+        self.assertEqual(resultados, [dict(item) for item in esperado])
+        self.assertEqual(list(resultados[0]), list(esperado[0]))
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ImportacaoVendasTests(TestCase):
+    """POST /api/vendas/import/ com CSV no layout da exportação."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(username='teste', email='teste@example.com', password='x')
+
+    def setUp(self):
+        patcher = mock.patch('venda.lote.agendar_preenchimento_clima')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def importar(self, *linhas, **params):
+        conteudo = '\n'.join(';'.join(linha) for linha in linhas).encode('utf-8')
+        arquivo = SimpleUploadedFile('vendas.csv', conteudo, content_type='text/csv')
+        url = '/api/vendas/import/' + ('?' + '&'.join(f'{chave}={valor}' for chave, valor in params.items()) if params else '')
+        request = APIRequestFactory().post(url, {'arquivo': arquivo}, format='multipart', secure=True)
+        force_authenticate(request, user=self.usuario)
+        request.empresa = self.empresa
+        with self.captureOnCommitCallbacks(execute=True):
+            return VendaViewSet.as_view({'post': 'import_file'})(request)
+
+    def test_mapeia_titulos_e_chaves_do_cabecalho(self):
+        # Títulos da exportação ou chaves, sem diferenciar maiúsculas; calculadas e desconhecidas são ignoradas
+        resposta = self.importar(
+            ['DATA', 'plataforma', 'FAT Geral', 'fat_proj', 'Vendas Facebook', 'ROI', 'Observação'],
+            ['10/05/2024', 'Facebook', '1.234,56', '1000', '30', '999', 'x'],
+            ['2024-05-11', '', '10', '', '', '', ''],
+            plataforma='instagram',
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual((resposta.data['criadas'], resposta.data['erros']), (2, []))
+        venda = Venda.objects.get(empresa=self.empresa, data=date(2024, 5, 10))
+        self.assertEqual(venda.plataforma, 'facebook')
+        self.assertEqual((venda.fat_geral, venda.fat_proj, venda.vendas_facebook), (Decimal('1234.56'), 1000, 30))
+        self.assertNotEqual(venda.roi_realizado, Decimal('999'))
+        self.assertEqual(venda.saldo_fat, Decimal('234.56'))
+        # Sem plataforma na linha: usa a do ?plataforma=
+        self.assertEqual(Venda.objects.get(empresa=self.empresa, data=date(2024, 5, 11)).plataforma, 'instagram')
+
+    def test_chave_repetida_no_arquivo_vale_a_primeira(self):
+        resposta = self.importar(
+            ['Data', 'Plataforma', 'FAT Geral'],
+            ['10/05/2024', 'google', '100'],
+            ['10/05/2024', 'google', '200'],
+        )
+        self.assertEqual((resposta.data['criadas'], resposta.data['ignoradas']), (1, 1))
+        self.assertEqual(resposta.data['erros'][0]['linha'], 3)
+        self.assertIn('já lidas na linha 2', resposta.data['erros'][0]['erro'])
+        self.assertEqual(Venda.objects.get(empresa=self.empresa).fat_geral, Decimal('100'))
+
+    def test_atualiza_a_venda_existente_da_chave(self):
+        with mock.patch('venda.signals.agendar_preenchimento_clima'), self.captureOnCommitCallbacks(execute=True):
+            existente = Venda(
+                empresa=self.empresa, data=date(2024, 5, 10), plataforma='google',
+                fat_geral=Decimal('100'), fat_proj=Decimal('80'), leads=7,
+            )
+            existente.save()
+        resposta = self.importar(['Data', 'Plataforma', 'FAT Geral'], ['10/05/2024', 'google', '500'])
+        self.assertEqual((resposta.data['criadas'], resposta.data['atualizadas']), (0, 1))
+        existente.refresh_from_db()
+        # Campos fora do arquivo continuam; os derivados são recalculados
+        self.assertEqual((existente.fat_geral, existente.fat_proj, existente.leads), (500, 80, 7))
+        self.assertEqual(existente.saldo_fat, Decimal('420'))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+    def test_linha_malformada_e_relatada(self):
+        resposta = self.importar(
+            ['Data', 'FAT Geral', 'Leads'],
+            ['10/05/2024', 'abc', '1'],
+            ['32/05/2024', '1', '1'],
+            ['11/05/2024', '1', '1,5'],
+            ['12/05/2024', '1', '2'],
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual((resposta.data['criadas'], resposta.data['ignoradas']), (1, 3))
+        self.assertEqual([erro['linha'] for erro in resposta.data['erros']], [2, 3, 4])
+        self.assertIn('número inválido', resposta.data['erros'][0]['erro'])
+
+    def test_cabecalho_sem_data_responde_400(self):
+        resposta = self.importar(['FAT Geral'], ['1'])
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_vendas_novas_sem_retorno_de_ids(self):
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            resposta = self.importar(
+                ['Data', 'Plataforma', 'Vendas Google', 'Vendas Instagram'],
+                ['10/05/2024', 'google', '10', '0'],
+                ['11/05/2024', 'instagram', '0', '4'],
+            )
+        self.assertEqual(resposta.data['criadas'], 2)
+        self.assertEqual(
+            sorted(VendaPlataforma.objects.filter(empresa=self.empresa).values_list('plataforma', 'valor')),
+            [('google', Decimal('10.00')), ('instagram', Decimal('4.00'))],
+        )
+        self.assertEqual(verificar_plataformas(self.empresa.id), [])
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class RecalcularKpisTests(TestCase):
+    """Comando recalcular_kpis_vendas: dry-run, UPDATE em blocos e manutenção dos resumos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for dia in range(1, 8):
+                Venda(
+                    empresa=cls.empresa, data=date(2024, 5, dia), invest_realizado=Decimal('100'),
+                    invest_projetado=Decimal('150'), fat_proj=Decimal('900'), fat_camp_realizado=Decimal(dia * 50),
+                    fat_geral=Decimal(dia * 120), leads=dia * 4, clientes_novos=dia % 3, conversoes=dia,
+                ).save()
+        cls.corretos = {
+            venda['id']: venda for venda in Venda.objects.filter(empresa=cls.empresa).values('id', *CAMPOS_KPIS)
+        }
+
+    def setUp(self):
+        # KPIs corrompidos direto no banco, com os resumos montados sobre eles
+        ids = sorted(self.corretos)
+        Venda.objects.filter(id__in=ids[::2]).update(roi_realizado=Decimal('99'), saldo_fat=Decimal('-1'))
+        Venda.objects.filter(id=ids[1]).update(cac_realizado=None, taxa_conversao=Decimal('7'))
+        reconstruir_resumos([self.empresa.id])
+        self.corrompidas = set(ids[::2]) | {ids[1]}
+
+    def executar(self, *args):
+        saida = StringIO()
+        call_command('recalcular_kpis_vendas', *args, stdout=saida)
+        return saida.getvalue()
+
+    def gravados(self):
+        return {venda['id']: venda for venda in Venda.objects.filter(empresa=self.empresa).values('id', *CAMPOS_KPIS)}
+
+    def test_dry_run_nao_grava(self):
+        antes = self.gravados()
+        saida = self.executar('--dry-run', '--empresa', str(self.empresa.id))
+        self.assertIn(f'{len(self.corrompidas)} de {len(self.corretos)} venda(s) com KPIs divergentes', saida)
+        self.assertIn('roi_realizado: 4 divergência(s)', saida)
+        self.assertEqual(self.gravados(), antes)
+
+    def test_recalcula_em_blocos_e_refaz_os_resumos(self):
+        versao = versao_dados(self.empresa.id)
+        saida = self.executar('--empresa', str(self.empresa.id), '--lote', '2')
+        self.assertEqual(self.gravados(), self.corretos)
+        self.assertIn('roi_realizado: 4 linha(s) atualizada(s)', saida)
+        self.assertIn('cac_realizado: 1 linha(s) atualizada(s)', saida)
+        self.assertIn('resumos refeitos em 1 mês(es)', saida)
+        resumo = VendaResumoMensal.objects.get(empresa=self.empresa, plataforma=ESCOPO_TODAS, ano=2024, mes=5)
+        self.assertEqual(resumo.roi_realizado_soma, sum(venda['roi_realizado'] for venda in self.corretos.values()))
+        self.assertEqual(verificar_resumos([self.empresa.id]), [])
+        self.assertNotEqual(versao_dados(self.empresa.id), versao)
+        # Segunda execução: nada a corrigir
+        self.assertIn('0 de 7 venda(s)', self.executar('--dry-run'))
+
+    def test_filtro_de_datas(self):
+        self.executar('--inicio', '2024-05-03', '--fim', '2024-05-04')
+        gravados = self.gravados()
+        corrigidos = {
+            venda_id for venda_id, valores in gravados.items() if valores == self.corretos[venda_id]
+        } & self.corrompidas
+        datas = dict(Venda.objects.filter(id__in=self.corrompidas).values_list('id', 'data'))
+        self.assertEqual(corrigidos, {venda_id for venda_id in self.corrompidas if datas[venda_id].day in (3, 4)})
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ExportacaoVendasTests(TestCase):
+    """Exportação CSV (streaming, gzip) e Excel (write-only) das vendas da empresa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+        cls.usuario = get_user_model().objects.create_user(username='teste', email='teste@example.com', password='x')
+        outra = Empresa.objects.create(
+            tipo='PJ', sigla='OUT', razao_social='Outra', cnpj='2', email_comercial='outra@example.com', telefone1='0'
+        )
+        with mock.patch('venda.signals.agendar_preenchimento_clima'):
+            for dia, plataforma in [(1, 'google'), (2, 'facebook'), (3, 'google')]:
+                Venda(
+                    empresa=cls.empresa, data=date(2024, 5, dia), plataforma=plataforma,
+                    fat_geral=Decimal(dia * 100), leads=dia,
+                ).save()
+            Venda(empresa=outra, data=date(2024, 5, 1), fat_geral=Decimal('999')).save()
+
+    def exportar(self, acao, **params):
+        request = APIRequestFactory().get(f'/api/vendas/{acao}/', {'ordering': 'data', **params}, secure=True)
+        force_authenticate(request, user=self.usuario)
+        request.empresa = self.empresa
+        return VendaViewSet.as_view({'get': acao})(request)
+
+    def test_csv_em_streaming(self):
+        with mock.patch.object(exportacao, 'LINHAS_POR_PEDACO', 2):
+            resposta = self.exportar('export_csv', columns='fat_geral,data,leads')
+            pedacos = list(resposta.streaming_content)
+        self.assertEqual(resposta['Content-Disposition'], 'attachment; filename="vendas.csv"')
+        # Cabeçalho + 2 linhas + 1 linha
+        self.assertEqual(len(pedacos), 3)
+        self.assertEqual(list(csv.reader(b''.join(pedacos).decode('utf-8').splitlines())), [
+            ['Data', 'FAT Geral', 'Leads'],
+            ['01/05/2024', '100.00', '1'],
+            ['02/05/2024', '200.00', '2'],
+            ['03/05/2024', '300.00', '3'],
+        ])
+
+    def test_csv_gzip_igual_ao_csv(self):
+        simples = b''.join(self.exportar('export_csv').streaming_content)
+        resposta = self.exportar('export_csv', gzip='1')
+        self.assertEqual(resposta['Content-Type'], 'application/gzip')
+        self.assertEqual(resposta['Content-Disposition'], 'attachment; filename="vendas.csv.gz"')
+        self.assertEqual(gzip.decompress(b''.join(resposta.streaming_content)), simples)
+        self.assertEqual(simples.decode('utf-8').splitlines()[0].split(',')[:2], ['Data', 'Plataforma'])
+
+    def test_colunas_desconhecidas_respondem_400(self):
+        for acao in ('export_csv', 'export_excel'):
+            for colunas in ('data,senha', ' , '):
+                resposta = self.exportar(acao, columns=colunas)
+                self.assertEqual(resposta.status_code, 400, (acao, colunas))
+            self.assertIn('senha', self.exportar(acao, columns='data,senha').data['error'])
+
+    def test_excel_write_only(self):
+        resposta = self.exportar('export_excel', columns='data,plataforma,fat_geral')
+        workbook = load_workbook(BytesIO(b''.join(resposta.streaming_content)), read_only=True)
+        self.assertEqual(workbook.sheetnames, ['Vendas'])
+        self.assertEqual(list(workbook['Vendas'].iter_rows(values_only=True)), [
+            ('Data', 'Plataforma', 'FAT Geral'),
+            ('01/05/2024', 'google', 100),
+            ('02/05/2024', 'facebook', 200),
+            ('03/05/2024', 'google', 300),
+        ])
+
+    def test_excel_separado_por_plataforma(self):
+        resposta = self.exportar('export_excel', columns='data,fat_geral', sheets='plataforma')
+        workbook = load_workbook(BytesIO(b''.join(resposta.streaming_content)), read_only=True)
+        self.assertEqual(workbook.sheetnames, ['Facebook', 'Google'])
+        self.assertEqual(
+            [linha[0] for linha in workbook['Google'].iter_rows(values_only=True)], ['Data', '01/05/2024', '03/05/2024']
+        )
+        self.assertEqual(self.exportar('export_excel', sheets='mes').status_code, 400)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class PreenchimentoClimaTests(TestCase):
+    """O clima de hoje vai só para as vendas do dia gravadas na transação."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(
+            tipo='PJ', sigla='TST', razao_social='Teste', cnpj='1', email_comercial='teste@example.com', telefone1='0'
+        )
+
+    def setUp(self):
+        # Sem rede e sem thread: o provedor responde na hora e o preenchimento roda no commit
+        for alvo, opcoes in [
+            ('venda.clima.condicao_do_dia', {'return_value': 'Ensolarado'}),
+            ('venda.clima.executar_em_segundo_plano', {'side_effect': lambda funcao, *args: funcao(*args)}),
+        ]:
+            patcher = mock.patch(alvo, **opcoes)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def salvar(self, venda):
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.save()
+        venda.refresh_from_db(fields=['clima'])
+        return venda
+
+    def test_venda_do_dia_recebe_o_clima(self):
+        self.assertEqual(self.salvar(Venda(empresa=self.empresa, data=date.today())).clima, 'Ensolarado')
+
+    def test_vendas_antigas_ficam_sem_clima(self):
+        antiga = self.salvar(Venda(empresa=self.empresa, data=date(2024, 5, 10)))
+        self.assertIsNone(antiga.clima)
+        # Salvar uma venda de hoje não espalha o clima para as antigas sem clima
+        self.salvar(Venda(empresa=self.empresa, data=date.today()))
+        antiga.refresh_from_db(fields=['clima'])
+        self.assertIsNone(antiga.clima)
+
+    def test_lote_preenche_so_as_vendas_gravadas(self):
+        outra = Venda.objects.create(empresa=self.empresa, data=date.today(), plataforma='google')
+        with self.captureOnCommitCallbacks(execute=True):
+            criadas = criar_vendas([
+                Venda(empresa=self.empresa, data=date.today(), plataforma='facebook'),
+                Venda(empresa=self.empresa, data=date(2024, 5, 10)),
+            ])
+        climas = dict(Venda.objects.filter(empresa=self.empresa).values_list('id', 'clima'))
+        self.assertEqual(climas[criadas[0].pk], 'Ensolarado')
+        self.assertIsNone(climas[criadas[1].pk])
+        self.assertIsNone(climas[outra.pk])
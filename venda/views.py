@@ -1,296 +1,225 @@
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from datetime import datetime
-from io import BytesIO
-import csv
-from openpyxl import Workbook
-from django.db.models import Sum, Avg
-from django.db.models.functions import TruncMonth, TruncWeek
 
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import Venda
 from .serializers import VendaSerializer
+from .lote import criar_vendas
+from .importacao import formato_do_arquivo, importar_vendas
+from .leitura import LeitorVendas
+from .paginacao import VendaCursorPagination
+from .exportacao import COLUNAS, SEPARACOES, colunas_pedidas, gerar_csv, gerar_csv_gzip, gerar_excel
 from empresas.mixins import EmpresaFilterMixin
+from dashboard.metricas import painel_vendas_em_cache
+from dashboard.mixins import ConditionalGetMixin
 
-class VendaViewSet(EmpresaFilterMixin, viewsets.ModelViewSet):
+class VendaViewSet(ConditionalGetMixin, EmpresaFilterMixin, viewsets.ModelViewSet):
     queryset = Venda.objects.all()
     serializer_class = VendaSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['data', 'mes', 'ano', 'semana', 'vendas_google', 'vendas_instagram', 'vendas_facebook']
+    filterset_fields = [
+        'data', 'mes', 'ano', 'semana', 'iso_ano', 'iso_semana', 'mes_num', 'plataforma',
+        'vendas_google', 'vendas_instagram', 'vendas_facebook',
+    ]
     search_fields = ['mes', 'ano', 'semana']
-    ordering_fields = ['data', 'mes', 'ano', 'fat_geral', 'invest_realizado']
+    ordering_fields = ['data', 'mes_num', 'ano', 'iso_ano', 'iso_semana', 'fat_geral', 'invest_realizado']
+    pagination_class = VendaCursorPagination
+    max_vendas_lote = 10000
     
     def create(self, request, *args, **kwargs):
         """Override do método create"""
         return super().create(request, *args, **kwargs)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Cria várias vendas em uma requisição.
+
+        Recebe {"vendas": [{...}, ...]} (ou a lista direto), valida cada linha com o
+        VendaSerializer e grava as válidas em lote. Devolve {"criadas": n, "erros":
+        [{"indice": i, "errors": {...}}]} com os erros das linhas rejeitadas.
+        """
+        empresa = getattr(request, 'empresa', None)
+        if not empresa:
+            return Response(
+                {'error': 'Empresa não encontrada. Por favor, selecione uma empresa primeiro.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        linhas = request.data.get('vendas') if isinstance(request.data, dict) else request.data
+        if not isinstance(linhas, list) or not linhas:
+            return Response({'error': 'Informe a lista de vendas em "vendas"'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(linhas) > self.max_vendas_lote:
+            return Response(
+                {'error': f'Máximo de {self.max_vendas_lote} vendas por requisição'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Um único serializer valida todas as linhas (como o ListSerializer), mas
+        # sem descartar as válidas quando alguma falha
+        validador = self.get_serializer()
+        vendas, erros = [], []
+        for indice, linha in enumerate(linhas):
+            if not isinstance(linha, dict):
+                erros.append({'indice': indice, 'errors': {'non_field_errors': ['Formato inválido: esperado um objeto']}})
+                continue
+            try:
+                dados = validador.run_validation(dict(linha))
+            except serializers.ValidationError as e:
+                erros.append({'indice': indice, 'errors': e.detail})
+                continue
+            dados.pop('empresa', None)
+            vendas.append(Venda(empresa=empresa, **dados))
+
+        criar_vendas(vendas)
+        return Response(
+            {'criadas': len(vendas), 'erros': erros},
+            status=status.HTTP_201_CREATED if vendas else status.HTTP_400_BAD_REQUEST
+        )
+
     @action(detail=False, methods=['get'])
     def dashboard(self, request):
+        """Painel resumido de vendas; calculado pelo mesmo motor (e cache) do /api/dashboard/."""
         # Obtém os parâmetros da requisição
-        year = request.query_params.get('year', datetime.now().year)
-        month = request.query_params.get('month', datetime.now().month)
-        week = request.query_params.get('week')
+        try:
+            year = int(request.query_params.get('year', datetime.now().year))
+            month = int(request.query_params.get('month', datetime.now().month))
+            week = request.query_params.get('week')
+            week = int(week) if week else None
+        except ValueError:
+            return Response(
+                {'error': 'Parâmetros year, month e week devem ser números inteiros'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         filter_type = request.query_params.get('filterType', 'mes')
-        plataforma = request.query_params.get('plataforma', 'instagram')
-
-        # Filtra as vendas pelo ano
-        queryset = self.filter_queryset(self.get_queryset()).filter(ano=year)
-
-        # Aplica filtros adicionais baseado no tipo de filtro
-        if filter_type == 'mes':
-            queryset = queryset.filter(mes=month)
-        elif filter_type == 'semana' and week:
-            queryset = queryset.filter(semana=week)
-
-        # Calcula as métricas principais
-        metrics = queryset.aggregate(
-            invest_realizado=Sum('invest_realizado'),
-            invest_projetado=Sum('invest_projetado'),
-            faturamento=Sum('fat_geral'),
-            clientes_novos=Sum('clientes_novos'),
-            faturamento_campanha=Sum('fat_camp_realizado'),
-            leads=Sum('leads'),
-            vendas_google=Sum('vendas_google'),
-            vendas_instagram=Sum('vendas_instagram'),
-            vendas_facebook=Sum('vendas_facebook'),
-            vendas_tiktok=Sum('vendas_tiktok'),
-            roi=Avg('roi_realizado'),
-            ticket_medio=Avg('ticket_medio_realizado'),
-            clientes_recorrentes=Sum('clientes_recorrentes'),
-            taxa_conversao=Avg('taxa_conversao'),
-            cac=Avg('cac_realizado')
-        )
-
-        # Calcula as médias anuais
-        yearly_metrics = self.filter_queryset(self.get_queryset()).filter(ano=year).aggregate(
-            invest_realizado_avg=Avg('invest_realizado'),
-            invest_projetado_avg=Avg('invest_projetado'),
-            faturamento_avg=Avg('fat_geral'),
-            clientes_novos_avg=Avg('clientes_novos'),
-            faturamento_campanha_avg=Avg('fat_camp_realizado'),
-            leads_avg=Avg('leads'),
-            vendas_google_avg=Avg('vendas_google'),
-            vendas_instagram_avg=Avg('vendas_instagram'),
-            vendas_facebook_avg=Avg('vendas_facebook'),
-            vendas_tiktok_avg=Avg('vendas_tiktok'),
-            roi_avg=Avg('roi_realizado'),
-            ticket_medio_avg=Avg('ticket_medio_realizado'),
-            clientes_recorrentes_avg=Avg('clientes_recorrentes'),
-            taxa_conversao_avg=Avg('taxa_conversao'),
-            cac_avg=Avg('cac_realizado')
-        )
-
-        # Prepara os dados para os gráficos
-        if filter_type == 'mes':
-            # Dados mensais
-            monthly_data = queryset.annotate(
-                month=TruncMonth('data')
-            ).values('month').annotate(
-                invest_realizado=Sum('invest_realizado'),
-                invest_projetado=Sum('invest_projetado'),
-                fat_camp_realizado=Sum('fat_camp_realizado'),
-                fat_geral=Sum('fat_geral'),
-                leads=Sum('leads'),
-                clientes_novos=Sum('clientes_novos'),
-                clientes_recorrentes=Sum('clientes_recorrentes'),
-                vendas_google=Sum('vendas_google'),
-                vendas_instagram=Sum('vendas_instagram'),
-                vendas_facebook=Sum('vendas_facebook'),
-                vendas_tiktok=Sum('vendas_tiktok'),
-                taxa_conversao=Avg('taxa_conversao'),
-                roi=Avg('roi_realizado'),
-                ticket_medio=Avg('ticket_medio_realizado'),
-                cac=Avg('cac_realizado')
-            ).order_by('month')
-
-            labels = [data['month'].strftime('%B') for data in monthly_data]
-            invest_realizado_data = [float(data['invest_realizado'] or 0) for data in monthly_data]
-            invest_projetado_data = [float(data['invest_projetado'] or 0) for data in monthly_data]
-            fat_camp_realizado_data = [float(data['fat_camp_realizado'] or 0) for data in monthly_data]
-            fat_geral_data = [float(data['fat_geral'] or 0) for data in monthly_data]
-            leads_data = [float(data['leads'] or 0) for data in monthly_data]
-            clientes_novos_data = [float(data['clientes_novos'] or 0) for data in monthly_data]
-            clientes_recorrentes_data = [float(data['clientes_recorrentes'] or 0) for data in monthly_data]
-            vendas_google_data = [float(data['vendas_google'] or 0) for data in monthly_data]
-            vendas_instagram_data = [float(data['vendas_instagram'] or 0) for data in monthly_data]
-            vendas_facebook_data = [float(data['vendas_facebook'] or 0) for data in monthly_data]
-            vendas_tiktok_data = [float(data['vendas_tiktok'] or 0) for data in monthly_data]
-            taxa_conversao_data = [float(data['taxa_conversao'] or 0) for data in monthly_data]
-            roi_data = [float(data['roi'] or 0) for data in monthly_data]
-            ticket_medio_data = [float(data['ticket_medio'] or 0) for data in monthly_data]
-            cac_data = [float(data['cac'] or 0) for data in monthly_data]
-
-        else:
-            # Dados semanais
-            weekly_data = queryset.annotate(
-                week=TruncWeek('data')
-            ).values('week').annotate(
-                invest_realizado=Sum('invest_realizado'),
-                invest_projetado=Sum('invest_projetado'),
-                fat_camp_realizado=Sum('fat_camp_realizado'),
-                fat_geral=Sum('fat_geral'),
-                leads=Sum('leads'),
-                clientes_novos=Sum('clientes_novos'),
-                clientes_recorrentes=Sum('clientes_recorrentes'),
-                vendas_google=Sum('vendas_google'),
-                vendas_instagram=Sum('vendas_instagram'),
-                vendas_facebook=Sum('vendas_facebook'),
-                vendas_tiktok=Sum('vendas_tiktok'),
-                taxa_conversao=Avg('taxa_conversao'),
-                roi=Avg('roi_realizado'),
-                ticket_medio=Avg('ticket_medio_realizado'),
-                cac=Avg('cac_realizado')
-            ).order_by('week')
-
-            labels = [f"Semana {data['week'].isocalendar()[1]}" for data in weekly_data]
-            invest_realizado_data = [float(data['invest_realizado'] or 0) for data in weekly_data]
-            invest_projetado_data = [float(data['invest_projetado'] or 0) for data in weekly_data]
-            fat_camp_realizado_data = [float(data['fat_camp_realizado'] or 0) for data in weekly_data]
-            fat_geral_data = [float(data['fat_geral'] or 0) for data in weekly_data]
-            leads_data = [float(data['leads'] or 0) for data in weekly_data]
-            clientes_novos_data = [float(data['clientes_novos'] or 0) for data in weekly_data]
-            clientes_recorrentes_data = [float(data['clientes_recorrentes'] or 0) for data in weekly_data]
-            vendas_google_data = [float(data['vendas_google'] or 0) for data in weekly_data]
-            vendas_instagram_data = [float(data['vendas_instagram'] or 0) for data in weekly_data]
-            vendas_facebook_data = [float(data['vendas_facebook'] or 0) for data in weekly_data]
-            vendas_tiktok_data = [float(data['vendas_tiktok'] or 0) for data in weekly_data]
-            taxa_conversao_data = [float(data['taxa_conversao'] or 0) for data in weekly_data]
-            roi_data = [float(data['roi'] or 0) for data in weekly_data]
-            ticket_medio_data = [float(data['ticket_medio'] or 0) for data in weekly_data]
-            cac_data = [float(data['cac'] or 0) for data in weekly_data]
+        empresa = getattr(request, 'empresa', None)
 
-        # Combina todos os dados em uma única resposta
-        response_data = {
-            **metrics,
-            **yearly_metrics,
-            'labels': labels,
-            'invest_realizado_data': invest_realizado_data,
-            'invest_projetado_data': invest_projetado_data,
-            'fat_camp_realizado_data': fat_camp_realizado_data,
-            'fat_geral_data': fat_geral_data,
-            'leads_data': leads_data,
-            'clientes_novos_data': clientes_novos_data,
-            'clientes_recorrentes_data': clientes_recorrentes_data,
-            'vendas_google_data': vendas_google_data,
-            'vendas_instagram_data': vendas_instagram_data,
-            'vendas_facebook_data': vendas_facebook_data,
-            'vendas_tiktok_data': vendas_tiktok_data,
-            'taxa_conversao_data': taxa_conversao_data,
-            'roi_data': roi_data,
-            'ticket_medio_data': ticket_medio_data,
-            'cac_data': cac_data
-        }
-
-        return Response(response_data)
+        nao_modificado = self.resposta_nao_modificada(request)
+        if nao_modificado is not None:
+            return nao_modificado
+        return Response(painel_vendas_em_cache(empresa, year, month, week, filter_type))
 
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="vendas.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            "Data", "Mês", "Ano", "Semana",
-            "Invest. Realizado", "Invest. Projetado", "Saldo Invest.",
-            "Vendas Google", "Vendas Instagram", "Vendas Facebook", "Vendas TikTok", "FAT Projetado", "FAT Campanha", "FAT Geral", "Saldo FAT",
-            "ROI", "ROAS", "CAC", "TKT Médio", "ARPU",
-            "Leads", "Novos", "Recorrentes", "Conversões", "Taxa Conv.", "Clima"
-        ])
-
-        for venda in queryset:
-            writer.writerow([
-                venda.data.strftime("%d/%m/%Y") if venda.data else "",
-                venda.mes,
-                venda.ano,
-                venda.semana,
-                venda.invest_realizado,
-                venda.invest_projetado,
-                venda.saldo_invest,
-                venda.vendas_google,
-                venda.vendas_instagram,
-                venda.vendas_facebook,
-                venda.vendas_tiktok,
-                venda.fat_proj,
-                venda.fat_camp_realizado,
-                venda.fat_geral,
-                venda.saldo_fat,
-                venda.roi_realizado,
-                venda.roas_realizado,
-                venda.cac_realizado,
-                venda.ticket_medio_realizado,
-                venda.arpu_realizado,
-                venda.leads,
-                venda.clientes_novos,
-                venda.clientes_recorrentes,
-                venda.conversoes,
-                venda.taxa_conversao,
-                venda.clima,
-            ])
+        """
+        CSV das vendas em streaming (memória constante).
+
+        ?columns=data,fat_geral,... escolhe as colunas (padrão: todas) e
+        ?gzip=1 devolve o arquivo compactado (vendas.csv.gz).
+        """
+        try:
+            colunas = colunas_pedidas(request.query_params.get('columns'))
+        except ValueError as e:
+            return Response(
+                {'error': f"Colunas inválidas: {e}. Colunas disponíveis: {', '.join(COLUNAS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get('gzip') in ('1', 'true'):
+            response = StreamingHttpResponse(gerar_csv_gzip(queryset, colunas), content_type='application/gzip')
+            response['Content-Disposition'] = 'attachment; filename="vendas.csv.gz"'
+        else:
+            response = StreamingHttpResponse(gerar_csv(queryset, colunas), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="vendas.csv"'
         return response
 
     @action(detail=False, methods=['get'])
     def export_excel(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-        workbook = Workbook()
-        sheet = workbook.active
-
-        header = [
-            "Data", "Mês", "Ano", "Semana",
-            "Invest. Realizado", "Invest. Projetado", "Saldo Invest.",
-            "Vendas Google", "Vendas Instagram", "Vendas Facebook", "Vendas TikTok", "FAT Projetado", "FAT Campanha", "FAT Geral", "Saldo FAT",
-            "ROI", "ROAS", "CAC", "TKT Médio", "ARPU",
-            "Leads", "Novos", "Recorrentes", "Conversões", "Taxa Conv.", "Clima"
-        ]
-        sheet.append(header)
+        """
+        Excel das vendas gerado em modo write-only (memória constante).
+
+        ?columns= escolhe as colunas como no CSV e ?sheets=plataforma|ano
+        separa as vendas em uma planilha por plataforma ou por ano.
+        """
+        try:
+            colunas = colunas_pedidas(request.query_params.get('columns'))
+        except ValueError as e:
+            return Response(
+                {'error': f"Colunas inválidas: {e}. Colunas disponíveis: {', '.join(COLUNAS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        separar_por = request.query_params.get('sheets') or None
+        if separar_por is not None and separar_por not in SEPARACOES:
+            return Response(
+                {'error': f"Parâmetro sheets inválido. Use: {', '.join(SEPARACOES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        for venda in queryset:
-            row = [
-                venda.data.strftime("%d/%m/%Y") if venda.data else "",
-                venda.mes,
-                venda.ano,
-                venda.semana,
-                venda.invest_realizado,
-                venda.invest_projetado,
-                venda.saldo_invest,
-                venda.vendas_google,
-                venda.vendas_instagram,
-                venda.vendas_facebook,
-                venda.vendas_tiktok,
-                venda.fat_proj,
-                venda.fat_camp_realizado,
-                venda.fat_geral,
-                venda.saldo_fat,
-                venda.roi_realizado,
-                venda.roas_realizado,
-                venda.cac_realizado,
-                venda.ticket_medio_realizado,
-                venda.arpu_realizado,
-                venda.leads,
-                venda.clientes_novos,
-                venda.clientes_recorrentes,
-                venda.conversoes,
-                venda.taxa_conversao,
-                venda.clima,
-            ]
-            sheet.append(row)
-
-        output = BytesIO()
-        workbook.save(output)
-        output.seek(0)
-
-        response = HttpResponse(
-            output,
+        queryset = self.filter_queryset(self.get_queryset())
+        return FileResponse(
+            gerar_excel(queryset, colunas, separar_por),
+            as_attachment=True,
+            filename='vendas.xlsx',
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = 'attachment; filename="vendas.xlsx"'
-        return response
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_file(self, request):
+        """
+        Importa vendas de um CSV/XLSX no layout da exportação (campo "arquivo").
+
+        Vendas com a mesma (data, plataforma) da empresa são atualizadas, as
+        demais criadas. ?plataforma= define a plataforma das linhas sem a coluna
+        "Plataforma" (padrão: google). Devolve {criadas, atualizadas, ignoradas, erros}.
+        """
+        empresa = getattr(request, 'empresa', None)
+        if not empresa:
+            return Response(
+                {'error': 'Empresa não encontrada. Por favor, selecione uma empresa primeiro.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        arquivo = request.FILES.get('arquivo') or request.FILES.get('file')
+        if not arquivo:
+            return Response({'error': 'Envie o arquivo no campo "arquivo"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultado = importar_vendas(
+                empresa, arquivo, formato_do_arquivo(arquivo.name),
+                plataforma=request.query_params.get('plataforma')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+    def campos_pedidos(self, request):
+        """Campos de ?fields= (None = todos). Levanta ValueError com os desconhecidos."""
+        parametro = request.query_params.get('fields')
+        if not parametro:
+            return None
+        pedidos = [campo.strip() for campo in parametro.split(',') if campo.strip()]
+        disponiveis = self.get_serializer().fields
+        invalidos = [campo for campo in pedidos if campo not in disponiveis]
+        if invalidos or not pedidos:
+            raise ValueError(', '.join(invalidos))
+        return pedidos
 
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """
+        Lista as vendas da empresa em páginas por cursor, ordenadas por (data, id).
+
+        ?page_size= define o tamanho da página (máx. 1000), ?ordering=-data inverte
+        a ordem (as demais ordenações de ordering_fields valem só nas exportações
+        e aqui respondem 400) e ?fields=data,fat_geral,... limita as colunas lidas
+        e devolvidas. A resposta traz {next, previous, results}.
+        """
+        try:
+            campos = self.campos_pedidos(request)
+        except ValueError as e:
+            return Response(
+                {'error': f'Campos inválidos: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        nao_modificado = self.resposta_nao_modificada(request)
+        if nao_modificado is not None:
+            return nao_modificado
+        # Leitura direto de values(), sem instanciar Venda; id e data sempre
+        # entram na consulta porque são a chave do cursor
+        leitor = LeitorVendas(campos)
+        queryset = leitor.valores(self.filter_queryset(self.get_queryset()), extras=('id', 'data'))
+        pagina = self.paginate_queryset(queryset)
+        return self.get_paginated_response(leitor.serializar(pagina))